@@ -0,0 +1,224 @@
+from battlesnake.engine import START_HEALTH, LocalGame, default_settings
+from battlesnake.utils.classes import _RuleSetSettings
+from battlesnake.utils.geometry import get_geometry
+
+try:
+    import numpy as np
+except ImportError as e:  # NumPy is an optional dependency, see the "sim" extra
+    raise ImportError("The batch simulator needs NumPy: pip install numpy (or the 'sim' extra)") from e
+
+
+BATCH_RULESETS = ("standard", "solo", "royale", "wrapped")
+# Rulesets stepped by the batch simulator, squads are only played by the engine
+
+
+class BatchSimulator:
+    """
+    N games of the same board size and snake count stepped together, every rule applied to every game
+    with array operations. Per game and snake the state is:
+
+    - `age` (N, S, cells): body-age planes, the number of turns each cell stays taken by the snake. The head
+      holds the length and the tail 1, a stacked tail one more. Occupancy is `age > 0`.
+    - `heads`, `lengths`, `health` and `alive` (N, S).
+    - `food` and `hazards` (N, cells) masks, `turn` (N).
+
+    Games that end are flagged in `done`, reset() starts them again.
+    """
+
+    def __init__(
+        self,
+        games: int,
+        width: int = 11,
+        height: int = 11,
+        snakes: int = 4,
+        ruleset: str = "standard",
+        settings: _RuleSetSettings = None,
+        seed: int = None,
+    ):
+        if ruleset not in BATCH_RULESETS:
+            raise ValueError(f"Unsupported ruleset {ruleset}, expected one of {BATCH_RULESETS}")
+        self.games = games
+        self.snakes = snakes
+        self.ruleset = ruleset
+        self.settings = settings or default_settings()
+        self.geometry = get_geometry(width, height, ruleset)
+        self.rng = np.random.default_rng(seed)
+        self._seeds = np.random.SeedSequence(seed)
+
+        geometry = self.geometry
+        cells = geometry.size
+        self.neighbours = np.array(geometry.moves, dtype=np.int32)
+        # (cells, 4) cell reached by each move, -1 off the board
+        self.xs = np.array(geometry.xs, dtype=np.int16)
+        self.ys = np.array(geometry.ys, dtype=np.int16)
+
+        self.age = np.zeros((games, snakes, cells), dtype=np.int16)
+        self.heads = np.full((games, snakes), -1, dtype=np.int32)
+        self.lengths = np.zeros((games, snakes), dtype=np.int16)
+        self.health = np.zeros((games, snakes), dtype=np.int16)
+        self.alive = np.zeros((games, snakes), dtype=bool)
+        self.food = np.zeros((games, cells), dtype=bool)
+        self.hazards = np.zeros((games, cells), dtype=bool)
+        self.safe_area = np.tile(np.array([0, width - 1, 0, height - 1], dtype=np.int16), (games, 1))
+        # Royale: min x, max x, min y, max y of the cells not covered by hazards
+        self.turn = np.zeros(games, dtype=np.int32)
+        self.done = np.zeros(games, dtype=bool)
+
+        self._games = np.arange(games)[:, None]
+        self._snake_index = np.arange(snakes)[None, :]
+        self.reset()
+
+    # Setup
+
+    def load(self, index: int, game: LocalGame):
+        """Copy a local game (of the same size) into game `index` of the batch"""
+        cells = self.geometry.size
+        self.age[index] = 0
+        self.heads[index] = -1
+        self.lengths[index] = 0
+        self.health[index] = 0
+        self.alive[index] = False
+        for slot, snake in enumerate(game.snakes[: self.snakes]):
+            if not snake.alive:
+                continue
+            length = len(snake.body)
+            for position, cell in enumerate(snake.body):
+                self.age[index, slot, cell] = max(self.age[index, slot, cell], length - position)
+            self.heads[index, slot] = snake.body[0]
+            self.lengths[index, slot] = length
+            self.health[index, slot] = snake.health
+            self.alive[index, slot] = True
+        self.food[index] = np.isin(np.arange(cells), list(game.food))
+        self.hazards[index] = np.isin(np.arange(cells), list(game.hazards))
+        self.safe_area[index] = game.safe_area
+        self.turn[index] = game.turn
+        self.done[index] = False
+
+    def reset(self, mask: np.ndarray = None):
+        """Start new games where mask is set (every game by default), from the start positions of the engine"""
+        indexes = np.arange(self.games) if mask is None else np.flatnonzero(mask)
+        ids = [f"snake-{slot}" for slot in range(self.snakes)]
+        geometry = self.geometry
+        for index, seed in zip(indexes, self._seeds.spawn(len(indexes))):
+            game = LocalGame(
+                geometry.width, geometry.height, self.ruleset, self.settings, seed=int(seed.generate_state(1)[0])
+            )
+            game.place_snakes(ids)
+            self.load(index, game)
+
+    # Rules
+
+    def step(self, moves: np.ndarray):
+        """
+        Play one turn of every game not done, moves (N, S) holding the index in geometry.MOVES
+        of the move of each snake. Follows the order of the engine: move, damage, feed, spawn, eliminate.
+        """
+        settings = self.settings
+        games = self._games
+        playing = ~self.done[:, None]
+        moving = self.alive & playing
+
+        # Move: every segment gets one turn older, the tail leaves its cell
+        heads = np.where(moving, self.neighbours[np.maximum(self.heads, 0), moves], -1)
+        on_board = heads >= 0
+        cell = np.maximum(heads, 0)
+        np.subtract(self.age, moving[:, :, None], out=self.age, where=self.age > 0)
+
+        # Damage
+        self.health -= moving
+        if settings.hazardDamagePerTurn:
+            hurt = moving & on_board & self.hazards[games, cell] & ~self.food[games, cell]
+            self.health -= hurt * np.int16(settings.hazardDamagePerTurn)
+        np.maximum(self.health, 0, out=self.health)
+
+        # Feed: the snake grows by keeping its tail one more turn
+        eaten = moving & on_board & self.food[games, cell]
+        self.health[eaten] = START_HEALTH
+        self.lengths += eaten
+        np.add(self.age, eaten[:, :, None], out=self.age, where=self.age > 0)
+        self.food[np.nonzero(eaten)[0], cell[eaten]] = False
+
+        self._spawn_food(moving & on_board, cell)
+
+        # Eliminate: out of health and off the board first, their bodies don't count in the collisions
+        first = moving & ((self.health <= 0) | ~on_board)
+        self.age[first] = 0
+        standing = moving & ~first
+        taken = self.age[games[:, :, None], self._snake_index[:, None, :], cell[:, :, None]] > 0
+        # (N, S, S) whether the new head of snake s lands on the body of snake o
+        taken &= standing[:, None, :]
+        collided = taken.any(axis=2)
+        same = (heads[:, :, None] == heads[:, None, :]) & standing[:, :, None] & standing[:, None, :]
+        same &= ~np.eye(self.snakes, dtype=bool)[None]
+        lost = same & (self.lengths[:, :, None] <= self.lengths[:, None, :])
+        eliminated = first | (standing & (collided | lost.any(axis=2)))
+
+        self.alive &= ~eliminated
+        self.age[eliminated] = 0
+        self.heads = np.where(self.alive, heads, -1).astype(np.int32)
+        survivors = self.alive & moving
+        self.age[games, self._snake_index, cell] = np.where(
+            survivors, self.lengths, self.age[games, self._snake_index, cell]
+        )
+
+        self.turn += ~self.done
+        if self.ruleset == "royale":
+            self._shrink()
+        remaining = self.alive.sum(axis=1)
+        self.done |= remaining == 0 if self.ruleset == "solo" else remaining <= 1
+
+    def _spawn_food(self, moved: np.ndarray, heads: np.ndarray):
+        """Like the engine, but a game spawns at most one food per turn, reaching minimumFood over a few turns"""
+        settings = self.settings
+        count = self.food.sum(axis=1)
+        spawn = count < settings.minimumFood
+        if settings.foodSpawnChance > 0:
+            spawn |= self.rng.integers(0, 100, self.games) < settings.foodSpawnChance
+        spawn &= ~self.done
+        rows = np.flatnonzero(spawn)
+        if not len(rows):
+            return
+        free = ~(self.food[rows] | (self.age[rows] > 0).any(axis=1))
+        moved = moved[rows]
+        free[np.nonzero(moved)[0], heads[rows][moved]] = False
+        # One food on a random free cell of each game spawning, the free cell with the highest random score
+        scores = np.where(free, self.rng.random(free.shape), -1.0)
+        cell = scores.argmax(axis=1)
+        placed = scores[np.arange(len(rows)), cell] >= 0
+        self.food[rows[placed], cell[placed]] = True
+
+    def _shrink(self):
+        every = self.settings.royale.shrinkEveryNTurns
+        if every <= 0:
+            return
+        shrinking = (self.turn % every == 0) & ~self.done
+        if not shrinking.any():
+            return
+        sides = self.rng.integers(0, 4, self.games)
+        # min x and min y move in, max x and max y move out
+        step = np.array([1, -1, 1, -1], dtype=np.int16)[sides]
+        self.safe_area[np.flatnonzero(shrinking), sides[shrinking]] += step[shrinking]
+        area = self.safe_area[:, :, None]
+        inside = (self.xs >= area[:, 0]) & (self.xs <= area[:, 1]) & (self.ys >= area[:, 2]) & (self.ys <= area[:, 3])
+        self.hazards = np.where(shrinking[:, None], ~inside, self.hazards)
+
+    # Policies
+
+    def random_moves(self) -> np.ndarray:
+        """Random move of every snake among the ones not running into a wall or a body, any move when none is"""
+        target = self.neighbours[np.maximum(self.heads, 0)]
+        # (N, S, 4)
+        taken = (self.age > 1).any(axis=1)
+        blocked = (target < 0) | taken[self._games[:, :, None], np.maximum(target, 0)]
+        scores = self.rng.random(target.shape) - blocked
+        return scores.argmax(axis=2).astype(np.int8)
+
+    def run(self, turns: int) -> int:
+        """Step every game `turns` times with random moves, resetting finished games. Returns the game steps played"""
+        played = 0
+        for _ in range(turns):
+            played += int((~self.done).sum())
+            self.step(self.random_moves())
+            if self.done.any():
+                self.reset(self.done)
+        return played
@@ -1,38 +1,48 @@
 from battlesnake.utils.classes import Game, Snake, Board
-from battlesnake.utils.logger import CustomFormatter
-from fastapi import FastAPI, Request, status
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.logger import set_game, setup_logger
+from battlesnake.utils.strategies import get_smart_moves
+from fastapi import Body, FastAPI, Request, Response, status
+import battlesnake.utils.decode as decode
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.pipeline as pipeline
+import battlesnake.utils.profiler as profiler
+import battlesnake.utils.recorder as recorder
 import battlesnake.utils.snakebrain as snakebrain
-import logging
-import random
-import time
+import battlesnake.utils.warmup as warmup
 import typing
 import uvicorn
 
 
 CONFIG = {
     "backlog": 2048,
-    "debug": True,
     "host": "0.0.0.0",
     "log_level": "info",
     "port": 8000,
     "reload": True,
     "timeout_keep_alive": 5,
-    "workers": 4,
+}
+# Development server: one process reloading on code changes. See battlesnake.server for production
+
+INFO = {
+    "apiversion": "1.0",
+    "author": "Bazuso",  # TODO: Your Battlesnake Username
+    "color": "#757575",  # TODO: Choose color
+    "head": "lantern-fish",  # TODO: Choose head
+    "tail": "mystic-moon",  # TODO: Choose tail
 }
 
-# Create logger with 'spam_application'
-LOGGER = logging.getLogger("BattleSnake")
-LOGGER.setLevel(logging.DEBUG)
-
-# Create console handler with a higher log level
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
-ch.setFormatter(CustomFormatter())
-
-LOGGER.addHandler(ch)
+# Colored console logs, or warnings and sampled games through a background thread (BATTLESNAKE_LOG_PROFILE)
+LOGGER = setup_logger("BattleSnake")
 
 api = FastAPI(title="Battlesnake API", version="1.0")
 api.logger = LOGGER
+if profiler.PROFILE_DIR:
+    api.add_middleware(profiler.ProfilerMiddleware, directory=profiler.PROFILE_DIR)
+api.add_middleware(metrics.MetricsMiddleware, bot="bazuso")
+if recorder.RECORD_PATH:
+    api.add_middleware(recorder.RecorderMiddleware, path=recorder.RECORD_PATH)
+warmup.install(api)  # Synthetic games on startup, before the first connection
 
 ##############################################################################################################
 ##############################################################################################################
@@ -40,26 +50,36 @@ api.logger = LOGGER
 
 @api.get("/", status_code=status.HTTP_200_OK)
 async def info(request: Request) -> typing.Dict:
-    return {
-        "apiversion": "1.0",
-        "author": "Bazuso",  # TODO: Your Battlesnake Username
-        "color": "#757575",  # TODO: Choose color
-        "head": "lantern-fish",  # TODO: Choose head
-        "tail": "mystic-moon",  # TODO: Choose tail
-    }
+    """Ref: https://docs.battlesnake.com/api/requests/info"""
+    return INFO
+
+
+@api.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_metrics() -> Response:
+    """Phase histograms in the Prometheus format, summed over the workers sharing BATTLESNAKE_METRICS_DIR"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @api.post("/start", status_code=status.HTTP_200_OK)
-async def start(game: Game, board: Board, you: Snake, turn: int = None):
+async def start(game: Game, board: Board, you: Snake, turn: int = Body(None)):
     """Ref: https://docs.battlesnake.com/api/requests/start"""
+    set_game(game.id)
     LOGGER.info("START!")
+    GAMES.start((game.id, you.id), board, game.ruleset.name, turn or 0)
     return "ok"
 
 
 @api.post("/end", status_code=status.HTTP_200_OK)
-async def end(game: Game, board: Board, you: Snake, turn: int = None):
+async def end(game: Game, board: Board, you: Snake, turn: int = Body(None)):
     """Ref: https://docs.battlesnake.com/api/requests/end"""
+    set_game(game.id)
+    record = GAMES.end((game.id, you.id))
     LOGGER.info("\nEND OF GAME!")
+    if record:
+        LOGGER.info(
+            f"{record.moves} moves, {record.timeouts} timeouts, {record.fallbacks} fallbacks, "
+            f"least time remaining: {min(record.remaining, default=0) * 1000:.1f}ms"
+        )
     LOGGER.info(f"{game}\n")
     # LOGGER.info(f"{turn}\n")
     # LOGGER.info(f"{board}\n")
@@ -67,55 +87,37 @@ async def end(game: Game, board: Board, you: Snake, turn: int = None):
     return "ok"
 
 
-@api.post("/move", status_code=status.HTTP_200_OK)
-async def move(game: Game, board: Board, you: Snake, turn: int = None) -> typing.Dict:
-    begin_time = time.perf_counter()
-    safe_moves_list = snakebrain.get_safe_moves(board, you)
-    safe_time = time.perf_counter() - begin_time
-    smart_coord, smart_move = snakebrain.get_smart_moves(board, you, game, LOGGER)
-    smart_time = time.perf_counter() - begin_time
+if decode.FAST_DECODE:
 
-    if smart_move and smart_move in safe_moves_list:
-        LOGGER.info(f"Smart! {smart_coord} ({smart_move})")
-        move = smart_move
-    elif safe_moves_list:
-        move = random.choice(safe_moves_list)
-        LOGGER.info(f"Safe! {safe_moves_list} -> {move}")
-    else:
-        LOGGER.critical("No safe moves! Moving down")
-        move = "down"
+    @api.post("/move", status_code=status.HTTP_200_OK)
+    async def move(request: Request) -> Response:
+        decoded = decode.decode_move(await request.body())
+        return decode.MoveResponse(await choose_move(decoded.game, decoded.board, decoded.you, decoded.turn))
 
-    total_time = time.perf_counter() - begin_time
-    LOGGER.debug(
-        f"Moved {move} in {total_time/1000:2f}ms (safe: {safe_time/1000:2f}ms, smart: {smart_time/1000:2f}ms)"
-    )
-    return {"move": move, "shout": f"{move.upper()} SUUUUUUU"}
+else:
 
-
-##############################################################################################################
-##############################################################################################################
+    @api.post("/move", status_code=status.HTTP_200_OK)
+    async def move(game: Game, board: Board, you: Snake, turn: int = Body(None)) -> Response:
+        return decode.MoveResponse(await choose_move(game, board, you, turn or 0))
 
 
-def get_safe_moves(board: Board, you: Snake):
-    moves = {"up": True, "down": True, "left": True, "right": True}
+async def choose_move(game: Game, board: Board, you: Snake, turn: int) -> typing.Dict:
+    return await pipeline.choose_move(game, board, you, turn, get_safe_moves, get_smart_moves, LOGGER, searching=True)
 
-    for key in moves:
-        moves[key] = snakebrain.is_move_safe(board, you, key)
 
-    return [move for move, isSafe in moves.items() if isSafe]
+##############################################################################################################
+##############################################################################################################
 
 
-def get_smart_moves(board: Board, you: Snake, game: Game, LOGGER) -> str:
-    # TODO: Define Logic
-    # return move_coord, move
-    return None, None
+def get_safe_moves(board: Board, you: Snake, hazard_damage: int = snakebrain.HAZARD_DAMAGE):
+    return snakebrain.get_safe_moves(board, you, hazard_damage)
 
 
 ##############################################################################################################
 ##############################################################################################################
 if __name__ == "__main__":
     """Starts the Uvicorn server with the provided configuration."""
-    uviconfig = {"app": "bazuso:api", "interface": "asgi3"}
+    uviconfig = {"app": "battlesnake.bazuso:api", "interface": "asgi3"}
     uviconfig.update(CONFIG)
     LOGGER.info(f"\nRunning Battlesnake at http://{CONFIG.get('host')}:{CONFIG.get('port')}")
     try:
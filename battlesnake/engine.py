@@ -0,0 +1,629 @@
+from battlesnake.utils.classes import (
+    Board,
+    Coordinate,
+    Game,
+    Request,
+    RuleSet,
+    Snake,
+    _Customizations,
+    _Royale,
+    _RuleSetSettings,
+    _Squad,
+)
+from battlesnake.utils.geometry import MOVES, Geometry, get_geometry
+from typing import Dict, List, Sequence, Tuple, Union
+import argparse
+import importlib
+import json
+import logging
+import random
+import statistics
+import time
+import urllib.request
+
+
+RULESETS = ("standard", "solo", "royale", "squad", "wrapped")
+
+START_LENGTH = 3
+START_HEALTH = 100
+
+ELIMINATED_OUT_OF_HEALTH = "out-of-health"
+ELIMINATED_OUT_OF_BOUNDS = "wall-collision"
+ELIMINATED_SELF_COLLISION = "snake-self-collision"
+ELIMINATED_COLLISION = "snake-collision"
+ELIMINATED_HEAD_TO_HEAD = "head-collision"
+ELIMINATED_SQUAD = "squad-eliminated"
+# Causes of elimination, as named by the official rules
+
+QUIET = logging.getLogger("battlesnake.engine")
+QUIET.addHandler(logging.NullHandler())
+QUIET.propagate = False
+# Logger handed to the bots played in-process, so self-play doesn't print every move
+
+
+def default_settings(
+    food_spawn_chance: int = 15,
+    minimum_food: int = 1,
+    hazard_damage: int = 14,
+    shrink_every: int = 25,
+    allow_body_collisions: bool = False,
+    shared_elimination: bool = False,
+    shared_health: bool = False,
+    shared_length: bool = False,
+) -> _RuleSetSettings:
+    return _RuleSetSettings(
+        foodSpawnChance=food_spawn_chance,
+        minimumFood=minimum_food,
+        hazardDamagePerTurn=hazard_damage,
+        royale=_Royale(shrinkEveryNTurns=shrink_every),
+        squad=_Squad(
+            allowBodyCollisions=allow_body_collisions,
+            sharedElimination=shared_elimination,
+            sharedHealth=shared_health,
+            sharedLength=shared_length,
+        ),
+    )
+
+
+class EngineSnake:
+    """Snake of a local game. The body is a list of flat indexes, head first."""
+
+    __slots__ = ("id", "name", "squad", "body", "health", "eliminated", "eliminated_turn", "eliminated_by", "latency")
+
+    def __init__(self, id: str, body: List[int], squad: str = "", health: int = START_HEALTH):
+        self.id = id
+        self.name = id
+        self.squad = squad
+        self.body = body
+        self.health = health
+        self.eliminated = ""
+        # Cause of elimination, empty while the snake is on the board
+        self.eliminated_turn = 0
+        self.eliminated_by = ""
+        self.latency = 0.0
+        # Seconds the snake took to answer its last move
+
+    @property
+    def alive(self) -> bool:
+        return not self.eliminated
+
+
+class LocalGame:
+    """
+    Game played by the rules of the official engine (standard, solo, royale, squad and wrapped), without
+    any network. Moves are applied with step(), requests for the snakes are built with request() or payload().
+    """
+
+    def __init__(
+        self,
+        width: int = 11,
+        height: int = 11,
+        ruleset: str = "standard",
+        settings: _RuleSetSettings = None,
+        seed: int = None,
+        timeout: int = 500,
+        id: str = None,
+    ):
+        if ruleset not in RULESETS:
+            raise ValueError(f"Unknown ruleset {ruleset}, expected one of {RULESETS}")
+        self.ruleset = ruleset
+        self.settings = settings or default_settings()
+        self.geometry: Geometry = get_geometry(width, height, ruleset)
+        self.rng = random.Random(seed)
+        self.id = id or f"local-{self.rng.getrandbits(32):08x}"
+        self.timeout = timeout
+        self.turn = 0
+        self.snakes: List[EngineSnake] = []
+        self.food = set()
+        self.hazards = set()
+        self.safe_area = (0, width - 1, 0, height - 1)
+        # Royale: min x, max x, min y, max y of the cells not covered by hazards
+        self._coordinates = [Coordinate.construct(x=x, y=y) for x, y in zip(self.geometry.xs, self.geometry.ys)]
+        self._game = None
+
+    # Setup
+
+    def add_snake(self, id: str, body: Sequence[Tuple[int, int]], squad: str = "", health: int = START_HEALTH):
+        index = self.geometry.index
+        self.snakes.append(EngineSnake(id, [index(x, y) for x, y in body], squad, health))
+
+    def place_snakes(self, ids: Sequence[str], squads: Dict[str, str] = None):
+        """
+        Stack each snake on a start position, the fixed ones of the official engine on 7x7, 11x11 and 19x19
+        boards (up to 8 snakes), random even cells otherwise, then put food next to them and in the center.
+        """
+        squads = squads or {}
+        geometry = self.geometry
+        width, height = geometry.width, geometry.height
+        low, mid_x, mid_y, high_x, high_y = 1, (width - 1) // 2, (height - 1) // 2, width - 2, height - 2
+        fixed = [(low, low), (low, high_y), (high_x, low), (high_x, high_y)]
+        fixed += [(low, mid_y), (mid_x, low), (high_x, mid_y), (mid_x, high_y)]
+        if width == height and width in (7, 11, 19) and len(ids) <= len(fixed):
+            corners, edges = fixed[:4], fixed[4:]
+            self.rng.shuffle(corners)
+            self.rng.shuffle(edges)
+            starts = [geometry.index(x, y) for x, y in corners + edges]
+        else:
+            starts = [cell for cell in range(geometry.size) if (geometry.xs[cell] + geometry.ys[cell]) % 2 == 0]
+            self.rng.shuffle(starts)
+        if len(ids) > len(starts):
+            raise ValueError(f"Can't place {len(ids)} snakes on a {width}x{height} board")
+        for id, start in zip(ids, starts):
+            self.snakes.append(EngineSnake(id, [start] * START_LENGTH, squads.get(id, "")))
+
+        occupied = {snake.body[0] for snake in self.snakes}
+        center = geometry.index(mid_x, mid_y)
+        for snake in self.snakes:
+            head = snake.body[0]
+            x, y = geometry.xs[head], geometry.ys[head]
+            options = [
+                geometry.index(x + dx, y + dy)
+                for dx, dy in ((-1, -1), (-1, 1), (1, -1), (1, 1))
+                if 0 <= x + dx < width and 0 <= y + dy < height
+            ]
+            options = [cell for cell in options if cell not in occupied and cell not in self.food and cell != center]
+            if options:
+                self.food.add(self.rng.choice(options))
+        if center not in occupied:
+            self.food.add(center)
+
+    # Rules
+
+    def alive(self) -> List[EngineSnake]:
+        return [snake for snake in self.snakes if snake.alive]
+
+    def is_over(self) -> bool:
+        alive = self.alive()
+        if self.ruleset == "solo":
+            return not alive
+        if self.ruleset == "squad":
+            return len({snake.squad or snake.id for snake in alive}) <= 1
+        return len(alive) <= 1
+
+    def winner(self) -> Union[str, None]:
+        """Id of the last snake alive (squad name for squads), None on a draw or while the game goes on"""
+        alive = self.alive()
+        if not self.is_over() or not alive:
+            return None
+        if self.ruleset == "squad":
+            return alive[0].squad or alive[0].id
+        return alive[0].id
+
+    def step(self, moves: Dict[str, str]):
+        """Play one turn, moves holding the move of each snake still on the board"""
+        self._move(moves)
+        self._reduce_health()
+        self._damage_hazards()
+        self._feed()
+        self._spawn_food()
+        self._eliminate()
+        if self.ruleset == "squad":
+            self._share_squad_attributes()
+        self.turn += 1
+        if self.ruleset == "royale":
+            self._shrink()
+
+    def _default_move(self, snake: EngineSnake) -> str:
+        """Move of a snake that answered nothing valid: keep going the way it goes, up when it can't tell"""
+        head, neck = snake.body[0], snake.body[1]
+        if head != neck:
+            move = self.geometry.move_between(neck, head)
+            if move:
+                return move
+        return "up"
+
+    def _move(self, moves: Dict[str, str]):
+        table = self.geometry.moves
+        for snake in self.alive():
+            move = moves.get(snake.id)
+            if move not in MOVES:
+                move = self._default_move(snake)
+            snake.body.insert(0, table[snake.body[0]][MOVES.index(move)])
+            snake.body.pop()
+
+    def _reduce_health(self):
+        for snake in self.alive():
+            snake.health -= 1
+
+    def _damage_hazards(self):
+        damage = self.settings.hazardDamagePerTurn
+        if not self.hazards or not damage:
+            return
+        for snake in self.alive():
+            head = snake.body[0]
+            if head in self.hazards and head not in self.food:
+                snake.health = max(snake.health - damage, 0)
+
+    def _feed(self):
+        for food in list(self.food):
+            eaten = False
+            for snake in self.alive():
+                if snake.body[0] == food:
+                    snake.health = START_HEALTH
+                    snake.body.append(snake.body[-1])
+                    eaten = True
+            if eaten:
+                self.food.discard(food)
+
+    def _spawn_food(self):
+        settings = self.settings
+        if len(self.food) < settings.minimumFood:
+            count = settings.minimumFood - len(self.food)
+        elif settings.foodSpawnChance > 0 and self.rng.randrange(100) < settings.foodSpawnChance:
+            count = 1
+        else:
+            return
+        occupied = {cell for snake in self.alive() for cell in snake.body} | self.food
+        free = [cell for cell in range(self.geometry.size) if cell not in occupied]
+        for cell in self.rng.sample(free, min(count, len(free))):
+            self.food.add(cell)
+
+    def _eliminate(self):
+        for snake in self.alive():
+            if snake.health <= 0:
+                self._set_eliminated(snake, ELIMINATED_OUT_OF_HEALTH)
+            elif snake.body[0] < 0:
+                self._set_eliminated(snake, ELIMINATED_OUT_OF_BOUNDS)
+
+        alive = self.alive()
+        allow_squad_bodies = self.ruleset == "squad" and self.settings.squad.allowBodyCollisions
+        collisions = []
+        for snake in alive:
+            head = snake.body[0]
+            if head in snake.body[1:]:
+                collisions.append((snake, ELIMINATED_SELF_COLLISION, snake.id))
+                continue
+            cause = None
+            for other in alive:
+                if other is snake:
+                    continue
+                if allow_squad_bodies and snake.squad and other.squad == snake.squad:
+                    continue
+                if head in other.body[1:]:
+                    cause = (snake, ELIMINATED_COLLISION, other.id)
+                    break
+            if cause is None:
+                for other in alive:
+                    if other is not snake and other.body[0] == head and len(snake.body) <= len(other.body):
+                        cause = (snake, ELIMINATED_HEAD_TO_HEAD, other.id)
+                        break
+            if cause is not None:
+                collisions.append(cause)
+        for snake, cause, by in collisions:
+            self._set_eliminated(snake, cause, by)
+
+        if self.ruleset == "squad" and self.settings.squad.sharedElimination:
+            fallen = {snake.squad for snake in self.snakes if snake.eliminated_turn == self.turn + 1 and snake.squad}
+            for snake in self.alive():
+                if snake.squad in fallen:
+                    self._set_eliminated(snake, ELIMINATED_SQUAD)
+
+    def _set_eliminated(self, snake: EngineSnake, cause: str, by: str = ""):
+        snake.eliminated = cause
+        snake.eliminated_by = by
+        snake.eliminated_turn = self.turn + 1
+
+    def _share_squad_attributes(self):
+        settings = self.settings.squad
+        squads: Dict[str, List[EngineSnake]] = {}
+        for snake in self.alive():
+            if snake.squad:
+                squads.setdefault(snake.squad, []).append(snake)
+        for members in squads.values():
+            if settings.sharedHealth:
+                health = max(snake.health for snake in members)
+                for snake in members:
+                    snake.health = health
+            if settings.sharedLength:
+                length = max(len(snake.body) for snake in members)
+                for snake in members:
+                    snake.body.extend([snake.body[-1]] * (length - len(snake.body)))
+
+    def _shrink(self):
+        """Royale: every shrinkEveryNTurns turns, hazards cover one more row or column from a random side"""
+        every = self.settings.royale.shrinkEveryNTurns
+        if every <= 0 or self.turn % every:
+            return
+        min_x, max_x, min_y, max_y = self.safe_area
+        side = self.rng.randrange(4)
+        if side == 0:
+            min_x += 1
+        elif side == 1:
+            max_x -= 1
+        elif side == 2:
+            min_y += 1
+        else:
+            max_y -= 1
+        self.safe_area = (min_x, max_x, min_y, max_y)
+        geometry = self.geometry
+        self.hazards = {
+            cell
+            for cell in range(geometry.size)
+            if not (min_x <= geometry.xs[cell] <= max_x and min_y <= geometry.ys[cell] <= max_y)
+        }
+
+    # Requests
+
+    def _snake_dict(self, snake: EngineSnake) -> Dict:
+        xs, ys = self.geometry.xs, self.geometry.ys
+        body = [{"x": xs[cell], "y": ys[cell]} for cell in snake.body]
+        return {
+            "id": snake.id,
+            "name": snake.name,
+            "health": snake.health,
+            "body": body,
+            "latency": str(int(snake.latency * 1000)),
+            "head": body[0],
+            "length": len(body),
+            "shout": "",
+            "squad": snake.squad,
+            "customizations": {"color": "#888888", "head": "default", "tail": "default"},
+        }
+
+    def _game_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "ruleset": {"name": self.ruleset, "version": "local", "settings": self.settings.dict()},
+            "map": "standard",
+            "timeout": self.timeout,
+            "source": "custom",
+        }
+
+    def payload(self, you_id: str) -> Dict:
+        """JSON body the official engine would send to snake you_id"""
+        xs, ys = self.geometry.xs, self.geometry.ys
+        snakes = [self._snake_dict(snake) for snake in self.alive()]
+        you = next(
+            (payload for payload in snakes if payload["id"] == you_id),
+            None,
+        )
+        if you is None:
+            you = self._snake_dict(next(snake for snake in self.snakes if snake.id == you_id))
+        return {
+            "game": self._game_dict(),
+            "turn": self.turn,
+            "board": {
+                "height": self.geometry.height,
+                "width": self.geometry.width,
+                "food": [{"x": xs[cell], "y": ys[cell]} for cell in sorted(self.food)],
+                "hazards": [{"x": xs[cell], "y": ys[cell]} for cell in sorted(self.hazards)],
+                "snakes": snakes,
+            },
+            "you": you,
+        }
+
+    def _snake_model(self, snake: EngineSnake) -> Snake:
+        coordinates = self._coordinates
+        body = [coordinates[cell] for cell in snake.body]
+        return Snake.construct(
+            id=snake.id,
+            name=snake.name,
+            health=snake.health,
+            body=body,
+            latency=str(int(snake.latency * 1000)),
+            head=body[0],
+            length=len(body),
+            shout="",
+            squad=snake.squad,
+            customizations=_Customizations.construct(color="#888888", head="default", tail="default"),
+        )
+
+    def board(self) -> Board:
+        coordinates = self._coordinates
+        return Board.construct(
+            height=self.geometry.height,
+            width=self.geometry.width,
+            food=[coordinates[cell] for cell in sorted(self.food)],
+            hazards=[coordinates[cell] for cell in sorted(self.hazards)],
+            snakes=[self._snake_model(snake) for snake in self.alive()],
+        )
+
+    def game(self) -> Game:
+        if self._game is None:
+            ruleset = RuleSet.construct(name=self.ruleset, version="local", settings=self.settings)
+            self._game = Game.construct(
+                id=self.id, ruleset=ruleset, map="standard", timeout=self.timeout, source="custom"
+            )
+        return self._game
+
+    def requests(self) -> Dict[str, Request]:
+        """Request of every snake on the board, sharing one board, built without validation"""
+        board = self.board()
+        game = self.game()
+        return {you.id: Request.construct(game=game, turn=self.turn, board=board, you=you) for you in board.snakes}
+
+
+class ModulePlayer:
+    """
+    Bot module (bazuso, madsnake, smartypants) played in-process: the safe moves, then the smart move
+    when it is one of them, like the /move handler of the bots does.
+    """
+
+    def __init__(self, module, smart: bool = True, seed: int = None):
+        if isinstance(module, str):
+            module = importlib.import_module(f"battlesnake.{module}")
+        self.module = module
+        self.name = module.__name__.rsplit(".", 1)[-1]
+        self.smart = smart
+        self.rng = random.Random(seed)
+
+    def start(self, game: LocalGame, you_id: str):
+        pass
+
+    def move(self, game: LocalGame, request: Request) -> str:
+        damage = request.game.ruleset.settings.hazardDamagePerTurn
+        safe_moves = self.module.get_safe_moves(request.board, request.you, damage)
+        if self.smart:
+            smart_move = self.module.get_smart_moves(request.board, request.you, request.game, QUIET)[1]
+            if smart_move and smart_move in safe_moves:
+                return smart_move
+        return self.rng.choice(safe_moves) if safe_moves else "down"
+
+    def end(self, game: LocalGame, you_id: str):
+        pass
+
+
+class HTTPPlayer:
+    """
+    Bot played over HTTP: an app in-process through the Starlette test client (the whole HTTP stack
+    without a socket), or a server given by url.
+    """
+
+    def __init__(self, app_or_url, name: str = None):
+        if isinstance(app_or_url, str):
+            self.url = app_or_url.rstrip("/")
+            self.client = None
+            self.name = name or self.url
+        else:
+            from fastapi.testclient import TestClient
+
+            self.url = ""
+            self.client = TestClient(app_or_url)
+            self.name = name or "app"
+
+    def _post(self, path: str, payload: Dict) -> Dict:
+        if self.client is not None:
+            return self.client.post(path, json=payload).json()
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read() or b"null")
+
+    def start(self, game: LocalGame, you_id: str):
+        self._post("/start", game.payload(you_id))
+
+    def move(self, game: LocalGame, request: Request) -> str:
+        response = self._post("/move", game.payload(request.you.id))
+        return response.get("move") if isinstance(response, dict) else None
+
+    def end(self, game: LocalGame, you_id: str):
+        self._post("/end", game.payload(you_id))
+
+
+class GameResult:
+    __slots__ = ("winner", "turns", "eliminations", "latencies")
+
+    def __init__(self, game: LocalGame, latencies: Dict[str, List[float]]):
+        self.winner = game.winner()
+        self.turns = game.turn
+        self.eliminations = {
+            snake.id: (snake.eliminated, snake.eliminated_turn, snake.eliminated_by)
+            for snake in game.snakes
+            if snake.eliminated
+        }
+        self.latencies = latencies
+        # Seconds each snake took to answer each move
+
+    def __repr__(self):
+        return f"GameResult(winner: {self.winner}, turns: {self.turns})"
+
+
+def play(
+    players: Dict[str, Union[ModulePlayer, HTTPPlayer]],
+    width: int = 11,
+    height: int = 11,
+    ruleset: str = "standard",
+    settings: _RuleSetSettings = None,
+    squads: Dict[str, str] = None,
+    seed: int = None,
+    max_turns: int = 1000,
+    timeout: int = 500,
+) -> GameResult:
+    """Play one game between players, keyed by snake id"""
+    game = LocalGame(width, height, ruleset, settings, seed, timeout)
+    game.place_snakes(list(players), squads)
+    latencies: Dict[str, List[float]] = {id: [] for id in players}
+    for id, player in players.items():
+        player.start(game, id)
+    while not game.is_over() and game.turn < max_turns:
+        moves = {}
+        for id, request in game.requests().items():
+            begin = time.perf_counter()
+            moves[id] = players[id].move(game, request)
+            elapsed = time.perf_counter() - begin
+            latencies[id].append(elapsed)
+            next(snake for snake in game.snakes if snake.id == id).latency = elapsed
+        game.step(moves)
+    for id, player in players.items():
+        player.end(game, id)
+    return GameResult(game, latencies)
+
+
+def summarize(results: List[GameResult], elapsed: float) -> Dict:
+    """Wins, draws, turns and move latencies over a set of games"""
+    wins: Dict[str, int] = {}
+    latencies: Dict[str, List[float]] = {}
+    for result in results:
+        if result.winner is not None:
+            wins[result.winner] = wins.get(result.winner, 0) + 1
+        for id, values in result.latencies.items():
+            latencies.setdefault(id, []).extend(values)
+
+    def percentile(values: List[float], fraction: float) -> float:
+        values = sorted(values)
+        return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+    return {
+        "games": len(results),
+        "games_per_minute": len(results) / elapsed * 60 if elapsed else 0.0,
+        "draws": sum(1 for result in results if result.winner is None),
+        "wins": wins,
+        "turns": statistics.mean(result.turns for result in results) if results else 0.0,
+        "latency_ms": {
+            id: {
+                "mean": statistics.mean(values) * 1000 if values else 0.0,
+                "p95": percentile(values, 0.95) * 1000,
+                "max": max(values, default=0.0) * 1000,
+            }
+            for id, values in latencies.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play local games between the bots, without the Battlesnake CLI")
+    parser.add_argument("bots", nargs="+", help="Bot modules (bazuso, madsnake, smartypants) or http:// urls")
+    parser.add_argument("-g", "--ruleset", default="standard", choices=RULESETS)
+    parser.add_argument("-W", "--width", type=int, default=11)
+    parser.add_argument("-H", "--height", type=int, default=11)
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--timeout", type=int, default=500, help="Game timeout (ms) given to the bots")
+    parser.add_argument("--safe", action="store_true", help="Play only the safe moves of in-process bots")
+    parser.add_argument("--http", action="store_true", help="Play in-process bots through their HTTP app")
+    parser.add_argument("--hazard-damage", type=int, default=14)
+    parser.add_argument("--shrink-every", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = default_settings(hazard_damage=args.hazard_damage, shrink_every=args.shrink_every)
+    players = {}
+    for position, bot in enumerate(args.bots):
+        if bot.startswith("http"):
+            player = HTTPPlayer(bot)
+        elif args.http:
+            player = HTTPPlayer(importlib.import_module(f"battlesnake.{bot}").api, name=bot)
+        else:
+            player = ModulePlayer(bot, smart=not args.safe, seed=args.seed + position)
+        players[f"{position}-{player.name}"] = player
+    squads = {id: f"squad-{position % 2}" for position, id in enumerate(players)} if args.ruleset == "squad" else None
+
+    begin = time.perf_counter()
+    results = [
+        play(
+            players,
+            args.width,
+            args.height,
+            args.ruleset,
+            settings,
+            squads,
+            seed=args.seed + game,
+            timeout=args.timeout,
+        )
+        for game in range(args.games)
+    ]
+    print(json.dumps(summarize(results, time.perf_counter() - begin), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from fastapi import FastAPI, Response, status
+from typing import Dict, Sequence
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.warmup as warmup
+import importlib
+import os
+import uvicorn
+
+
+BOTS = tuple(filter(None, os.environ.get("BATTLESNAKE_BOTS", "bazuso,madsnake,smartypants").split(",")))
+# Bots served by the host, each one under /<name>
+
+CONFIG = {
+    "host": "0.0.0.0",
+    "log_level": "info",
+    "port": 8000,
+    "timeout_keep_alive": 5,
+}
+
+
+def info_route(info: Dict):
+    async def info_endpoint() -> Dict:
+        return info
+
+    return info_endpoint
+
+
+def create_app(bots: Sequence[str] = BOTS) -> FastAPI:
+    """
+    One app serving every bot under its own prefix (/bazuso/move, /madsnake/move...). The bots share the
+    process: its smart strategy threads, MCTS pool, geometry and transposition tables, game store and
+    metrics, so an idle bot costs no worker of its own.
+    """
+    host = FastAPI(title="Battlesnake host", version="1.0")
+    modules = {name: importlib.import_module(f"battlesnake.{name}") for name in bots}
+
+    @host.get("/", status_code=status.HTTP_200_OK)
+    async def index() -> Dict:
+        return {name: {"path": f"/{name}", **module.INFO} for name, module in modules.items()}
+
+    @host.get("/metrics", status_code=status.HTTP_200_OK)
+    async def get_metrics() -> Response:
+        """Phase histograms of every bot, labelled with its name"""
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    for name, module in modules.items():
+        # The engine asks for the info at the url of the snake, without a trailing slash
+        host.add_api_route(f"/{name}", info_route(module.INFO), methods=["GET"], include_in_schema=False)
+        host.mount(f"/{name}", module.api)
+    # The mounted bots do not get the startup events, the host warms them all up
+    warmup.install(host)
+    return host
+
+
+api = create_app()
+
+
+def main():
+    uvicorn.run("battlesnake.host:api", **CONFIG)
+
+
+if __name__ == "__main__":
+    main()
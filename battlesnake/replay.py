@@ -0,0 +1,121 @@
+from battlesnake.utils.classes import Request
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.recorder import Record, RecordLog
+from typing import Dict, List
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import time
+
+
+class ReplayedTurn:
+    __slots__ = ("game", "turn", "recorded", "replayed", "recorded_time", "replayed_time")
+
+    def __init__(self, game: str, turn: int, recorded: str, replayed: str, recorded_time: float, replayed_time: float):
+        self.game = game
+        self.turn = turn
+        self.recorded = recorded
+        self.replayed = replayed
+        self.recorded_time = recorded_time
+        # Seconds the server took to answer, HTTP decoding included
+        self.replayed_time = replayed_time
+        # Seconds choose_move took in this process
+
+    @property
+    def changed(self) -> bool:
+        return self.recorded != self.replayed
+
+    def __repr__(self):
+        return (
+            f"{self.game} turn {self.turn}: {self.recorded} -> {self.replayed} "
+            f"({self.recorded_time * 1000:.1f}ms -> {self.replayed_time * 1000:.1f}ms)"
+        )
+
+
+async def replay_move(module, record: Record) -> ReplayedTurn:
+    """Play a recorded /move again through the move function of the bot, following the game store like the server"""
+    request = Request.parse_raw(record.request)
+    begin = time.perf_counter()
+    answer = await module.choose_move(request.game, request.board, request.you, request.turn)
+    elapsed = time.perf_counter() - begin
+    return ReplayedTurn(request.game.id, request.turn, record.move(), answer["move"], record.elapsed, elapsed)
+
+
+async def replay_game(module, records: List[Record]) -> List[ReplayedTurn]:
+    """Play the recorded requests of one game in order: /start and /end start and end its record in the game store"""
+    turns = []
+    for record in records:
+        if record.path == "/move":
+            turns.append(await replay_move(module, record))
+            continue
+        request = Request.parse_raw(record.request)
+        key = (request.game.id, request.you.id)
+        if record.path == "/start":
+            GAMES.start(key, request.board, request.game.ruleset.name, request.turn)
+        else:
+            GAMES.end(key)
+    return turns
+
+
+def replay(module, log: RecordLog, game: str = None, turn: int = None) -> List[ReplayedTurn]:
+    """Replay every game of the log, one game, or one turn of it"""
+    if isinstance(module, str):
+        module = importlib.import_module(f"battlesnake.{module}")
+
+    async def run():
+        turns = []
+        for (game_id, _), records in log.games().items():
+            if game is not None and game_id != game:
+                continue
+            if turn is not None:
+                records = [record for record in records if record.path == "/move" and record.payload()["turn"] == turn]
+            turns.extend(await replay_game(module, records))
+        return turns
+
+    return asyncio.run(run())
+
+
+def summarize(turns: List[ReplayedTurn]) -> Dict:
+    def milliseconds(values: List[float]) -> Dict:
+        values = sorted(values)
+        if not values:
+            return {}
+        return {
+            "p50": values[len(values) // 2] * 1000,
+            "p99": values[min(int(len(values) * 0.99), len(values) - 1)] * 1000,
+            "max": values[-1] * 1000,
+        }
+
+    return {
+        "turns": len(turns),
+        "games": len({turn.game for turn in turns}),
+        "changed": sum(turn.changed for turn in turns),
+        "recorded_ms": milliseconds([turn.recorded_time for turn in turns]),
+        "replayed_ms": milliseconds([turn.replayed_time for turn in turns]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the games recorded with BATTLESNAKE_RECORD through a bot")
+    parser.add_argument("log", help="Log written by the recorder")
+    parser.add_argument("bot", help="Bot module replaying the games (bazuso, madsnake, smartypants)")
+    parser.add_argument("-g", "--game", help="Only replay this game id")
+    parser.add_argument("-t", "--turn", type=int, help="Only replay this turn")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Keep the logs of the bot, print every turn")
+    args = parser.parse_args()
+
+    module = importlib.import_module(f"battlesnake.{args.bot}")
+    if not args.verbose:
+        module.LOGGER.setLevel(logging.WARNING)
+    with RecordLog(args.log) as log:
+        turns = replay(module, log, args.game, args.turn)
+    for turn in turns:
+        if args.verbose or turn.changed:
+            print(("CHANGED " if turn.changed else "") + repr(turn))
+    print(json.dumps(summarize(turns), indent=2))
+
+
+if __name__ == "__main__":
+    main()
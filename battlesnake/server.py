@@ -0,0 +1,123 @@
+from importlib.util import find_spec
+import argparse
+import battlesnake.utils.mcts as mcts
+import battlesnake.utils.warmup as warmup
+import logging
+import os
+import signal
+import sys
+import time
+import uvicorn
+
+
+LOOP = "uvloop" if find_spec("uvloop") else "asyncio"
+HTTP = "httptools" if find_spec("httptools") else "h11"
+# Fastest event loop and HTTP parser installed, see the "server" extra
+
+PRODUCTION = {
+    "host": "0.0.0.0",
+    "port": int(os.environ.get("PORT", "8000")),
+    "backlog": 2048,
+    "timeout_keep_alive": 75,
+    "access_log": False,
+    "log_level": "warning",
+    "loop": LOOP,
+    "http": HTTP,
+}
+# The engine reuses its connections between turns and games: keep-alive outlasts the usual 60s idle timeouts.
+# No access log, the metrics count the requests
+
+LOGGER = logging.getLogger("battlesnake.server")
+
+
+def _run_worker(config: uvicorn.Config, sock, cpu: int = None):
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    if mcts.ENABLED:
+        # Each worker has its own rollout processes, started before it serves
+        mcts.warm_up()
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app: str = "battlesnake.host:api", workers: int = None, pin: bool = True, warm: bool = True, **options):
+    """
+    Production server: the app is imported and warmed up once, then the bound socket is shared by `workers`
+    forked processes, each one pinned to its own CPU. The workers inherit the warm state, and the socket only
+    accepts connections once they serve. A worker that dies is started again.
+    """
+    config = uvicorn.Config(app, **{**PRODUCTION, **options})
+    config.load()
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    workers = workers or len(cpus)
+    pin = pin and hasattr(os, "sched_setaffinity") and workers <= len(cpus)
+    mcts.share_cpus(workers)
+    if warm:
+        # Before forking: the workers inherit the imported modules, the tables and the warm app. The MCTS
+        # searches stay in this process, rollout processes started here would be left to every worker
+        begin = time.perf_counter()
+        with mcts.in_process():
+            timings = warmup.warm_up(config.loaded_app)
+        slowest = max(timings, key=timings.get, default="")
+        LOGGER.warning(
+            f"Warmed up {len(timings)} moves in {time.perf_counter() - begin:.2f}s, "
+            f"slowest {slowest} {timings.get(slowest, 0) * 1000:.0f}ms"
+        )
+    else:
+        warmup.ENABLED = False  # Nor on the startup of the workers
+
+    sock = config.bind_socket()
+    LOGGER.warning(f"Serving {app} on {config.host}:{config.port}: {workers} workers, {config.loop}, {config.http}")
+
+    children = {}
+    stopping = False
+
+    def start(index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(config, sock, cpus[index] if pin else None)
+            sys.exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(workers):
+        start(index)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            LOGGER.warning(f"Worker {pid} exited ({status}), starting another")
+            start(index)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Production server: pre-forked workers pinned to CPUs, warmed up")
+    parser.add_argument(
+        "app", nargs="?", default="battlesnake.host:api", help="module:app, or a bot (bazuso, madsnake, smartypants)"
+    )
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes, one per CPU by default")
+    parser.add_argument("--host", default=PRODUCTION["host"])
+    parser.add_argument("-p", "--port", type=int, default=PRODUCTION["port"])
+    parser.add_argument("--no-pin", action="store_true", help="Let the workers run on any CPU")
+    parser.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(message)s")
+    app = args.app if ":" in args.app else f"battlesnake.{args.app}:api"
+    serve(app, args.workers, pin=not args.no_pin, warm=not args.no_warm_up, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
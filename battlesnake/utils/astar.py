@@ -1,163 +1,99 @@
+from array import array
+from battlesnake.utils.bitboard import BitMaze
 from battlesnake.utils.classes import Coordinate
-from tabulate import tabulate
+from battlesnake.utils.geometry import get_geometry
 from typing import List, Tuple, Union
 import heapq
 
 
-class Node:
-    """
-    A node class for A* Pathfinding.
-    """
-
-    def __init__(self, parent=None, position: Tuple[int, int] = None):
-        self.parent = parent
-        self.position: tuple[int, int] = position
-
-        self.g = 0
-        self.h = 0
-        self.f = 0
-
-    def __eq__(self, other):
-        return self.position == other.position
-
-    def __repr__(self):
-        return f"{self.position} - g: {self.g} h: {self.h} f: {self.f}"
-
-    # defining less than for purposes of heap queue
-    def __lt__(self, other):
-        return self.f < other.f
-
-    # defining greater than for purposes of heap queue
-    def __gt__(self, other):
-        return self.f > other.f
-
-
-def return_path(current_node: Node) -> Tuple[int, int]:
-    path = []
-    current = current_node
-    while current is not None:
-        path.append(current.position)
-        current = current.parent
-    return path[::-1]  # Return reversed path
-
-
 def print_board(board: List[List[int]], path: List[Tuple[int, int]] = None):
     if path:
         for step in path:
             board[step[0]][step[1]] = "·"
+    from tabulate import tabulate  # Debug only, not worth importing with every worker
+
     print(tabulate(board, tablefmt="fancy_grid"))
 
 
-def astar(
-    game_state: List[List[int]], start_coord: Coordinate, end_coord: Coordinate, LOGGER
-) -> Union[List[Tuple[int, int]], None]:
-    """
-    Adaptation of https://gist.github.com/ryancollingwood/32446307e976a11a1185a5394d6657bc
+def search(
+    neighbours: Tuple[Tuple[int, ...], ...], blocked: str, distances: array, start: int, end: int
+) -> Union[List[int], None]:
     """
+    A* over flat cell indexes.
 
-    # Adapt Params to A* algorithm
-    start = (start_coord.x, start_coord.y)
-    end = (end_coord.x, end_coord.y)
-
-    # Create start and end node
-    start_node = Node(None, start)
-    start_node.g = start_node.h = start_node.f = 0
-    end_node = Node(None, end)
-    end_node.g = end_node.h = end_node.f = 0
-
-    # Initialize both open and closed list
-    open_list = []
-    closed_list = []
-
-    # Heapify the open_list and Add the start node
-    heapq.heapify(open_list)
-    heapq.heappush(open_list, start_node)
-
-    # Adding a stop condition
-    outer_iterations = 0
-    max_iterations = len(game_state[0]) * len(game_state) // 2
-
-    # what squares do we search
-    adjacent_squares = (
-        (0, -1),
-        (0, 1),
-        (-1, 0),
-        (1, 0),
-    )
-
-    # Loop until you find the end
-    while open_list:
-        outer_iterations += 1
-
-        if outer_iterations > max_iterations:
-            # if we hit this point return the path such as it is
-            # it will not contain the destination
-            LOGGER.warning("Giving up on pathfinding too many iterations")
-            path = return_path(current_node)
-            # print_board(maze, path)
-            return path
-
-        # Get the current node
-        current_node = heapq.heappop(open_list)
-        closed_list.append(current_node)
-
-        # Found the goal
-        if current_node == end_node:
-            path = return_path(current_node)
-            # print_board(maze, path)
-            return path
-
-        # Generate children
-        children = []
-
-        for new_position in adjacent_squares:  # Adjacent squares
-
-            # Get node position
-            node_position = (current_node.position[0] + new_position[0], current_node.position[1] + new_position[1])
-
-            # Make sure within range
-            if (
-                node_position[0] > (len(game_state) - 1)
-                or node_position[0] < 0
-                or node_position[1] > len(game_state[-1]) - 1
-                or node_position[1] < 0
-            ):
-                continue
-
-            # Make sure walkable terrain, which is 0
-            if game_state[node_position[0]][node_position[1]] != 0:
-                continue
-
-            # Create new node
-            new_node = Node(current_node, node_position)
-
-            # Append
-            children.append(new_node)
-
-        # Loop through children
-        for child in children:
-            # Child is on the closed list
-            if [closed_child for closed_child in closed_list if closed_child == child]:
+    `blocked` holds one character per cell, "1" meaning not walkable, and `distances` is the distance
+    table row of end, used as heuristic.
+    The open list is a heap of (f, g, index) tuples: instead of a decrease-key, a better entry is pushed
+    and the stale ones are skipped when popped, as the cell is already in the closed array by then.
+    Returns the list of indexes from start to end, or None if end can't be reached.
+    """
+    closed = bytearray(len(blocked))
+    g_score = {start: 0}
+    parent = {start: None}
+    open_heap = [(distances[start], 0, start)]
+
+    while open_heap:
+        _, g, index = heapq.heappop(open_heap)
+        if closed[index]:
+            continue
+
+        if index == end:
+            path = []
+            while index is not None:
+                path.append(index)
+                index = parent[index]
+            return path[::-1]
+
+        closed[index] = 1
+        child_g = g + 1
+        for child in neighbours[index]:
+            if closed[child] or blocked[child] == "1":
                 continue
+            if child_g < g_score.get(child, child_g + 1):
+                g_score[child] = child_g
+                parent[child] = index
+                heapq.heappush(open_heap, (child_g + distances[child], child_g, child))
+    return None
 
-            # Create the f, g, and h values
-            child.g = current_node.g + 1
-            child.h = ((child.position[0] - end_node.position[0]) ** 2) + (
-                (child.position[1] - end_node.position[1]) ** 2
-            )
-            child.f = child.g + child.h
 
-            # Child is already in the open list
-            if child in open_list:
-                idx = open_list.index(child)
-                if child.g < open_list[idx].g:
-                    # update the node in the open list
-                    open_list[idx].g = child.g
-                    open_list[idx].f = child.f
-                    open_list[idx].h = child.h
-            else:
-                # Add the child to the open list
-                heapq.heappush(open_list, child)
+def astar(
+    game_state: Union[BitMaze, List[List[int]]], start_coord: Coordinate, end_coord: Coordinate, LOGGER
+) -> Union[List[Tuple[int, int]], None]:
+    """
+    A* pathfinding over a maze, where walkable terrain is 0.
 
-    LOGGER.warning("Couldn't get a path to destination")
-    return None
+    A BitMaze is read directly from its bitboard. A list maze is indexed as `game_state[x][y]`.
+    Either way the path is returned as a list of (x, y) tuples, from start to end both included.
+    """
+    if isinstance(game_state, BitMaze):
+        rows, columns = game_state.height, game_state.width
+        start_row, start_column, end_row, end_column = start_coord.y, start_coord.x, end_coord.y, end_coord.x
+    else:
+        rows = len(game_state)
+        columns = len(game_state[-1]) if rows else 0
+        start_row, start_column, end_row, end_column = start_coord.x, start_coord.y, end_coord.x, end_coord.y
+
+    if not (0 <= start_row < rows and 0 <= start_column < columns) or not (
+        0 <= end_row < rows and 0 <= end_column < columns
+    ):
+        LOGGER.warning("Couldn't get a path to destination, out of the board")
+        return None
+
+    if isinstance(game_state, BitMaze):
+        geometry = game_state.geometry
+        # One character per cell, index 0 first
+        blocked = format(game_state.blocked, f"0{geometry.size}b")[::-1]
+    else:
+        # Rows of the list maze are laid out as the rows of a board `columns` wide
+        geometry = get_geometry(columns, rows)
+        blocked = "".join("0" if cell == 0 else "1" for row in game_state for cell in row)
+    start = start_row * columns + start_column
+    end = end_row * columns + end_column
+
+    path = search(geometry.neighbours, blocked, geometry.distances[end], start, end)
+    if path is None:
+        LOGGER.warning("Couldn't get a path to destination")
+        return None
+    if isinstance(game_state, BitMaze):
+        return [(geometry.xs[index], geometry.ys[index]) for index in path]
+    return [(geometry.ys[index], geometry.xs[index]) for index in path]
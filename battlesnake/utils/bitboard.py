@@ -0,0 +1,147 @@
+from battlesnake.utils.classes import Board, Coordinate
+from battlesnake.utils.geometry import Geometry, get_geometry
+from typing import Callable, Dict, Hashable, List, TypeVar, Union
+
+
+T = TypeVar("T")
+
+
+class SnakeState:
+    """Compact view of a snake: body as flat indexes from head to tail and as a bitboard."""
+
+    __slots__ = ("id", "health", "length", "squad", "body", "head", "mask")
+
+    def __init__(self, id: str, health: int, length: int, squad: str, body: List[int], mask: int = None):
+        self.id = id
+        self.health = health
+        self.length = length
+        self.squad = squad
+        self.body = body
+        self.head = body[0] if body else -1
+        if mask is None:
+            mask = 0
+            for index in body:
+                mask |= 1 << index
+        self.mask = mask
+
+    def __repr__(self):
+        return f"SnakeState({self.id}, health: {self.health}, body: {self.body})"
+
+
+class BitMaze:
+    """Blocked cells of a board as a bitboard, bit `y * width + x` set meaning not walkable."""
+
+    __slots__ = ("geometry", "width", "height", "blocked")
+
+    def __init__(self, geometry: Geometry, blocked: int):
+        self.geometry = geometry
+        self.width = geometry.width
+        self.height = geometry.height
+        self.blocked = blocked
+
+    def is_blocked(self, index: int) -> bool:
+        return bool(self.blocked >> index & 1)
+
+    def to_list(self) -> List[List[int]]:
+        """Maze as the old list of lists, indexed as `maze[y][x]`, for debugging."""
+        return [[self.blocked >> (y * self.width + x) & 1 for x in range(self.width)] for y in range(self.height)]
+
+
+class BoardState:
+    """
+    Board stored as Python int bitboards, cell (x, y) being bit `y * width + x`.
+    Built once per request, so occupancy queries are bit operations instead of scans over coordinates.
+    """
+
+    __slots__ = (
+        "geometry",
+        "width",
+        "height",
+        "size",
+        "full",
+        "edge",
+        "food",
+        "hazards",
+        "heads",
+        "bodies",
+        "snakes",
+        "cache",
+    )
+
+    def __init__(self, geometry: Geometry):
+        self.geometry = geometry
+        self.width = geometry.width
+        self.height = geometry.height
+        self.size = geometry.size
+        self.full = geometry.full
+        self.edge = geometry.edge
+
+        self.food = 0
+        self.hazards = 0
+        self.heads = 0
+        self.bodies = 0
+        self.snakes: Dict[str, SnakeState] = {}
+        self.cache: Dict[Hashable, object] = {}
+        # Analyses of this turn built on first use, like the distance field, see cached
+
+    @classmethod
+    def from_board(cls, board: Board, ruleset: str = "standard") -> "BoardState":
+        state = cls(get_geometry(board.width, board.height, ruleset))
+        index = state.index
+        for food in board.food:
+            state.food |= 1 << index(food)
+        for hazard in board.hazards:
+            state.hazards |= 1 << index(hazard)
+        for snake in board.snakes:
+            state.add_snake(
+                SnakeState(snake.id, snake.health, snake.length, snake.squad, [index(coord) for coord in snake.body])
+            )
+        return state
+
+    def cached(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """Analysis of this turn stored under key, made by factory on first use and reused afterwards"""
+        value = self.cache.get(key)
+        if value is None:
+            value = self.cache[key] = factory()
+        return value
+
+    def add_snake(self, snake: SnakeState):
+        self.snakes[snake.id] = snake
+        self.bodies |= snake.mask
+        if snake.head >= 0:
+            self.heads |= 1 << snake.head
+
+    def index(self, coord: Coordinate) -> int:
+        """Flat index of coord, -1 if it is out of the board."""
+        return self.geometry.index(coord.x, coord.y)
+
+    def coord(self, index: int) -> Coordinate:
+        return Coordinate(x=self.geometry.xs[index], y=self.geometry.ys[index])
+
+    def is_set(self, mask: int, coord: Union[Coordinate, int]) -> bool:
+        """Return true if the bit of coord (or flat index) is set in mask"""
+        index = coord if isinstance(coord, int) else self.index(coord)
+        return index >= 0 and bool(mask >> index & 1)
+
+    def maze(
+        self,
+        you_head: int = -1,
+        hazards: bool = True,
+        snakes: bool = True,
+        heads: bool = False,
+        food: bool = False,
+        goal: int = -1,
+    ) -> BitMaze:
+        """Same cells as the old list based maze, without rebuilding the whole grid."""
+        blocked = self.food if food else 0
+        if goal >= 0:
+            blocked &= ~(1 << goal)
+        if hazards:
+            blocked |= self.hazards
+        if snakes:
+            for snake in self.snakes.values():
+                if heads and snake.head != you_head and snake.head >= 0:
+                    blocked |= snake.mask & ~(1 << snake.head)
+                else:
+                    blocked |= snake.mask
+        return BitMaze(self.geometry, blocked)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, PrivateAttr
+from typing import Any, List
 
 
 class _Squad(BaseModel):
@@ -136,6 +136,9 @@ class Board(BaseModel):
     # Array of Battlesnake Objects representing all Battlesnakes remaining on the game board
     # Including yourself if you haven't been eliminated
 
+    _state: Any = PrivateAttr(default=None)
+    # Bitboard representation of this board, built once on first use (see snakebrain.get_board_state)
+
 
 class Request(BaseModel):
     game: Game
@@ -0,0 +1,129 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.fields import release_times
+from battlesnake.utils.geometry import MOVES
+from typing import Dict, List, Tuple
+
+
+def articulation_points(state: BoardState, free: int) -> Tuple[int, Dict[int, List[int]]]:
+    """
+    Cells splitting the free cells in several regions (Tarjan, one iterative depth first search per region),
+    as a bitboard, and for each of them the sizes of the regions left without it.
+    """
+    neighbours = state.geometry.neighbours
+    size = state.size
+    order = [0] * size
+    low = [0] * size
+    counts = [0] * size
+    # Discovery order, lowest order reachable through a back edge, and cells of the subtree of each cell
+    pieces: Dict[int, List[int]] = {}
+    points = 0
+    counter = 0
+    remaining = free
+    while remaining:
+        root = (remaining & -remaining).bit_length() - 1
+        counter += 1
+        order[root] = low[root] = counter
+        counts[root] = 1
+        visited = [root]
+        stack = [(root, -1, iter(neighbours[root]))]
+        while stack:
+            cell, parent, children = stack[-1]
+            for child in children:
+                if not free >> child & 1:
+                    continue
+                if not order[child]:
+                    counter += 1
+                    order[child] = low[child] = counter
+                    counts[child] = 1
+                    visited.append(child)
+                    stack.append((child, cell, iter(neighbours[child])))
+                    break
+                if child != parent and order[child] < low[cell]:
+                    low[cell] = order[child]
+            else:
+                stack.pop()
+                if parent >= 0:
+                    if low[cell] < low[parent]:
+                        low[parent] = low[cell]
+                    counts[parent] += counts[cell]
+                    if low[cell] >= order[parent]:
+                        # Nothing below cell climbs above parent: without parent its subtree is cut off
+                        pieces.setdefault(parent, []).append(counts[cell])
+
+        region = counts[root]
+        for cell in visited:
+            remaining &= ~(1 << cell)
+            cut = pieces.get(cell)
+            if cut is None:
+                continue
+            if cell == root:
+                if len(cut) < 2:
+                    del pieces[cell]
+                    continue
+            elif region - 1 - sum(cut):
+                cut.append(region - 1 - sum(cut))
+            points |= 1 << cell
+    return points, pieces
+
+
+class Connectivity:
+    """
+    Room left to a snake after each of its moves: the cells it can reach from there, following the bodies
+    as their tails leave, and the chokes of the free space (articulation points) with the regions each one
+    separates. Built with bitboard flood fills and one Tarjan search, for all the moves at once.
+    """
+
+    __slots__ = ("geometry", "free", "areas", "chokes", "pieces")
+
+    def __init__(self, state: BoardState, snake_id: str):
+        geometry = self.geometry = state.geometry
+        released = release_times(state)
+        self.free = state.full & ~(state.bodies & ~released.get(1, 0))
+        # Cells free after the next move: every tail leaves, but a stacked one
+
+        self.areas: Dict[str, int] = dict.fromkeys(MOVES, 0)
+        # Cells reachable after each move, 0 for the moves into a wall or a body
+        snake = state.snakes.get(snake_id)
+        if snake is not None and snake.head >= 0:
+            dilate = geometry.dilate
+            last_release = max(released, default=0)
+            regions: List[Tuple[int, int]] = []
+            # Cells reached from the moves already filled, and their number: a move into one of them has the
+            # same room, up to the turn a tail leaves
+            for move, cell in zip(MOVES, geometry.moves[snake.head]):
+                if cell < 0 or not self.free >> cell & 1:
+                    continue
+                area = next((area for reached, area in regions if reached >> cell & 1), 0)
+                if not area:
+                    blocked = state.bodies & ~released.get(1, 0)
+                    reached = 1 << cell
+                    turn = 1
+                    while True:
+                        turn += 1
+                        blocked &= ~released.get(turn, 0)
+                        grown = dilate(reached) & ~blocked
+                        if grown == reached:
+                            # Nothing new this turn, but a body may still leave later: the fill goes on as long
+                            # as the snake has room to wait for it
+                            if turn > last_release or turn > bin(reached).count("1"):
+                                break
+                            continue
+                        reached = grown
+                    area = bin(reached).count("1")
+                    regions.append((reached, area))
+                self.areas[move] = area
+
+        self.chokes, self.pieces = articulation_points(state, self.free)
+
+    def is_choke(self, cell: int) -> bool:
+        """True if entering cell cuts the free space in several regions"""
+        return cell >= 0 and bool(self.chokes >> cell & 1)
+
+    def largest_piece(self, cell: int) -> int:
+        """Largest of the regions a choke separates, 0 if cell is no choke"""
+        return max(self.pieces.get(cell, ()), default=0)
+
+
+def get_connectivity(state: BoardState, snake_id: str) -> Connectivity:
+    """Connectivity of the moves of a snake"""
+    return state.cached(("connectivity", snake_id), lambda: Connectivity(state, snake_id))
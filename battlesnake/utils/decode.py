@@ -0,0 +1,168 @@
+from battlesnake.utils.bitboard import BoardState, SnakeState
+from battlesnake.utils.classes import Board, Coordinate, Game, Request, Snake
+from battlesnake.utils.geometry import get_geometry
+from fastapi.responses import Response
+from typing import Dict, List, Union
+import os
+
+try:
+    from orjson import dumps, loads
+except ImportError:  # orjson is an optional dependency, see the "fast" extra
+    from json import dumps as json_dumps, loads
+
+    def dumps(content) -> bytes:
+        return json_dumps(content, separators=(",", ":")).encode()
+
+
+FAST_DECODE = os.environ.get("BATTLESNAKE_FAST_DECODE", "0") == "1"
+# Opt-in: decode /move bodies with decode_move instead of having FastAPI validate the models
+
+
+class FastSnake:
+    """
+    Stand-in for classes.Snake decoded without validation.
+    The body is kept as flat indexes in the board state, Coordinates are only built if asked for.
+    """
+
+    __slots__ = (
+        "_raw",
+        "_body",
+        "_model",
+        "id",
+        "name",
+        "health",
+        "length",
+        "latency",
+        "shout",
+        "squad",
+        "head",
+        "neck",
+        "tail",
+    )
+
+    def __init__(self, raw: Dict):
+        self._raw = raw
+        self._body = None
+        self._model = None
+        self.id = raw["id"]
+        self.name = raw.get("name", "")
+        self.health = raw["health"]
+        self.length = raw.get("length", len(raw["body"]))
+        self.latency = raw.get("latency", "")
+        self.shout = raw.get("shout", "")
+        self.squad = raw.get("squad", "")
+        body = raw["body"]
+        head = raw.get("head") or body[0]
+        self.head = Coordinate.construct(x=head["x"], y=head["y"])
+        # Second and last segments, what the game store needs to follow the snake between turns
+        neck, tail = body[1] if len(body) > 1 else body[0], body[-1]
+        self.neck = Coordinate.construct(x=neck["x"], y=neck["y"])
+        self.tail = Coordinate.construct(x=tail["x"], y=tail["y"])
+
+    @property
+    def body(self) -> List[Coordinate]:
+        if self._body is None:
+            self._body = [Coordinate.construct(x=coord["x"], y=coord["y"]) for coord in self._raw["body"]]
+        return self._body
+
+    def model(self) -> Snake:
+        """Fully validated classes.Snake"""
+        if self._model is None:
+            self._model = Snake.parse_obj(self._raw)
+        return self._model
+
+    def __repr__(self):
+        return f"FastSnake({self.id}, health: {self.health}, length: {self.length})"
+
+
+class FastBoard:
+    """Stand-in for classes.Board holding the bitboard state built straight from the raw body."""
+
+    __slots__ = ("_raw", "_food", "_hazards", "_model", "_state", "width", "height", "snakes")
+
+    def __init__(self, raw: Dict, ruleset: str = "standard"):
+        self._raw = raw
+        self._food = None
+        self._hazards = None
+        self._model = None
+        self.width = width = raw["width"]
+        self.height = raw["height"]
+        self.snakes = [FastSnake(snake) for snake in raw["snakes"]]
+
+        state = BoardState(get_geometry(width, self.height, ruleset))
+        for coord in raw["food"]:
+            state.food |= 1 << (coord["y"] * width + coord["x"])
+        for coord in raw["hazards"]:
+            state.hazards |= 1 << (coord["y"] * width + coord["x"])
+        for snake in raw["snakes"]:
+            state.add_snake(
+                SnakeState(
+                    snake["id"],
+                    snake["health"],
+                    snake.get("length", len(snake["body"])),
+                    snake.get("squad", ""),
+                    [coord["y"] * width + coord["x"] for coord in snake["body"]],
+                )
+            )
+        self._state = state
+
+    @property
+    def food(self) -> List[Coordinate]:
+        if self._food is None:
+            self._food = [Coordinate.construct(x=coord["x"], y=coord["y"]) for coord in self._raw["food"]]
+        return self._food
+
+    @property
+    def hazards(self) -> List[Coordinate]:
+        if self._hazards is None:
+            self._hazards = [Coordinate.construct(x=coord["x"], y=coord["y"]) for coord in self._raw["hazards"]]
+        return self._hazards
+
+    def model(self) -> Board:
+        """Fully validated classes.Board, sharing the already built state"""
+        if self._model is None:
+            self._model = Board.parse_obj(self._raw)
+            self._model._state = self._state
+        return self._model
+
+
+class MoveRequest:
+    """Decoded /move body. The Game model is small and only built on first access."""
+
+    __slots__ = ("_raw", "_game", "turn", "ruleset", "timeout", "board", "you")
+
+    def __init__(self, raw: Dict):
+        self._raw = raw
+        self._game = None
+        game = raw["game"]
+        self.turn = raw.get("turn", 0)
+        self.ruleset = game["ruleset"]["name"]
+        self.timeout = game["timeout"]
+        self.board = FastBoard(raw["board"], self.ruleset)
+
+        you_id = raw["you"]["id"]
+        self.you = next((snake for snake in self.board.snakes if snake.id == you_id), None) or FastSnake(raw["you"])
+
+    @property
+    def game(self) -> Game:
+        if self._game is None:
+            self._game = Game.parse_obj(self._raw["game"])
+        return self._game
+
+    def model(self) -> Request:
+        """Fully validated classes.Request, for strategies that need the real models"""
+        return Request(game=self.game, turn=self.turn, board=self.board.model(), you=self.you.model())
+
+
+def decode_move(body: Union[bytes, str]) -> MoveRequest:
+    """Parse a raw /move body straight into the compact board representation"""
+    return MoveRequest(loads(body))
+
+
+class MoveResponse(Response):
+    """JSON response encoded directly (orjson when installed), skipping the validation and encoding of FastAPI"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,230 @@
+from array import array
+from battlesnake.utils.bitboard import BoardState
+from typing import Dict, Iterable, List, Union
+
+
+UNREACHABLE = 0xFFFF
+# Distance of the cells a snake can't reach
+
+
+def body_release(state: BoardState) -> Dict[int, int]:
+    """
+    Turns after which each body cell is free: a segment `i` cells from the head of a body of length `n`
+    is left after `n - i` turns, a stacked tail (a snake that just ate) one turn later.
+    """
+    turns: Dict[int, int] = {}
+    for snake in state.snakes.values():
+        length = len(snake.body)
+        for position, cell in enumerate(snake.body):
+            turns[cell] = max(turns.get(cell, 0), length - position)
+    return turns
+
+
+def release_times(state: BoardState) -> Dict[int, int]:
+    """Bitboards of the body cells freed after each number of turns"""
+
+    def build() -> Dict[int, int]:
+        released: Dict[int, int] = {}
+        for snake in state.snakes.values():
+            body = snake.body
+            length = len(body)
+            for position, cell in enumerate(body):
+                # A stacked segment leaves with the first of its copies
+                if not position or body[position - 1] != cell:
+                    released[length - position] = released.get(length - position, 0) | 1 << cell
+        return released
+
+    return state.cached("release_times", build)
+
+
+class DistanceField:
+    """
+    Path distance from the head of every snake to every cell, and the snake getting there first (Voronoi).
+    The breadth first search of each snake is kept as its rings, one bitboard of new cells per turn, and is
+    only grown as far as the queries need: a distance or the closest head costs a few bit operations per
+    turn, the territories grow every search to the end. Bodies block the cells until their tail has left
+    them. A cell reached first by several snakes goes to the longest one, and stays contested between
+    snakes of the same length.
+    """
+
+    __slots__ = (
+        "geometry",
+        "ids",
+        "slots",
+        "heads",
+        "lengths",
+        "rings",
+        "reached",
+        "done",
+        "blocked",
+        "released",
+        "last_release",
+        "_owned",
+        "_contested",
+    )
+
+    def __init__(self, state: BoardState):
+        self.geometry = state.geometry
+        snakes = [snake for snake in state.snakes.values() if snake.head >= 0]
+        self.ids = tuple(snake.id for snake in snakes)
+        self.slots = {id: slot for slot, id in enumerate(self.ids)}
+        self.heads = tuple(snake.head for snake in snakes)
+        self.lengths = tuple(len(snake.body) for snake in snakes)
+
+        self.rings: List[List[int]] = [[1 << snake.head] for snake in snakes]
+        # Cells each snake reaches after 0, 1, 2... turns and not before, by slot
+        self.reached = [1 << snake.head for snake in snakes]
+        self.done = [False] * len(snakes)
+        # Union of the rings so far, and whether the search is over
+
+        self.released = release_times(state)
+        self.last_release = max(self.released, default=0)
+        self.blocked = [state.bodies]
+        # Cells still taken by a body after each number of turns
+        self._owned: Union[List[int], None] = None
+        self._contested = 0
+
+    def _blocked(self, turn: int) -> int:
+        blocked = self.blocked
+        while len(blocked) <= turn:
+            blocked.append(blocked[-1] & ~self.released.get(len(blocked), 0))
+        return blocked[turn]
+
+    def _grow(self, slot: int, goal: int = 0):
+        """Grow the search of slot until it reaches a cell of goal, to its end when goal is empty"""
+        if self.done[slot]:
+            return
+        rings, reached = self.rings[slot], self.reached[slot]
+        dilate = self.geometry.dilate
+        while not reached & goal:
+            turn = len(rings)
+            new = dilate(reached) & ~self._blocked(turn) & ~reached
+            if not new and turn >= self.last_release:
+                self.done[slot] = True
+                break
+            rings.append(new)
+            reached |= new
+        self.reached[slot] = reached
+
+    def _first_ring(self, slot: int, mask: int, last: bool = False) -> int:
+        """Turn of the first (or last) ring of slot holding a cell of mask, -1 if none does"""
+        self._grow(slot, 0 if last else mask)
+        if not self.reached[slot] & mask:
+            return -1
+        rings = self.rings[slot]
+        turns = range(len(rings) - 1, -1, -1) if last else range(len(rings))
+        return next(turn for turn in turns if rings[turn] & mask)
+
+    def distance(self, snake_id: str, cell: int) -> int:
+        """Turns for the snake to reach cell, UNREACHABLE if it can't"""
+        slot = self.slots.get(snake_id)
+        if slot is None or cell < 0:
+            return UNREACHABLE
+        turn = self._first_ring(slot, 1 << cell)
+        return turn if turn >= 0 else UNREACHABLE
+
+    def distance_table(self, snake_id: str) -> array:
+        """Distance of every cell from the snake, filled cell by cell: for debugging and tests"""
+        distances = array("H", [UNREACHABLE]) * self.geometry.size
+        slot = self.slots.get(snake_id)
+        if slot is not None:
+            self._grow(slot)
+            for turn, ring in enumerate(self.rings[slot]):
+                while ring:
+                    low = ring & -ring
+                    distances[low.bit_length() - 1] = turn
+                    ring ^= low
+        return distances
+
+    @property
+    def owned(self) -> List[int]:
+        """Bitboards of the cells each snake gets to first, by slot"""
+        if self._owned is None:
+            self._claim()
+        return self._owned
+
+    @property
+    def contested(self) -> int:
+        """Bitboard of the cells several snakes of the same length get to first"""
+        if self._owned is None:
+            self._claim()
+        return self._contested
+
+    def _claim(self):
+        """Hand the cells to the snakes reaching them first, turn after turn, the longest first"""
+        groups: Dict[int, List[int]] = {}
+        for slot, length in enumerate(self.lengths):
+            groups.setdefault(length, []).append(slot)
+            self._grow(slot)
+        groups = [groups[length] for length in sorted(groups, reverse=True)]
+        owned = [1 << head for head in self.heads]
+        claimed = 0
+        for head in self.heads:
+            claimed |= 1 << head
+        contested = 0
+        for turn in range(1, max((len(rings) for rings in self.rings), default=0)):
+            for group in groups:
+                seen = duplicated = 0
+                for slot in group:
+                    rings = self.rings[slot]
+                    new = rings[turn] & ~claimed if turn < len(rings) else 0
+                    duplicated |= seen & new
+                    seen |= new
+                for slot in group:
+                    rings = self.rings[slot]
+                    if turn < len(rings):
+                        owned[slot] |= rings[turn] & ~claimed & ~duplicated
+                contested |= duplicated
+                claimed |= seen
+        self._owned, self._contested = owned, contested
+
+    def owner(self, cell: int) -> Union[str, None]:
+        """Id of the snake reaching cell first, None if nobody or several snakes do"""
+        if cell >= 0:
+            for slot, owned in enumerate(self.owned):
+                if owned >> cell & 1:
+                    return self.ids[slot]
+        return None
+
+    def territory(self, snake_id: str) -> int:
+        """Number of cells the snake reaches first"""
+        slot = self.slots.get(snake_id)
+        return bin(self.owned[slot]).count("1") if slot is not None else 0
+
+    def head_distance(self, snake_id: str, other_id: str) -> int:
+        """Turns for the snake to reach the head of other: one more than to the closest cell next to it"""
+        slot, other = self.slots.get(snake_id), self.slots.get(other_id)
+        if slot is None or other is None:
+            return UNREACHABLE
+        mask = 0
+        for cell in self.geometry.neighbours[self.heads[other]]:
+            mask |= 1 << cell
+        turn = self._first_ring(slot, mask)
+        return turn + 1 if turn >= 0 else UNREACHABLE
+
+    def nearest(self, snake_id: str, cells: Iterable[int]) -> List[int]:
+        """Reachable cells at the smallest distance from the snake, in the given order (every tie is kept)"""
+        return self._extreme(snake_id, cells, False)
+
+    def furthest(self, snake_id: str, cells: Iterable[int]) -> List[int]:
+        """Reachable cells at the largest distance from the snake, in the given order (every tie is kept)"""
+        return self._extreme(snake_id, cells, True)
+
+    def _extreme(self, snake_id: str, cells: Iterable[int], last: bool) -> List[int]:
+        slot = self.slots.get(snake_id)
+        cells = [cell for cell in cells if cell >= 0]
+        if slot is None or not cells:
+            return []
+        mask = 0
+        for cell in cells:
+            mask |= 1 << cell
+        turn = self._first_ring(slot, mask, last)
+        if turn < 0:
+            return []
+        ring = self.rings[slot][turn]
+        return [cell for cell in cells if ring >> cell & 1]
+
+
+def get_distance_field(state: BoardState) -> DistanceField:
+    """Distance field of the state"""
+    return state.cached("distance_field", lambda: DistanceField(state))
@@ -0,0 +1,237 @@
+from battlesnake.utils.bitboard import BoardState, SnakeState
+from battlesnake.utils.classes import Board, Coordinate, Snake
+from battlesnake.utils.decode import FastBoard, FastSnake
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, Tuple, Union
+import threading
+import time
+
+
+HISTORY_LENGTH = 32
+# Number of past head positions kept per snake
+
+
+class TurnDiff:
+    """What changed on the board since the previous turn, as flat indexes and bitboards."""
+
+    __slots__ = ("heads", "tails", "eliminated", "eaten", "spawned", "hazards_added", "hazards_removed", "rebuilt")
+
+    def __init__(self):
+        self.heads: Dict[str, int] = {}
+        # New head of every snake that moved
+
+        self.tails: Dict[str, List[int]] = {}
+        # Cells freed by the tail of every snake that moved
+
+        self.eliminated: List[str] = []
+        # Snakes no longer on the board
+
+        self.eaten = 0
+        self.spawned = 0
+        self.hazards_added = 0
+        self.hazards_removed = 0
+        # Bitboards of the food eaten, the food spawned, the new hazards and the ones gone (hazards can move)
+
+        self.rebuilt = False
+        # True when the state had to be built from scratch instead of following the previous turn
+
+    def __repr__(self):
+        return f"TurnDiff(heads: {self.heads}, eliminated: {self.eliminated}, rebuilt: {self.rebuilt})"
+
+
+class GameRecord:
+    """State of one game, followed turn after turn from /start to /end."""
+
+    __slots__ = (
+        "key",
+        "ruleset",
+        "turn",
+        "state",
+        "diff",
+        "histories",
+        "elapsed",
+        "moves",
+        "timeouts",
+        "fallbacks",
+        "remaining",
+        "last_seen",
+    )
+
+    def __init__(self, key: Hashable, ruleset: str, state: BoardState, turn: int):
+        self.key = key
+        self.ruleset = ruleset
+        self.turn = turn
+        self.state = state
+        self.diff = TurnDiff()
+        self.diff.rebuilt = True
+        self.histories: Dict[str, Deque[int]] = {
+            id: deque([snake.head], maxlen=HISTORY_LENGTH) for id, snake in state.snakes.items()
+        }
+        self.elapsed = None
+        # Seconds we took to answer the previous /move, to tell our processing time from the network overhead
+
+        self.moves = 0
+        self.timeouts = 0
+        self.fallbacks = 0
+        # /move requests answered, smart strategies that missed the deadline
+        # and safe moves played instead of a smart one
+        self.remaining: Deque[float] = deque(maxlen=HISTORY_LENGTH)
+        # Seconds left before the deadline when we answered the last moves
+
+        self.last_seen = time.monotonic()
+
+
+def _ends(snake: Union[Snake, FastSnake]) -> Tuple[Coordinate, Coordinate, Coordinate]:
+    """Head, neck and tail of snake, without materializing the body of decoded snakes"""
+    if isinstance(snake, FastSnake):
+        return snake.head, snake.neck, snake.tail
+    body = snake.body
+    return body[0], body[1] if len(body) > 1 else body[0], body[-1]
+
+
+def build_state(board: Union[Board, FastBoard], ruleset: str) -> BoardState:
+    if isinstance(board, FastBoard):
+        return board._state
+    return BoardState.from_board(board, ruleset)
+
+
+def advance_state(previous: BoardState, board: Union[Board, FastBoard], ruleset: str) -> Tuple[BoardState, TurnDiff]:
+    """
+    Build the state of board from the state of the previous turn, reading only the ends of each snake,
+    the food and the hazards. Snakes that can't be followed (and any change of board size) are read in full.
+    """
+    geometry = previous.geometry
+    diff = TurnDiff()
+    if board.width != geometry.width or board.height != geometry.height:
+        diff.rebuilt = True
+        return build_state(board, ruleset), diff
+
+    index = geometry.index
+    bits = geometry.bits
+    state = BoardState(geometry)
+
+    seen = set()
+    for snake in board.snakes:
+        seen.add(snake.id)
+        head, neck, tail = _ends(snake)
+        head, neck, tail = index(head.x, head.y), index(neck.x, neck.y), index(tail.x, tail.y)
+        old = previous.snakes.get(snake.id)
+
+        if old is not None and neck == old.head and len(old.body) <= snake.length <= len(old.body) + 1:
+            # The head moved and the tail followed, the tail being stacked when the snake just ate
+            body = [head] + old.body[:-1]
+            if snake.length > len(old.body):
+                body.append(body[-1])
+            if body[-1] == tail:
+                removed = old.body[-1]
+                # The removed cell can still be the tail (it was stacked) or where the head just moved
+                mask = old.mask & ~bits[removed] | bits[head] | bits[tail]
+                state.add_snake(SnakeState(snake.id, snake.health, snake.length, snake.squad, body, mask))
+                diff.heads[snake.id] = head
+                diff.tails[snake.id] = [] if mask & bits[removed] else [removed]
+                continue
+
+        diff.rebuilt = True
+        body = [index(coord.x, coord.y) for coord in snake.body]
+        state.add_snake(SnakeState(snake.id, snake.health, snake.length, snake.squad, body))
+        diff.heads[snake.id] = head
+    diff.eliminated = [id for id in previous.snakes if id not in seen]
+
+    diff.eaten = previous.food & state.heads
+    food = 0
+    for coord in board.food:
+        food |= bits[index(coord.x, coord.y)]
+    diff.spawned = food & ~previous.food
+    state.food = food
+
+    # Read like the food: some maps move their hazards without changing their count
+    hazards = 0
+    for coord in board.hazards:
+        hazards |= bits[index(coord.x, coord.y)]
+    diff.hazards_added = hazards & ~previous.hazards
+    diff.hazards_removed = previous.hazards & ~hazards
+    state.hazards = hazards
+    return state, diff
+
+
+class GameStore:
+    """
+    Per game records, keyed by (game id, snake id) so several of our snakes can play the same game.
+    Bounded: records are evicted on /end, after `ttl` seconds without a request or, least recently
+    used first, when more than `max_games` are stored.
+    """
+
+    def __init__(self, max_games: int = 2048, ttl: float = 120.0):
+        self.max_games = max_games
+        self.ttl = ttl
+        self._records: "OrderedDict[Hashable, GameRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key: Hashable):
+        return key in self._records
+
+    def get(self, key: Hashable) -> Union[GameRecord, None]:
+        return self._records.get(key)
+
+    def start(self, key: Hashable, board: Union[Board, FastBoard], ruleset: str, turn: int = 0) -> GameRecord:
+        record = GameRecord(key, ruleset, build_state(board, ruleset), turn)
+        with self._lock:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            self._evict(record.last_seen)
+        return record
+
+    def update(self, key: Hashable, board: Union[Board, FastBoard], ruleset: str, turn: int) -> GameRecord:
+        """Follow the game to this turn, starting it if /start was missed or the record was evicted"""
+        record = self._records.get(key)
+        if record is None or turn != record.turn + 1:
+            if record is not None and turn == record.turn:
+                record.last_seen = time.monotonic()
+                return record
+            restarted = self.start(key, board, ruleset, turn)
+            if record is not None:
+                # Keep the counters of the game across the rebuild
+                restarted.elapsed, restarted.moves = record.elapsed, record.moves
+                restarted.timeouts, restarted.fallbacks = record.timeouts, record.fallbacks
+                restarted.remaining = record.remaining
+            return restarted
+
+        state, diff = advance_state(record.state, board, ruleset)
+        for id in diff.eliminated:
+            record.histories.pop(id, None)
+        for id, snake in state.snakes.items():
+            history = record.histories.get(id)
+            if history is None:
+                record.histories[id] = deque([snake.head], maxlen=HISTORY_LENGTH)
+            elif history[-1] != snake.head:
+                history.append(snake.head)
+        record.state, record.diff, record.turn = state, diff, turn
+        record.last_seen = time.monotonic()
+        with self._lock:
+            if key in self._records:
+                self._records.move_to_end(key)
+            else:
+                self._records[key] = record
+            self._evict(record.last_seen)
+        return record
+
+    def end(self, key: Hashable) -> Union[GameRecord, None]:
+        with self._lock:
+            return self._records.pop(key, None)
+
+    def _evict(self, now: float):
+        records = self._records
+        while len(records) > self.max_games:
+            records.popitem(last=False)
+        while records:
+            key, oldest = next(iter(records.items()))
+            if now - oldest.last_seen <= self.ttl:
+                break
+            del records[key]
+
+
+GAMES = GameStore()
+# Records of the games played by this worker
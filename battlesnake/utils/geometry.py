@@ -0,0 +1,123 @@
+from array import array
+from functools import lru_cache
+from typing import List, Tuple
+
+
+MOVES = ("up", "down", "left", "right")
+# Order of the entries of Geometry.moves
+
+WRAPPED_RULESETS = ("wrapped",)
+# Rulesets where moving off an edge brings the snake back on the opposite edge
+
+
+class Geometry:
+    """
+    Precomputed tables for a board size, cell (x, y) being index `y * width + x`.
+    Built once per (width, height, ruleset) by get_geometry and shared across games and turns.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "size",
+        "wrapped",
+        "xs",
+        "ys",
+        "bits",
+        "moves",
+        "neighbours",
+        "full",
+        "edge",
+        "first_column",
+        "last_column",
+        "distances",
+    )
+
+    def __init__(self, width: int, height: int, wrapped: bool = False):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.wrapped = wrapped
+
+        self.xs = tuple(index % width for index in range(self.size))
+        self.ys = tuple(index // width for index in range(self.size))
+        self.bits = tuple(1 << index for index in range(self.size))
+
+        # Index reached by each move of MOVES, -1 when it leaves the board
+        moves = []
+        for index in range(self.size):
+            x, y = self.xs[index], self.ys[index]
+            cells = ((x, y + 1), (x, y - 1), (x - 1, y), (x + 1, y))
+            if wrapped:
+                moves.append(tuple((cy % height) * width + cx % width for cx, cy in cells))
+            else:
+                moves.append(tuple(cy * width + cx if 0 <= cx < width and 0 <= cy < height else -1 for cx, cy in cells))
+        self.moves: Tuple[Tuple[int, int, int, int], ...] = tuple(moves)
+        self.neighbours: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(cell for cell in cells if cell >= 0) for cells in self.moves
+        )
+
+        self.full = (1 << self.size) - 1
+        inner = 0
+        if width > 2:
+            for y in range(1, height - 1):
+                inner |= ((1 << (width - 2)) - 1) << (y * width + 1)
+        self.edge = self.full & ~inner
+        # Outer ring of the board
+
+        self.first_column = sum(1 << (y * width) for y in range(height))
+        self.last_column = self.first_column << (width - 1)
+        # Cells of x == 0 and x == width - 1, whose left and right moves leave the board or wrap
+
+        self.distances: List[array] = [self._distance_row(index) for index in range(self.size)]
+        # Manhattan distance between every pair of cells, toroidal on wrapped boards
+
+    def _distance_row(self, index: int) -> array:
+        x, y = self.xs[index], self.ys[index]
+        dx = [abs(x - column) for column in range(self.width)]
+        dy = [abs(y - row) for row in range(self.height)]
+        if self.wrapped:
+            dx = [min(d, self.width - d) for d in dx]
+            dy = [min(d, self.height - d) for d in dy]
+        return array("H", [row + column for row in dy for column in dx])
+
+    def index(self, x: int, y: int) -> int:
+        """Flat index of (x, y), -1 if it is out of the board."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def dilate(self, mask: int) -> int:
+        """Cells of mask plus every cell one move away from them, as bitboards"""
+        width, full = self.width, self.full
+        grown = mask | (mask << width) & full | mask >> width
+        grown |= (mask & ~self.first_column) >> 1 | (mask & ~self.last_column) << 1
+        if self.wrapped:
+            top = self.size - width
+            grown |= mask >> top | (mask & ((1 << width) - 1)) << top
+            grown |= (mask & self.first_column) << (width - 1) | (mask & self.last_column) >> (width - 1)
+        return grown
+
+    def distance(self, start: int, goal: int) -> int:
+        return self.distances[start][goal]
+
+    def move_between(self, start: int, goal: int) -> str:
+        """Name of the move going from start to the neighbour goal, None if they aren't neighbours."""
+        if goal < 0:
+            # Off the board: the moves into a wall are -1 too
+            return None
+        moves = self.moves[start]
+        for position, move in enumerate(MOVES):
+            if moves[position] == goal:
+                return move
+        return None
+
+
+@lru_cache(maxsize=32)
+def _build_geometry(width: int, height: int, ruleset: str) -> Geometry:
+    return Geometry(width, height, wrapped=ruleset in WRAPPED_RULESETS)
+
+
+def get_geometry(width: int, height: int, ruleset: str = "standard") -> Geometry:
+    """Return the shared tables for a board size and ruleset, keyed by (width, height, ruleset)"""
+    return _build_geometry(width, height, ruleset)
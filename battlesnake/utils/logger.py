@@ -1,4 +1,25 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Set, Union
+import atexit
 import logging
+import os
+import queue
+import zlib
+
+
+LOG_PROFILE = os.environ.get("BATTLESNAKE_LOG_PROFILE", "development")
+# "development": every record, formatted and written by the request thread.
+# "production": warnings, plus the records of the sampled and traced games, written by a background thread
+
+SAMPLE_RATE = float(os.environ.get("BATTLESNAKE_LOG_SAMPLE", "0"))
+# Production: fraction of the games logged in full, picked from their id so a game is logged from start to end
+
+TRACED: Set[str] = set(filter(None, os.environ.get("BATTLESNAKE_LOG_TRACE", "").split(",")))
+# Production: ids of the games logged in full, see trace()
+
+GAME: ContextVar[Union[str, None]] = ContextVar("battlesnake_game", default=None)
+# Id of the game of the request being answered
 
 
 # Define custom logging class
@@ -19,7 +40,110 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format + reset,
     }
 
+    def __init__(self):
+        super().__init__()
+        # One formatter per level, built once
+        self.formatters = {level: logging.Formatter(log_fmt) for level, log_fmt in self.FORMATS.items()}
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
+        formatter = self.formatters.get(record.levelno)
+        return formatter.format(record) if formatter else super().format(record)
+
+
+def is_sampled(game_id: str) -> bool:
+    """Whether the game is logged in full: traced, or among the sampled ones"""
+    if game_id in TRACED:
+        return True
+    return SAMPLE_RATE > 0 and zlib.crc32(game_id.encode()) % 10000 < SAMPLE_RATE * 10000
+
+
+class GameSampler(logging.Filter):
+    """Lets warnings through, and the other records of the games logged in full"""
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        game_id = GAME.get()
+        return game_id is not None and is_sampled(game_id)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queues the records as they are: the message is only formatted by the listener thread.
+    Unlike QueueHandler the records are not made picklable, the queue never leaves the process.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def set_game(game_id: str):
+    """Tag the records of the current request with its game"""
+    GAME.set(game_id)
+
+
+def trace(game_id: str, enabled: bool = True):
+    """Log a game in full (production profile), or stop"""
+    if enabled:
+        TRACED.add(game_id)
+    else:
+        TRACED.discard(game_id)
+    for logger in _PRODUCTION:
+        _set_production_level(logger)
+
+
+_PRODUCTION = []
+_LISTENERS = {}
+_HANDLERS = {}
+
+
+@atexit.register
+def stop_listeners():
+    """Write the queued records and stop the background threads"""
+    while _LISTENERS:
+        _LISTENERS.popitem()[1].stop()
+
+
+def _restart_listeners():
+    # Threads don't survive a fork, a forked server worker writes its records from its own thread
+    for name, listener in _LISTENERS.items():
+        listener.queue = _HANDLERS[name].queue = queue.SimpleQueue()
+        listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners)
+
+
+def _set_production_level(logger: logging.Logger):
+    # Without sampled or traced games, debug and info calls stop at the level check
+    logger.setLevel(logging.DEBUG if SAMPLE_RATE > 0 or TRACED else logging.WARNING)
+
+
+def setup_logger(name: str = "BattleSnake", profile: str = None) -> logging.Logger:
+    """The logger of the bots, set up once per name whichever bots are imported"""
+    logger = logging.getLogger(name)
+    if getattr(logger, "profile", None):
+        return logger
+    logger.profile = profile or LOG_PROFILE
+
+    # Create console handler with a higher log level
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+    ch.setFormatter(CustomFormatter())
+
+    if logger.profile == "production":
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, ch, respect_handler_level=True)
+        listener.start()
+        _LISTENERS[name] = listener
+        handler = _HANDLERS[name] = LazyQueueHandler(records)
+        handler.addFilter(GameSampler())
+        logger.addHandler(handler)
+        logger.propagate = False  # Every record goes through the queue
+        _PRODUCTION.append(logger)
+        _set_production_level(logger)
+    else:
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(ch)
+    return logger
@@ -0,0 +1,308 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.geometry import get_geometry
+from battlesnake.utils.search import SearchResult, SearchState, SimSnake, search_budget
+from battlesnake.utils.transposition import MAX_SNAKES
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Union
+import math
+import multiprocessing
+import os
+import random
+import time
+
+
+ENABLED = os.environ.get("BATTLESNAKE_MCTS", "0") == "1"
+# Use MCTS instead of the alpha-beta search in games with at least MIN_SNAKES snakes
+
+MIN_SNAKES = 4
+
+WORKERS = int(os.environ.get("BATTLESNAKE_MCTS_WORKERS", "0")) or os.cpu_count() or 1
+# Processes running rollouts for a /move, the calling one included: 1 runs them in the calling process only.
+# A pre-forked server shares the CPUs out between its workers, see share_cpus
+
+EXPLORATION = 1.4
+# UCB1 exploration constant
+
+ROLLOUT_DEPTH = 30
+# Turns played at random after leaving the tree
+
+RESULT_GRACE = 0.01
+# Seconds waited past the deadline for the workers to send their statistics
+
+REPORT_EVERY = 16
+# Rollouts of the calling process between two updates of the best move so far
+
+
+class Node:
+    """
+    Node of a decoupled UCT tree: each moving snake keeps its own statistics for its moves,
+    children are keyed by the joint move.
+    """
+
+    __slots__ = ("snakes", "moves", "visits", "totals", "count", "children")
+
+    def __init__(self, state: SearchState):
+        self.snakes = [index for index, snake in enumerate(state.snakes) if snake.alive and snake.moving]
+        self.moves = [state.moves(state.snakes[index]) for index in self.snakes]
+        self.visits = [[0] * len(moves) for moves in self.moves]
+        self.totals = [[0.0] * len(moves) for moves in self.moves]
+        self.count = 0
+        self.children: Dict[Tuple[int, ...], Node] = {}
+
+    def select(self, rng: random.Random, exploration: float) -> List[int]:
+        """Position of the move each snake plays, chosen independently by UCB1, untried moves first"""
+        log_count = math.log(self.count) if self.count else 0.0
+        choice = []
+        for visits, totals in zip(self.visits, self.totals):
+            untried = [position for position, count in enumerate(visits) if count == 0]
+            if untried:
+                choice.append(rng.choice(untried))
+                continue
+            scores = [
+                total / count + exploration * math.sqrt(log_count / count) for total, count in zip(totals, visits)
+            ]
+            choice.append(scores.index(max(scores)))
+        return choice
+
+    def update(self, choice: List[int], rewards: List[float]):
+        self.count += 1
+        for position, (snake, move) in enumerate(zip(self.snakes, choice)):
+            self.visits[position][move] += 1
+            self.totals[position][move] += rewards[snake]
+
+
+def _is_over(state: SearchState) -> bool:
+    return not state.snakes[0].alive or sum(1 for snake in state.snakes if snake.alive) <= 1
+
+
+def rewards(state: SearchState) -> List[float]:
+    """Reward of every snake: 0 when eliminated, 1 for the last one alive, else about 0.5 favouring the longest"""
+    alive = [snake for snake in state.snakes if snake.alive]
+    longest = max((len(snake.body) for snake in alive), default=1)
+    if len(alive) == 1 and len(state.snakes) > 1:
+        return [1.0 if snake.alive else 0.0 for snake in state.snakes]
+    return [0.4 + 0.2 * len(snake.body) / longest if snake.alive else 0.0 for snake in state.snakes]
+
+
+def rollout(state: SearchState, rng: random.Random, depth: int = ROLLOUT_DEPTH) -> List[float]:
+    """Play random moves avoiding bodies for up to depth turns, score the position and take the moves back"""
+    undos = []
+    for _ in range(depth):
+        if _is_over(state):
+            break
+        undos.append(state.make(tuple(rng.choice(state.moves(snake)) for snake in state._moving())))
+    result = rewards(state)
+    while undos:
+        state.unmake(undos.pop())
+    return result
+
+
+def iterate(state: SearchState, root: Node, rng: random.Random, exploration: float = EXPLORATION):
+    """One playout: walk the tree, expand a node, roll out from it and back up the rewards"""
+    path = []
+    undos = []
+    node = root
+    while True:
+        if _is_over(state):
+            result = rewards(state)
+            break
+        choice = node.select(rng, exploration)
+        joint = tuple(moves[position] for moves, position in zip(node.moves, choice))
+        path.append((node, choice))
+        undos.append(state.make(joint))
+        child = node.children.get(joint)
+        if child is None:
+            node.children[joint] = Node(state)
+            result = rollout(state, rng)
+            break
+        node = child
+    for node, choice in path:
+        node.update(choice, result)
+    while undos:
+        state.unmake(undos.pop())
+
+
+def snapshot(state: SearchState) -> Tuple:
+    """Picklable description of a position, sent to the worker processes"""
+    geometry = state.geometry
+    snakes = [(snake.id, list(snake.body), snake.health, snake.moving) for snake in state.snakes]
+    return geometry.width, geometry.height, geometry.wrapped, state.food, state.hazards, state.hazard_damage, snakes
+
+
+def restore(description: Tuple) -> SearchState:
+    width, height, wrapped, food, hazards, hazard_damage, snakes = description
+    geometry = get_geometry(width, height, "wrapped" if wrapped else "standard")
+    snakes = [SimSnake(id, slot, body, health, moving) for slot, (id, body, health, moving) in enumerate(snakes)]
+    return SearchState(geometry, food, hazards, hazard_damage, snakes)
+
+
+def run(
+    description: Tuple, deadline: float, seed: int, partial: SearchResult = None
+) -> Tuple[Dict[int, int], Dict[int, float], int]:
+    """
+    Search a position until deadline (time.time(), shared by every process).
+    Returns the visits and total rewards of each of our moves and the number of rollouts. In the calling
+    process, partial.move is kept on our most visited move so far.
+    """
+    state = restore(description)
+    rng = random.Random(seed)
+    root = Node(state)
+    rollouts = 0
+    if 0 in root.snakes:
+        head = state.snakes[0].head
+        while time.time() < deadline:
+            iterate(state, root, rng)
+            rollouts += 1
+            if partial is not None and rollouts % REPORT_EVERY == 0:
+                visits = root.visits[0]
+                move = state.geometry.move_between(head, root.moves[0][visits.index(max(visits))])
+                if move is not None:
+                    partial.move = move
+    if not root.snakes or root.snakes[0] != 0:
+        return {}, {}, rollouts
+    moves = root.moves[0]
+    return dict(zip(moves, root.visits[0])), dict(zip(moves, root.totals[0])), rollouts
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def share_cpus(server_workers: int):
+    """Processes of the searches of each of `server_workers` server processes, so they use every CPU once"""
+    global WORKERS
+    if not int(os.environ.get("BATTLESNAKE_MCTS_WORKERS", "0")):
+        WORKERS = max((os.cpu_count() or 1) // max(server_workers, 1), 1)
+
+
+@contextmanager
+def in_process():
+    """The searches of the block run in the calling process only, no rollout process is started"""
+    global WORKERS
+    workers, WORKERS = WORKERS, 1
+    try:
+        yield
+    finally:
+        WORKERS = workers
+
+
+_POOL = None
+_POOL_PROCESSES = 0
+
+
+def get_pool(processes: int) -> ProcessPoolExecutor:
+    """Rollout processes of this worker, started on first use and kept for the next moves"""
+    global _POOL, _POOL_PROCESSES
+    if _POOL is None or _POOL_PROCESSES != processes:
+        shutdown_pool()
+        _POOL = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        _POOL_PROCESSES = processes
+    return _POOL
+
+
+def warm_up(workers: int = None):
+    """Start the rollout processes now rather than during the first /move"""
+    workers = workers or WORKERS
+    if workers > 1:
+        pool = get_pool(workers - 1)
+        wait([pool.submit(_ping) for _ in range(workers - 1)])
+
+
+def shutdown_pool():
+    global _POOL, _POOL_PROCESSES
+    if _POOL is not None:
+        # search() cancels the rollouts it gave up on, nothing is left queued (cancel_futures needs Python 3.9)
+        _POOL.shutdown(wait=False)
+    _POOL, _POOL_PROCESSES = None, 0
+
+
+def _forget_pool():
+    # The rollout processes belong to the parent, a forked server worker starts its own
+    global _POOL, _POOL_PROCESSES
+    _POOL, _POOL_PROCESSES = None, 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pool)
+
+
+class MCTSResult:
+    __slots__ = ("move", "confidence", "rollouts", "rollouts_per_second", "workers", "visits", "elapsed")
+
+    def __init__(self, move: Union[str, None], visits: Dict[str, int], rollouts: int, workers: int, elapsed: float):
+        self.move = move
+        self.visits = visits
+        total = sum(visits.values())
+        self.confidence = visits[move] / total if move and total else 0.0
+        # Share of the visits of the root that went to the chosen move
+        self.rollouts = rollouts
+        self.rollouts_per_second = rollouts / elapsed if elapsed else 0.0
+        self.workers = workers
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (
+            f"MCTSResult({self.move}, confidence: {self.confidence:.2f}, rollouts: {self.rollouts} "
+            f"({self.rollouts_per_second:.0f}/s on {self.workers} processes), elapsed: {self.elapsed * 1000:.1f}ms)"
+        )
+
+
+def search(state: SearchState, budget: float, workers: int = None, partial: SearchResult = None) -> MCTSResult:
+    """
+    Run the tree search in `workers` processes, this one and the pool, for budget seconds and merge their
+    root statistics. partial.move follows the best move of this process meanwhile.
+    """
+    workers = workers or WORKERS
+    begin = time.perf_counter()
+    deadline = time.time() + budget
+    description = snapshot(state)
+    seed = random.getrandbits(32)
+    futures = []
+    if workers > 1:
+        pool = get_pool(workers - 1)
+        futures = [pool.submit(run, description, deadline, seed + worker) for worker in range(1, workers)]
+    results = [run(description, deadline, seed, partial)]
+    if futures:
+        done, late = wait(futures, timeout=max(deadline - time.time(), 0.0) + RESULT_GRACE)
+        results += [future.result() for future in done if not future.exception()]
+        for future in late:
+            # Still queued behind another search: it would only keep the pool busy
+            future.cancel()
+
+    geometry = state.geometry
+    head = state.snakes[0].head
+    visits: Dict[str, int] = {}
+    rollouts = 0
+    for cell_visits, _, count in results:
+        rollouts += count
+        for cell, count in cell_visits.items():
+            move = geometry.move_between(head, cell)
+            if move is None:
+                continue
+            visits[move] = visits.get(move, 0) + count
+    move = max(visits, key=visits.get) if visits else None
+    return MCTSResult(move, visits, rollouts, workers, time.perf_counter() - begin)
+
+
+def best_move(
+    state: BoardState,
+    you_id: str,
+    timeout: int,
+    hazard_damage: int = 0,
+    latency=None,
+    processing=None,
+    workers: int = None,
+    result: SearchResult = None,
+    deadline: float = None,
+) -> MCTSResult:
+    """
+    Search the move of snake you_id until deadline (time.perf_counter(), by default the budget of the game from
+    now), every snake moving. result.move is updated with the best move so far, like the alpha-beta search does.
+    """
+    if deadline is None:
+        budget = search_budget(timeout, latency, processing)
+    else:
+        budget = max(deadline - time.perf_counter(), 0.0)
+    state = SearchState.from_board_state(state, you_id, hazard_damage, max_opponents=MAX_SNAKES)
+    return search(state, budget, workers, result)
@@ -0,0 +1,264 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Union
+import json
+import os
+import threading
+import time
+
+
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+# Upper bounds (seconds) of the histogram buckets, from 100us to the longest game timeouts
+
+METRICS_DIR = os.environ.get("BATTLESNAKE_METRICS_DIR", "")
+# Directory shared by the workers of a server: each one saves its histograms there and /metrics sums them all.
+# Without it /metrics only shows the worker answering
+
+FLUSH_INTERVAL = 5.0
+# Seconds between two saves of the histograms of a worker
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Bucket counts and sum of the observed times of one phase. Every thread counts in its own shard, so
+    observing takes no lock: the shards are only added up when the histogram is read.
+    """
+
+    __slots__ = ("phase", "_local", "_shards", "_lock")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0] * (len(BUCKETS) + 1) + [0.0]
+            # Counts of each bucket, the last one above every bound, then the sum
+            with self._lock:
+                self._shards.append(shard)
+        shard[bisect_left(BUCKETS, seconds)] += 1
+        shard[-1] += seconds
+
+    def snapshot(self) -> List[float]:
+        total = [0] * (len(BUCKETS) + 1) + [0.0]
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for index, value in enumerate(shard):
+                total[index] += value
+        return total
+
+
+PHASES: Dict[str, Histogram] = {}
+# Histograms by phase, "<bot>/<phase>" when the bot is known
+_PHASES_LOCK = threading.Lock()
+
+BOT: ContextVar[str] = ContextVar("battlesnake_bot", default="")
+# Bot answering the request, labels its phases when several bots share a process
+
+OBSERVING: ContextVar[bool] = ContextVar("battlesnake_observing", default=True)
+# False while the profiler plays a slow turn again: its timings are not the ones of a request
+
+
+def get_histogram(phase: str) -> Histogram:
+    histogram = PHASES.get(phase)
+    if histogram is None:
+        with _PHASES_LOCK:
+            histogram = PHASES.setdefault(phase, Histogram(phase))
+    return histogram
+
+
+def observe(phase: str, seconds: float):
+    if not OBSERVING.get():
+        return
+    bot = BOT.get()
+    name = f"{bot}/{phase}" if bot else phase
+    (PHASES.get(name) or get_histogram(name)).observe(seconds)
+
+
+class span:
+    """Times a block into the histogram of a phase: `with metrics.span("astar"): ...`"""
+
+    __slots__ = ("phase", "begin")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        observe(self.phase, time.perf_counter() - self.begin)
+
+
+##############################################################################################################
+# Requests
+##############################################################################################################
+
+CURRENT: ContextVar[Union[List[float], None]] = ContextVar("battlesnake_request", default=None)
+# [begin, move begin, move end] of the /move being answered, filled by the middleware and the move function
+
+
+def moved(begin: float, end: float):
+    """Called by the move function with its start and end, to split the request in parse, move and serialize"""
+    timings = CURRENT.get()
+    if timings is not None:
+        timings[1] = begin
+        timings[2] = end
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each /move from its first byte to its answer: "parse" until the move function
+    starts, "serialize" from its return until the response starts, "request" for the whole.
+    With a bot name every phase of its requests is labelled with it.
+    """
+
+    def __init__(self, app, bot: str = ""):
+        self.app = app
+        self.bot = bot
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        bot = BOT.set(self.bot) if self.bot else None
+        try:
+            if scope.get("path") == "/move":
+                await self.timed(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            if bot is not None:
+                BOT.reset(bot)
+
+    async def timed(self, scope, receive, send):
+        timings = [time.perf_counter(), 0.0, 0.0]
+        token = CURRENT.set(timings)
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start" and timings[2]:
+                observe("serialize", time.perf_counter() - timings[2])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            CURRENT.reset(token)
+            if timings[1]:
+                observe("parse", timings[1] - timings[0])
+            observe("request", time.perf_counter() - timings[0])
+
+
+##############################################################################################################
+# Exposition
+##############################################################################################################
+
+
+def reset():
+    """Forget every observation, like the ones of a warm-up"""
+    with _PHASES_LOCK:
+        PHASES.clear()
+
+
+def snapshot() -> Dict[str, List[float]]:
+    return {phase: histogram.snapshot() for phase, histogram in list(PHASES.items())}
+
+
+def save(directory: str = METRICS_DIR):
+    """Write the histograms of this worker to the shared directory, replacing its previous save"""
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(snapshot(), file)
+    os.replace(f"{path}.tmp", path)
+
+
+def collect(directory: str = None) -> Dict[str, List[float]]:
+    """Histograms of this worker, added to the ones saved by the other workers when a directory is given"""
+    if not directory:
+        return snapshot()
+    save(directory)
+    total: Dict[str, List[float]] = {}
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            continue  # Being replaced
+        for phase, values in saved.items():
+            values = values if len(values) == len(BUCKETS) + 2 else [0] * (len(BUCKETS) + 2)
+            current = total.setdefault(phase, [0] * (len(BUCKETS) + 1) + [0.0])
+            for index, value in enumerate(values):
+                current[index] += value
+    return total
+
+
+def render(directory: str = METRICS_DIR) -> str:
+    """Prometheus text format of the phase histograms"""
+    lines = [
+        "# HELP battlesnake_phase_seconds Time spent in each phase of the requests",
+        "# TYPE battlesnake_phase_seconds histogram",
+    ]
+    for name, values in sorted(collect(directory).items()):
+        bot, _, phase = name.rpartition("/")
+        labels = f'bot="{bot}",phase="{phase}"' if bot else f'phase="{phase}"'
+        count = 0
+        for bound, value in zip(BUCKETS + (float("inf"),), values):
+            count += value
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'battlesnake_phase_seconds_bucket{{{labels},le="{le}"}} {count}')
+        lines.append(f"battlesnake_phase_seconds_sum{{{labels}}} {values[-1]}")
+        lines.append(f"battlesnake_phase_seconds_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def start_flushing(directory: str = METRICS_DIR, interval: float = FLUSH_INTERVAL):
+    """Save the histograms of this worker every interval, for the workers that are not the one scraped"""
+
+    def flush():
+        while True:
+            time.sleep(interval)
+            try:
+                save(directory)
+            except OSError:
+                pass
+
+    threading.Thread(target=flush, name="metrics", daemon=True).start()
+
+
+def _after_fork():
+    # A forked server worker counts from zero, and saves from its own thread
+    reset()
+    if METRICS_DIR:
+        start_flushing()
+
+
+if METRICS_DIR:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    start_flushing()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,187 @@
+from array import array
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.fields import UNREACHABLE
+from battlesnake.utils.threats import ThreatMap, get_threat_map
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+import heapq
+
+
+class PathTree:
+    """
+    Cheapest paths from one cell to the cells of the board, from a single Dijkstra (or A*) search. A move costs 1,
+    plus `hazard_damage` when it ends in a hazard. Bodies block the cells until their tail has left them,
+    the path moving around next to a body cell until it is free (like DistanceField), and `danger_cost`
+    when an opponent at least as long can be on the cell by then (see ThreatMap).
+
+    Given `targets`, the search stops once every target is settled, or with `nearest` once the cheapest
+    ones are: the cells it didn't settle read as unreachable. Without targets it covers the whole board.
+    """
+
+    __slots__ = ("geometry", "start", "costs", "steps", "parents")
+
+    def __init__(
+        self,
+        state: BoardState,
+        start: int,
+        hazard_damage: int = 0,
+        threats: ThreatMap = None,
+        danger_cost: int = 0,
+        targets: Iterable[int] = None,
+        nearest: bool = False,
+    ):
+        geometry = self.geometry = state.geometry
+        self.start = start
+        size = geometry.size
+        self.costs = array("I", [UNREACHABLE]) * size
+        self.steps = array("H", [UNREACHABLE]) * size
+        self.parents = array("i", [-1]) * size
+        # Cost, number of moves and previous cell of the cheapest path to each cell
+
+        if start < 0:
+            return
+        release = array("H", bytes(2 * size))
+        for snake in state.snakes.values():
+            length = len(snake.body)
+            for position, cell in enumerate(snake.body):
+                if release[cell] < length - position:
+                    release[cell] = length - position
+        neighbours = geometry.neighbours
+        costs, steps, parents = self.costs, self.steps, self.parents
+        costs[start] = 0
+        steps[start] = 0
+
+        pending = -1
+        goals: List[int] = []
+        if targets is not None:
+            goals = [cell for cell in targets if cell >= 0 and cell != start]
+            pending = 0
+            for cell in goals:
+                pending |= 1 << cell
+            if not pending:
+                return
+        # Targets not settled yet, every cell without targets
+        bound = UNREACHABLE
+        # Cost of the cheapest target once settled, with nearest
+
+        hazards = state.hazards if hazard_damage else 0
+        dangers = threats.dangers if threats is not None and danger_cost else None
+        if not hazards and dangers is None:
+            # Every move costs 1: a breadth first search, one ring of cells per move. A body cell next to the
+            # ring waits for the move freeing it
+            waiting: Dict[int, List[Tuple[int, int]]] = {}
+            frontier = [start]
+            step = 0
+            while (frontier or waiting) and pending and step < bound:
+                step += 1
+                ring = []
+                for child, cell in waiting.pop(step, ()):
+                    if steps[child] == UNREACHABLE:
+                        costs[child] = steps[child] = step
+                        parents[child] = cell
+                        ring.append(child)
+                for cell in frontier:
+                    for child in neighbours[cell]:
+                        if steps[child] != UNREACHABLE:
+                            continue
+                        if release[child] <= step:
+                            costs[child] = steps[child] = step
+                            parents[child] = cell
+                            ring.append(child)
+                        else:
+                            waiting.setdefault(release[child], []).append((child, cell))
+                frontier = ring
+                if pending != -1:
+                    for cell in ring:
+                        if pending >> cell & 1:
+                            pending ^= 1 << cell
+                            if nearest:
+                                bound = step
+            return
+
+        # Toward the nearest targets the search is an A*: no path to a target is cheaper than the moves to the
+        # closest one. The furthest target is only known once every one is settled, the estimates wouldn't help
+        rows = [geometry.distances[cell] for cell in goals] if nearest else []
+        extra = [0] * size
+        while hazards:
+            low = hazards & -hazards
+            extra[low.bit_length() - 1] = hazard_damage
+            hazards ^= low
+        done = bytearray(size)
+        heap = [(0, 0, 0, start)]
+        while heap:
+            estimate, cost, step, cell = heap[0]
+            if not pending or estimate > bound:
+                # Early stop: forget the paths found to the cells still waiting in the heap
+                for _, _, _, cell in heap:
+                    if not done[cell]:
+                        costs[cell], steps[cell], parents[cell] = UNREACHABLE, UNREACHABLE, -1
+                break
+            heapq.heappop(heap)
+            if done[cell]:
+                continue
+            done[cell] = 1
+            if pending != -1 and pending >> cell & 1:
+                pending ^= 1 << cell
+                if nearest:
+                    bound = cost
+            step += 1
+            for child in neighbours[cell]:
+                if done[child]:
+                    continue
+                # Moving around until a body cell is free costs a move per turn
+                child_step = release[child] if release[child] > step else step
+                child_cost = cost + child_step - step + 1 + extra[child]
+                if dangers is not None and dangers[child] <= child_step:
+                    child_cost += danger_cost
+                if child_cost < costs[child]:
+                    costs[child] = child_cost
+                    steps[child] = child_step
+                    parents[child] = cell
+                    remaining = min([row[child] for row in rows]) if rows else 0
+                    heapq.heappush(heap, (child_cost + remaining, child_cost, child_step, child))
+
+    def cost(self, cell: int) -> int:
+        """Cost of the cheapest path to cell, UNREACHABLE if there is none"""
+        return self.costs[cell] if cell >= 0 else UNREACHABLE
+
+    def path(self, cell: int) -> Union[List[int], None]:
+        """Cells of the cheapest path from the start to cell, both included. None if cell can't be reached"""
+        if cell < 0 or self.costs[cell] == UNREACHABLE:
+            return None
+        path = []
+        while cell >= 0:
+            path.append(cell)
+            cell = self.parents[cell]
+        return path[::-1]
+
+    def rank(self, cells: Iterable[int], furthest: bool = False) -> List[int]:
+        """
+        Reachable cells from the cheapest (or the most expensive) to reach, the fewest moves (or the most)
+        breaking ties, then the given order
+        """
+        costs, steps = self.costs, self.steps
+        reachable = [cell for cell in cells if cell >= 0 and costs[cell] != UNREACHABLE]
+        return sorted(reachable, key=lambda cell: (costs[cell], steps[cell]), reverse=furthest)
+
+
+def get_path_tree(
+    state: BoardState,
+    snake_id: str,
+    hazard_damage: int = 0,
+    danger_cost: int = 0,
+    targets: Sequence[int] = None,
+    nearest: bool = False,
+) -> PathTree:
+    """Path tree from the head of a snake. A tree of the whole board answers for any targets"""
+    whole = ("path_tree", snake_id, hazard_damage, danger_cost, None, False)
+    if whole in state.cache:
+        return state.cache[whole]
+
+    def build() -> PathTree:
+        snake = state.snakes.get(snake_id)
+        head = snake.head if snake is not None else -1
+        threats = get_threat_map(state, snake_id) if danger_cost else None
+        return PathTree(state, head, hazard_damage, threats, danger_cost, targets, nearest)
+
+    key = ("path_tree", snake_id, hazard_damage, danger_cost, tuple(targets) if targets is not None else None, nearest)
+    return state.cached(key, build)
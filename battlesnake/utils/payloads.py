@@ -0,0 +1,126 @@
+from battlesnake.utils.classes import Request
+from typing import Dict, List, Sequence, Tuple
+import random
+
+
+def make_snake(id: str, body: Sequence[Tuple[int, int]], health: int = 90, squad: str = "") -> Dict:
+    coords = [{"x": x, "y": y} for x, y in body]
+    return {
+        "id": id,
+        "name": id,
+        "health": health,
+        "body": coords,
+        "latency": "100",
+        "head": coords[0],
+        "length": len(coords),
+        "shout": "",
+        "squad": squad,
+        "customizations": {"color": "#888888", "head": "default", "tail": "default"},
+    }
+
+
+def make_payload(
+    snakes: List[Dict],
+    width: int = 11,
+    height: int = 11,
+    food: Sequence[Tuple[int, int]] = (),
+    hazards: Sequence[Tuple[int, int]] = (),
+    you: int = 0,
+    turn: int = 0,
+    ruleset: str = "standard",
+    map: str = "standard",
+    timeout: int = 500,
+    hazard_damage: int = 14,
+    shrink_every: int = 25,
+) -> Dict:
+    """Raw /move body as sent by the game engine"""
+    return {
+        "game": {
+            "id": "game-00fe20da-94ad-11ea-bb37",
+            "ruleset": {
+                "name": ruleset,
+                "version": "v1.2.3",
+                "settings": {
+                    "foodSpawnChance": 15,
+                    "minimumFood": 1,
+                    "hazardDamagePerTurn": hazard_damage,
+                    "royale": {"shrinkEveryNTurns": shrink_every},
+                    "squad": {
+                        "allowBodyCollisions": False,
+                        "sharedElimination": False,
+                        "sharedHealth": False,
+                        "sharedLength": False,
+                    },
+                },
+            },
+            "map": map,
+            "timeout": timeout,
+            "source": "custom",
+        },
+        "turn": turn,
+        "board": {
+            "height": height,
+            "width": width,
+            "food": [{"x": x, "y": y} for x, y in food],
+            "hazards": [{"x": x, "y": y} for x, y in hazards],
+            "snakes": snakes,
+        },
+        "you": snakes[you],
+    }
+
+
+def make_request(*args, **kwargs) -> Request:
+    return Request.parse_obj(make_payload(*args, **kwargs))
+
+
+def random_payload(
+    rng: random.Random,
+    width: int = 11,
+    height: int = 11,
+    snakes: int = 4,
+    length: int = 3,
+    food: int = 5,
+    hazard_rings: int = 0,
+    turn: int = 0,
+    **kwargs,
+) -> Dict:
+    """
+    Raw /move body of a plausible board: snakes laid out as random self avoiding walks,
+    food on free cells and royale hazards covering the outer `hazard_rings` rings.
+    """
+    occupied = set()
+    bodies = []
+    for _ in range(snakes):
+        for _attempt in range(100):
+            body = [(rng.randrange(width), rng.randrange(height))]
+            if body[0] in occupied:
+                continue
+            while len(body) < length:
+                x, y = body[-1]
+                options = [
+                    (nx, ny)
+                    for nx, ny in ((x, y + 1), (x, y - 1), (x - 1, y), (x + 1, y))
+                    if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in occupied and (nx, ny) not in body
+                ]
+                if not options:
+                    break
+                body.append(rng.choice(options))
+            if len(body) == length:
+                occupied.update(body)
+                bodies.append(body)
+                break
+
+    free = [(x, y) for x in range(width) for y in range(height) if (x, y) not in occupied]
+    hazards = [
+        (x, y) for x in range(width) for y in range(height) if min(x, y, width - 1 - x, height - 1 - y) < hazard_rings
+    ]
+    snake_list = [make_snake(f"snake-{index}", body, health=rng.randint(20, 100)) for index, body in enumerate(bodies)]
+    return make_payload(
+        snake_list,
+        width=width,
+        height=height,
+        food=rng.sample(free, min(food, len(free))),
+        hazards=hazards,
+        turn=turn,
+        **kwargs,
+    )
@@ -0,0 +1,128 @@
+from battlesnake.utils.classes import Board, Game, Snake
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.logger import set_game
+from battlesnake.utils.search import SearchResult, search_budget
+from battlesnake.utils.transposition import SEARCH_THREADS
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.profiler as profiler
+import battlesnake.utils.snakebrain as snakebrain
+import contextvars
+import os
+import random
+import time
+
+
+RESPONSE_MARGIN_MS = 15
+MINIMUM_RESPONSE_MS = 30
+# Time kept between our answer and the game timeout, after the network overhead (see search.search_budget).
+# The searches stop earlier (search.SAFETY_MARGIN_MS) so the deadline is only reached when a turn runs late
+
+SMART_THREADS = SEARCH_THREADS
+# Threads running the smart strategies (BATTLESNAKE_SMART_THREADS), so a slow turn doesn't block the other
+# games of the worker
+
+EXECUTOR = ThreadPoolExecutor(max_workers=SMART_THREADS, thread_name_prefix="smart")
+
+
+def _new_executor():
+    # Threads don't survive a fork: a forked server worker needs its own
+    global EXECUTOR
+    EXECUTOR = ThreadPoolExecutor(max_workers=SMART_THREADS, thread_name_prefix="smart")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_new_executor)
+
+
+async def run_with_deadline(function: Callable, *args, deadline: float, LOGGER=None) -> Tuple[Any, bool]:
+    """
+    Run function(*args) in the executor until deadline (time.perf_counter()).
+    Returns (result, timed out), the result being None on timeout or error. A late call keeps running
+    in its thread, its result is dropped. The call sees the context variables of the request (its game).
+    """
+    context = contextvars.copy_context()
+    future = asyncio.get_running_loop().run_in_executor(EXECUTOR, partial(context.run, profiler.wrap(function), *args))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), max(deadline - time.perf_counter(), 0.0)), False
+    except asyncio.TimeoutError:
+        return None, True
+    except Exception as e:
+        if LOGGER:
+            LOGGER.exception("Smart strategy failed: %s", e)
+        return None, False
+
+
+async def choose_move(
+    game: Game,
+    board: Board,
+    you: Snake,
+    turn: int,
+    get_safe_moves: Callable[[Board, Snake, int], List[str]],
+    get_smart_moves: Callable,
+    LOGGER,
+    searching: bool = False,
+) -> Dict:
+    """
+    Answer of a bot to /move: its safe moves first, they are the answer when the smart strategy fails or runs
+    late, then get_smart_moves(board, you, game, LOGGER) in the executor until the deadline of the game,
+    returning (coord, move) or (coord, move, name of the strategy). A `searching` strategy also gets a
+    SearchResult it updates after each depth, its best move so far is played if the strategy runs late, and
+    the time.perf_counter() its search stops at, search_budget() after the request began.
+    Without a safe smart move, the move leaving the most room among the safe ones.
+    """
+    begin_time = time.perf_counter()
+    set_game(game.id)
+    record = GAMES.update((game.id, you.id), board, game.ruleset.name, turn)
+    board._state = record.state
+    deadline = begin_time + search_budget(
+        game.timeout, you.latency, record.elapsed, RESPONSE_MARGIN_MS, MINIMUM_RESPONSE_MS
+    )
+    safe_moves_list = get_safe_moves(board, you, game.ruleset.settings.hazardDamagePerTurn)
+    safe_time = time.perf_counter() - begin_time
+    args = [board, you, game, LOGGER]
+    if searching:
+        result = SearchResult(None, -float("inf"), 0, 0, 0.0)
+        # The search stops on the clock of the request, not of the thread it waited for
+        args += [result, begin_time + search_budget(game.timeout, you.latency, record.elapsed)]
+    smart, timed_out = await run_with_deadline(get_smart_moves, *args, deadline=deadline, LOGGER=LOGGER)
+    smart_coord, smart_move, *strategy = smart or (None, None)
+    smart_time = time.perf_counter() - begin_time
+    if timed_out:
+        record.timeouts += 1
+        smart_move = result.move if searching else None
+        LOGGER.warning("Smart strategy timed out after %.1fms, best so far: %s", smart_time * 1000, smart_move)
+
+    if smart_move and smart_move in safe_moves_list:
+        LOGGER.info("Smart! %s%s (%s)", "".join(f"{name}: " for name in strategy), smart_coord, smart_move)
+        move = smart_move
+    elif safe_moves_list:
+        # Not into a dead end when a move leaves more room
+        move = random.choice(snakebrain.get_roomy_moves(board, you, safe_moves_list))
+        record.fallbacks += 1
+        LOGGER.info("Safe! %s -> %s", safe_moves_list, move)
+    else:
+        LOGGER.critical("No safe moves! Moving down")
+        record.fallbacks += 1
+        move = "down"
+
+    end_time = time.perf_counter()
+    total_time = end_time - begin_time
+    record.elapsed = total_time
+    record.moves += 1
+    record.remaining.append(deadline - time.perf_counter())
+    metrics.observe("safe", safe_time)
+    metrics.observe("smart", smart_time - safe_time)
+    metrics.observe("move", total_time)
+    metrics.moved(begin_time, end_time)
+    LOGGER.debug(
+        "Moved %s in %.2fms (safe: %.2fms, smart: %.2fms)",
+        move,
+        total_time * 1000,
+        safe_time * 1000,
+        (smart_time - safe_time) * 1000,
+    )
+    return {"move": move, "shout": f"{move.upper()} SUUUUUUU"}
@@ -0,0 +1,285 @@
+from battlesnake.utils.gamestore import GAMES
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, List, Union
+import asyncio
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.recorder as recorder
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+if TYPE_CHECKING:  # cProfile and pstats are imported once something is profiled
+    import cProfile
+    import pstats
+
+
+PROFILE_DIR = os.environ.get("BATTLESNAKE_PROFILE_DIR", "")
+# Opt-in: directory of the captured profiles, nothing is profiled when empty
+
+PROFILE_HEADER = b"x-battlesnake-profile"
+# A /move with this header is profiled
+
+SLOW_FRACTION = float(os.environ.get("BATTLESNAKE_PROFILE_SLOW", "0.8"))
+# A /move answered after this fraction of the game timeout is profiled again, 0 to disable
+
+SLOW_INTERVAL = float(os.environ.get("BATTLESNAKE_PROFILE_INTERVAL", "10"))
+# Seconds between two profiles of slow turns, a busy server doesn't spend its time profiling
+
+KEEP = int(os.environ.get("BATTLESNAKE_PROFILE_KEEP", "50"))
+# Captures kept on disk, the oldest are deleted
+
+RERUN_PREFIX = "profile-"
+# Game id prefix of the slow turns played again, their game store record is dropped afterwards
+
+PROFILING: ContextVar[Union["Capture", None]] = ContextVar("battlesnake_profiling", default=None)
+# Capture of the request being profiled, see pipeline.run_with_deadline
+
+NAME = re.compile(r"^[\w.-]+$")
+
+TIMEOUT = re.compile(rb'"timeout"\s*:\s*(\d+)')
+# Game timeout read from a /move body without decoding it
+
+
+class Capture:
+    """
+    cProfile profiles of one request: one for the event loop thread, plus one per call run in another
+    thread (the smart strategy), cProfile only following the thread it was enabled in.
+    """
+
+    __slots__ = ("profiles", "_lock")
+
+    def __init__(self):
+        self.profiles: List["cProfile.Profile"] = []
+        self._lock = threading.Lock()
+
+    def add(self, profile: "cProfile.Profile"):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def call(self, function: Callable, *args):
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            self.add(profile)
+
+    def stats(self) -> Union["pstats.Stats", None]:
+        import pstats
+
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+def wrap(function: Callable) -> Callable:
+    """function, profiled in its thread when the request calling it is profiled"""
+    capture = PROFILING.get()
+    return partial(capture.call, function) if capture is not None else function
+
+
+class ProfileRing:
+    """Captures on disk: <name>.prof (pstats) and <name>.json (why, timings and request body), the newest `keep`"""
+
+    def __init__(self, directory: str, keep: int = KEEP):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self._counter = itertools.count()
+
+    def save(self, stats: "pstats.Stats", meta: Dict, body: bytes) -> str:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._counter)}-{meta['trigger']}"
+        stats.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+        with open(os.path.join(self.directory, f"{name}.json"), "w") as file:
+            json.dump({**meta, "name": name, "body": json.loads(body)}, file)
+        self.trim()
+        return name
+
+    def names(self) -> List[str]:
+        """Captures, oldest first"""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        paths.sort(key=lambda path: (os.path.getmtime(path), path))
+        return [os.path.basename(path)[:-5] for path in paths]
+
+    def trim(self):
+        names = self.names()
+        for name in names[: max(len(names) - self.keep, 0)]:
+            for extension in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name + extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict]:
+        captures = []
+        for name in self.names():
+            try:
+                with open(os.path.join(self.directory, f"{name}.json")) as file:
+                    meta = json.load(file)
+            except (OSError, ValueError):
+                continue
+            meta.pop("body", None)
+            captures.append(meta)
+        return captures
+
+    def path(self, filename: str) -> Union[str, None]:
+        if not NAME.match(filename) or not filename.endswith((".prof", ".json")):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.exists(path) else None
+
+
+async def _respond(send, status: int, content: bytes, content_type: bytes):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(content)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": content})
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling /move requests with cProfile, when they carry the profile header or when
+    they take more than SLOW_FRACTION of the game timeout. A slow turn is only known once answered, so it
+    is played again from its body under the profiler, in a background thread. Captures are listed at
+    GET /profiles and downloaded at GET /profiles/<name>.prof (or .json for the body).
+    The profile of a request includes what the event loop ran meanwhile, like the other requests.
+    """
+
+    def __init__(self, app, directory: str = PROFILE_DIR, slow_fraction: float = SLOW_FRACTION, keep: int = KEEP):
+        self.app = app
+        self.ring = ProfileRing(directory, keep)
+        self.slow_fraction = slow_fraction
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+        self._pid = os.getpid()
+        self._next_slow = 0.0
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        if path.startswith("/profiles") and scope.get("method") == "GET":
+            await self.serve(path, send)
+            return
+        if path != "/move":
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+
+        async def recording_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        if not self._profiling and any(name == PROFILE_HEADER for name, _ in scope.get("headers", ())):
+            # One at a time, cProfile follows a single profile per thread
+            self._profiling = True
+            capture = Capture()
+            token = PROFILING.set(capture)
+            begin = time.perf_counter()
+            try:
+                import cProfile
+
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await self.app(scope, recording_receive, send)
+                finally:
+                    profile.disable()
+                    capture.add(profile)
+            finally:
+                PROFILING.reset(token)
+                self._profiling = False
+            meta = {"trigger": "header", "elapsed": time.perf_counter() - begin}
+            self._submit(self._save, capture, meta, b"".join(chunks))
+            return
+
+        begin = time.perf_counter()
+        await self.app(scope, recording_receive, send)
+        elapsed = time.perf_counter() - begin
+        if self.slow_fraction > 0 and time.monotonic() >= self._next_slow:
+            body = b"".join(chunks)
+            match = TIMEOUT.search(body)
+            timeout = int(match.group(1)) / 1000 if match else None
+            if timeout and elapsed > timeout * self.slow_fraction:
+                self._next_slow = time.monotonic() + SLOW_INTERVAL
+                meta = {"trigger": "slow", "elapsed": elapsed, "timeout": timeout}
+                self._submit(self._rerun, scope, body, meta)
+
+    def _submit(self, function: Callable, *args):
+        if self._pid != os.getpid():  # Forked server worker, the thread stayed in the parent
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+            self._pid = os.getpid()
+        self._executor.submit(function, *args)
+
+    def _save(self, capture: Capture, meta: Dict, body: bytes):
+        stats = capture.stats()
+        if stats is not None:
+            self.ring.save(stats, meta, body)
+
+    def _rerun(self, scope: Dict, body: bytes, meta: Dict):
+        """Play the turn again under the profiler, as a game of its own so the game store of the real one is kept"""
+        payload = json.loads(body)
+        payload["game"]["id"] = RERUN_PREFIX + payload["game"]["id"]
+        rerun_body = json.dumps(payload).encode()
+        scope = {
+            **scope,
+            "headers": [(name, value) for name, value in scope.get("headers", ()) if name != b"content-length"],
+        }
+        scope["headers"].append((b"content-length", str(len(rerun_body)).encode()))
+
+        async def receive():
+            return {"type": "http.request", "body": rerun_body, "more_body": False}
+
+        async def send(message):
+            pass
+
+        async def run():
+            # Neither in the metrics nor in the recordings, the real turn already is
+            tokens = PROFILING.set(capture), metrics.OBSERVING.set(False), recorder.RECORDING.set(False)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                for variable, token in zip((PROFILING, metrics.OBSERVING, recorder.RECORDING), tokens):
+                    variable.reset(token)
+
+        capture = Capture()
+        begin = time.perf_counter()
+        capture.call(asyncio.run, run())
+        meta["rerun"] = time.perf_counter() - begin
+        GAMES.end((payload["game"]["id"], payload["you"]["id"]))
+        self._save(capture, meta, body)
+
+    async def serve(self, path: str, send):
+        parts = path.rstrip("/").split("/")
+        if len(parts) == 2:
+            await _respond(send, 200, json.dumps(self.ring.list()).encode(), b"application/json")
+            return
+        filename = self.ring.path(parts[2]) if len(parts) == 3 else None
+        if filename is None:
+            await _respond(send, 404, b'{"detail":"Not Found"}', b"application/json")
+            return
+        with open(filename, "rb") as file:
+            content = file.read()
+        content_type = b"application/json" if filename.endswith(".json") else b"application/octet-stream"
+        await _respond(send, 200, content, content_type)
@@ -0,0 +1,220 @@
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Tuple, Union
+import atexit
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+
+RECORD_PATH = os.environ.get("BATTLESNAKE_RECORD", "")
+# Opt-in: log file of the /start, /move and /end requests of the bots, nothing is recorded when empty
+
+RECORDED_PATHS = {"/start": 0, "/move": 1, "/end": 2}
+KINDS = {kind: path for path, kind in RECORDED_PATHS.items()}
+
+MAGIC = 0xB5AE
+HEADER = struct.Struct("<HBdfII")
+# Magic, kind, unix time, seconds taken to answer, length of the request in the compressed data, compressed length.
+# A record is the header followed by zlib(request body + response body)
+
+COMPRESSION_LEVEL = 6
+
+RECORDING: ContextVar[bool] = ContextVar("battlesnake_recording", default=True)
+# Cleared for the requests that are not games, like the warm-up of the server
+
+
+class RecordWriter:
+    """
+    Appends records to the log from a background thread: the request path only queues the bodies,
+    compression and disk writes happen in the writer. Each record is one write on a file opened in append
+    mode, so the workers of a server can share a log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.written = 0
+        self.start()
+
+    def start(self):
+        self._queue: "queue.SimpleQueue[Union[Tuple, None]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def write(self, kind: int, when: float, elapsed: float, request: bytes, response: bytes):
+        self._queue.put((kind, when, elapsed, request, response))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, when, elapsed, request, response = item
+            data = zlib.compress(request + response, COMPRESSION_LEVEL)
+            os.write(self._fd, HEADER.pack(MAGIC, kind, when, elapsed, len(request), len(data)) + data)
+            self.written += 1
+
+    def close(self):
+        """Write what is queued and close the log"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            os.close(self._fd)
+
+
+_WRITERS: Dict[str, RecordWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer(path: str) -> RecordWriter:
+    """Writer of the log at path for this process, started on first use and flushed at exit"""
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(path)
+        if writer is None:
+            writer = _WRITERS[path] = RecordWriter(path)
+            atexit.register(writer.close)
+        return writer
+
+
+def _restart_writers():
+    # Threads don't survive a fork, a forked server worker writes from its own thread
+    for writer in _WRITERS.values():
+        writer.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_writers)
+
+
+class RecorderMiddleware:
+    """ASGI middleware recording the body, the answer and the time taken of every /start, /move and /end"""
+
+    def __init__(self, app, path: str = RECORD_PATH):
+        self.app = app
+        self.writer = get_writer(path)
+
+    async def __call__(self, scope, receive, send):
+        kind = RECORDED_PATHS.get(scope.get("path")) if scope["type"] == "http" else None
+        if kind is None or not RECORDING.get():
+            await self.app(scope, receive, send)
+            return
+
+        begin = time.perf_counter()
+        request = []
+        response = []
+
+        async def recording_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                request.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.body":
+                response.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            elapsed = time.perf_counter() - begin
+            self.writer.write(kind, time.time(), elapsed, b"".join(request), b"".join(response))
+
+
+class Record:
+    __slots__ = ("offset", "kind", "time", "elapsed", "_log", "_split", "_start", "_end", "_data")
+
+    def __init__(self, log: mmap.mmap, offset: int):
+        magic, self.kind, self.time, self.elapsed, self._split, size = HEADER.unpack_from(log, offset)
+        if magic != MAGIC:
+            raise ValueError(f"Not a record at offset {offset}")
+        self.offset = offset
+        self._log = log
+        self._start = offset + HEADER.size
+        self._end = self._start + size
+        self._data = None
+
+    @property
+    def path(self) -> str:
+        return KINDS[self.kind]
+
+    def _decompress(self) -> bytes:
+        if self._data is None:
+            self._data = zlib.decompress(self._log[slice(self._start, self._end)])
+        return self._data
+
+    @property
+    def request(self) -> bytes:
+        return self._decompress()[slice(self._split)]
+
+    @property
+    def response(self) -> bytes:
+        return self._decompress()[slice(self._split, None)]
+
+    def payload(self) -> Dict:
+        return json.loads(self.request)
+
+    def move(self) -> Union[str, None]:
+        """Move answered to a /move"""
+        try:
+            return json.loads(self.response).get("move")
+        except (ValueError, AttributeError):
+            return None
+
+
+def is_record_log(path: str) -> bool:
+    """Whether the file starts with a record"""
+    with open(path, "rb") as file:
+        start = file.read(HEADER.size)
+    return len(start) == HEADER.size and HEADER.unpack(start)[0] == MAGIC
+
+
+class RecordLog:
+    """Read side of a log, memory-mapped: records are only decompressed when their bodies are read."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._log = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets: List[int] = []
+        offset = 0
+        while offset + HEADER.size <= size:
+            compressed = HEADER.unpack_from(self._log, offset)[-1]
+            if offset + HEADER.size + compressed > size:
+                break  # Record being written
+            self.offsets.append(offset)
+            offset += HEADER.size + compressed
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> Record:
+        return Record(self._log, self.offsets[index])
+
+    def __iter__(self) -> Iterator[Record]:
+        for offset in self.offsets:
+            yield Record(self._log, offset)
+
+    def games(self) -> Dict[Tuple[str, str], List[Record]]:
+        """Records of each game, keyed by (game id, snake id) like the game store, in the order they came"""
+        games: Dict[Tuple[str, str], List[Record]] = {}
+        for record in self:
+            payload = record.payload()
+            games.setdefault((payload["game"]["id"], payload["you"]["id"]), []).append(record)
+        return games
+
+    def close(self):
+        if isinstance(self._log, mmap.mmap):
+            self._log.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,79 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.geometry import MOVES
+from typing import List, Tuple
+
+
+DEADLY, CONTESTED, HAZARD, SAFE = range(4)
+# Scores of a move from the worst to the best: off the board, into a body or a hazard you die in; next to the
+# head of a snake at least as long as you; into a hazard you survive; nothing in the way
+
+
+class MoveSafety:
+    """
+    Scores of the four moves of a snake (in MOVES order) from one pass over the bitboards of the turn:
+    walls, the bodies left after the tails move (a stacked tail stays), hazards and the cells the heads of
+    the snakes at least as long as you can move to.
+    """
+
+    __slots__ = ("cells", "scores")
+
+    def __init__(self, state: BoardState, snake_id: str, hazard_damage: int = 0):
+        self.cells: Tuple[int, ...] = (-1,) * len(MOVES)
+        self.scores: List[int] = [DEADLY] * len(MOVES)
+        snake = state.snakes.get(snake_id)
+        if snake is None or snake.head < 0:
+            return
+        geometry = state.geometry
+        self.cells = geometry.moves[snake.head]
+
+        blocked = state.bodies
+        heads = 0
+        length = len(snake.body)
+        for id, other in state.snakes.items():
+            body = other.body
+            if len(body) > 1 and body[-1] != body[-2]:
+                # The tail leaves unless it is stacked
+                blocked &= ~(1 << body[-1])
+            if id != snake_id and other.head >= 0 and len(body) >= length:
+                heads |= 1 << other.head
+        # One turn of the ThreatMap: the cells next to the heads, the blocked ones are deadly anyway
+        contested = geometry.dilate(heads)
+        hazards = state.hazards if hazard_damage else 0
+        # A hazard without food costs the damage on top of the move, food heals the snake eating it
+        fatal = hazards & ~state.food if snake.health <= hazard_damage + 1 else 0
+
+        for move, cell in enumerate(self.cells):
+            if cell < 0:
+                continue
+            bit = 1 << cell
+            if (blocked | fatal) & bit:
+                continue
+            if contested & bit:
+                self.scores[move] = CONTESTED
+            elif hazards & bit:
+                self.scores[move] = HAZARD
+            else:
+                self.scores[move] = SAFE
+
+    def score(self, move: str) -> int:
+        return self.scores[MOVES.index(move)]
+
+    def mask(self, level: int = SAFE) -> int:
+        """Bitmask of the moves scoring at least level, bit `i` standing for MOVES[i]"""
+        mask = 0
+        for move, score in enumerate(self.scores):
+            if score >= level:
+                mask |= 1 << move
+        return mask
+
+    def safest(self) -> List[str]:
+        """The moves with the best score, none when every move is deadly"""
+        best = max(self.scores)
+        if best == DEADLY:
+            return []
+        return [move for move, score in zip(MOVES, self.scores) if score == best]
+
+
+def get_move_safety(state: BoardState, snake_id: str, hazard_damage: int = 0) -> MoveSafety:
+    """Safety of the moves of a snake"""
+    return state.cached(("safety", snake_id, hazard_damage), lambda: MoveSafety(state, snake_id, hazard_damage))
@@ -0,0 +1,501 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.geometry import Geometry
+from battlesnake.utils.threats import HORIZON, ThreatMap
+from battlesnake.utils.transposition import (
+    EXACT,
+    LENGTH_KEYS,
+    LOWER,
+    MAX_SNAKES,
+    UPPER,
+    TranspositionTable,
+    get_table,
+    get_zobrist,
+)
+from collections import deque
+from itertools import product
+from typing import Deque, List, Sequence, Tuple, Union
+import time
+
+
+WIN = 1_000_000
+# Score of a won position, a lost one is -WIN. Both are shifted by the ply so sooner wins and later losses rank higher
+
+WEIGHTS = {
+    "safe_moves": 10.0,  # Free cells around our head
+    "length": 6.0,  # Our length minus the longest opponent length
+    "health": 0.2,  # Our health
+    "food": 1.5,  # Distance to the nearest food, when hungry or not the longest
+    "hazard": 15.0,  # Our head in a hazard
+    "head_danger": 40.0,  # Our head next to the head of a snake at least as long
+}
+# Weights of the evaluation features
+
+MAX_OPPONENTS = 2
+# Opponents closest to us moving in the search, the others stay where they are as obstacles
+
+MAX_PLY = 64
+# Deepest search
+
+NODES_BETWEEN_CHECKS = 128
+# Nodes searched between two checks of the deadline
+
+NETWORK_OVERHEAD_MS = 50
+SAFETY_MARGIN_MS = 40
+MINIMUM_BUDGET_MS = 20
+# Budget of a search: the game timeout minus the measured (or at least NETWORK_OVERHEAD_MS) round trip overhead
+# and a safety margin, never below the minimum
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline is reached"""
+
+
+class SimSnake:
+    """Snake of a search position. The body is a deque of flat indexes, head first."""
+
+    __slots__ = ("id", "slot", "body", "health", "alive", "moving")
+
+    def __init__(self, id: str, slot: int, body: Sequence[int], health: int, moving: bool = True):
+        self.id = id
+        self.slot = min(slot, MAX_SNAKES - 1)
+        # Index of the Zobrist keys of this snake
+        self.body: Deque[int] = deque(body)
+        self.health = health
+        self.alive = True
+        self.moving = moving
+
+    @property
+    def head(self) -> int:
+        return self.body[0]
+
+    def __len__(self):
+        return len(self.body)
+
+
+class SearchState:
+    """
+    Position of the move search, played forward with make() and back with unmake().
+    Snake 0 is ours. `counts` holds the number of body segments on each cell and `hash` the Zobrist hash
+    of the position, updated by make() and restored by unmake(). `threats` are those of the opponents that
+    stay where they are in the search, as seen from the root.
+    """
+
+    __slots__ = ("geometry", "food", "hazards", "hazard_damage", "snakes", "threats", "counts", "zobrist", "hash")
+
+    def __init__(
+        self,
+        geometry: Geometry,
+        food: int,
+        hazards: int,
+        hazard_damage: int,
+        snakes: List[SimSnake],
+        threats: ThreatMap = None,
+    ):
+        self.geometry = geometry
+        self.food = food
+        self.hazards = hazards
+        self.hazard_damage = hazard_damage
+        self.snakes = snakes
+        self.threats = threats
+        self.counts = bytearray(geometry.size)
+        for snake in snakes:
+            for cell in snake.body:
+                self.counts[cell] += 1
+        self.zobrist = get_zobrist(geometry.size)
+        self.hash = self.compute_hash()
+
+    @classmethod
+    def from_board_state(
+        cls, state: BoardState, you_id: str, hazard_damage: int = 0, max_opponents: int = MAX_OPPONENTS
+    ) -> "SearchState":
+        geometry = state.geometry
+        you = state.snakes[you_id]
+        opponents = sorted(
+            (snake for id, snake in state.snakes.items() if id != you_id and snake.body),
+            key=lambda snake: geometry.distances[you.head][snake.head],
+        )
+        snakes = [SimSnake(you.id, 0, you.body, you.health)]
+        snakes += [
+            SimSnake(snake.id, position + 1, snake.body, snake.health, moving=position < max_opponents)
+            for position, snake in enumerate(opponents)
+        ]
+        still = [snake.id for snake in opponents[max_opponents:]]
+        threats = ThreatMap(state, you_id, still) if still else None
+        return cls(geometry, state.food, state.hazards, hazard_damage, snakes, threats)
+
+    def compute_hash(self) -> int:
+        """Zobrist hash of the position computed from scratch"""
+        zobrist = self.zobrist
+        key = 0
+        for snake in self.snakes:
+            segments = zobrist.segments[snake.slot]
+            for cell in snake.body:
+                if cell >= 0:
+                    key ^= segments[cell]
+            if snake.body[0] >= 0:
+                key ^= zobrist.heads[snake.slot][snake.body[0]]
+            key ^= zobrist.lengths[snake.slot][len(snake.body) % LENGTH_KEYS]
+            key ^= zobrist.healths[snake.slot][max(0, min(snake.health, 100))]
+            if not snake.alive:
+                key ^= zobrist.dead[snake.slot]
+        for mask, keys in ((self.food, zobrist.food), (self.hazards, zobrist.hazards)):
+            while mask:
+                low = mask & -mask
+                key ^= keys[low.bit_length() - 1]
+                mask ^= low
+        return key
+
+    def moves(self, snake: SimSnake) -> List[int]:
+        """
+        Cells snake can move to, skipping its neck and cells taken by bodies that won't move away.
+        Returns the first legal cell (or off the board, -1) when every move is deadly.
+        """
+        counts = self.counts
+        body = snake.body
+        neck = body[1] if len(body) > 1 else -1
+        candidates = [cell for cell in self.geometry.moves[body[0]] if cell != neck]
+        moves = []
+        for cell in candidates:
+            if cell < 0:
+                continue
+            if counts[cell] == 0 or (counts[cell] == 1 and self._is_moving_tail(cell)):
+                moves.append(cell)
+        return moves or candidates[:1]
+
+    def _is_moving_tail(self, cell: int) -> bool:
+        for snake in self.snakes:
+            if (
+                snake.alive
+                and snake.moving
+                and snake.body[-1] == cell
+                and len(snake.body) > 1
+                and snake.body[-2] != cell
+            ):
+                return True
+        return False
+
+    def make(self, joint: Sequence[int]) -> Tuple:
+        """
+        Play one turn, joint holding the cell each moving snake goes to (in the order of the moving snakes).
+        Follows the order of the game rules: move, damage, feed, eliminate.
+        Returns what unmake() needs to undo it.
+        """
+        counts = self.counts
+        bits = self.geometry.bits
+        zobrist = self.zobrist
+        key = self.hash
+        moved = []
+        for snake, cell in zip(self._moving(), joint):
+            body = snake.body
+            segments, heads = zobrist.segments[snake.slot], zobrist.heads[snake.slot]
+            if body[0] >= 0:
+                key ^= heads[body[0]]
+            tail = body.pop()
+            counts[tail] -= 1
+            key ^= segments[tail]
+            body.appendleft(cell)
+            if cell >= 0:
+                counts[cell] += 1
+                key ^= segments[cell] ^ heads[cell]
+            moved.append((snake, tail, snake.health))
+
+        eaten = 0
+        grown = []
+        for snake, _, _ in moved:
+            head = snake.body[0]
+            if head < 0:
+                continue
+            healths = zobrist.healths[snake.slot]
+            key ^= healths[max(0, snake.health)]
+            snake.health -= 1
+            if self.hazards & bits[head]:
+                snake.health -= self.hazard_damage
+            if self.food & bits[head]:
+                if not eaten & bits[head]:
+                    key ^= zobrist.food[head]
+                eaten |= bits[head]
+                snake.health = 100
+                lengths = zobrist.lengths[snake.slot]
+                key ^= lengths[len(snake.body) % LENGTH_KEYS] ^ lengths[(len(snake.body) + 1) % LENGTH_KEYS]
+                snake.body.append(snake.body[-1])
+                counts[snake.body[-1]] += 1
+                key ^= zobrist.segments[snake.slot][snake.body[-1]]
+                grown.append(snake)
+            key ^= healths[max(0, snake.health)]
+        self.food &= ~eaten
+
+        eliminated = []
+        heads = {}
+        for snake, _, _ in moved:
+            heads.setdefault(snake.body[0], []).append(snake)
+        for snake, _, _ in moved:
+            head = snake.body[0]
+            if head < 0 or snake.health <= 0 or counts[head] > len(heads[head]):
+                eliminated.append(snake)
+                continue
+            for other in heads[head]:
+                if other is not snake and len(other.body) >= len(snake.body):
+                    eliminated.append(snake)
+                    break
+        for snake in eliminated:
+            snake.alive = False
+            key ^= zobrist.dead[snake.slot]
+            for cell in snake.body:
+                if cell >= 0:
+                    counts[cell] -= 1
+        undo = (moved, eaten, grown, eliminated, self.hash)
+        self.hash = key
+        return undo
+
+    def unmake(self, undo: Tuple):
+        moved, eaten, grown, eliminated, self.hash = undo
+        counts = self.counts
+        for snake in eliminated:
+            snake.alive = True
+            for cell in snake.body:
+                if cell >= 0:
+                    counts[cell] += 1
+        for snake in grown:
+            counts[snake.body.pop()] -= 1
+        self.food |= eaten
+        for snake, tail, health in moved:
+            head = snake.body.popleft()
+            if head >= 0:
+                counts[head] -= 1
+            snake.body.append(tail)
+            counts[tail] += 1
+            snake.health = health
+
+    def _moving(self) -> List[SimSnake]:
+        return [snake for snake in self.snakes if snake.alive and snake.moving]
+
+    def evaluate(self, ply: int) -> float:
+        """Score of the position for snake 0, higher is better"""
+        you = self.snakes[0]
+        if not you.alive:
+            return -WIN + ply
+        opponents = [snake for snake in self.snakes[1:] if snake.alive]
+        if not opponents and len(self.snakes) > 1:
+            return WIN - ply
+
+        geometry = self.geometry
+        counts = self.counts
+        head = you.body[0]
+        bits = geometry.bits
+
+        safe = sum(1 for cell in geometry.moves[head] if cell >= 0 and counts[cell] == 0)
+        longest = max((len(snake.body) for snake in opponents), default=len(you.body))
+        score = WEIGHTS["safe_moves"] * safe
+        score += WEIGHTS["length"] * (len(you.body) - longest)
+        score += WEIGHTS["health"] * you.health
+        if self.hazards & bits[head]:
+            score -= WEIGHTS["hazard"]
+
+        if self.food and (you.health < 40 or len(you.body) <= longest):
+            distances = geometry.distances[head]
+            food, nearest = self.food, geometry.size
+            while food:
+                low = food & -food
+                nearest = min(nearest, distances[low.bit_length() - 1])
+                food ^= low
+            score -= WEIGHTS["food"] * nearest
+
+        for snake in opponents:
+            if snake.moving and len(snake.body) >= len(you.body) and geometry.distances[head][snake.body[0]] <= 2:
+                score -= WEIGHTS["head_danger"]
+        # The opponents standing still in the search are really moving: next to where they can be by now
+        if self.threats is not None and self.threats.dangers[head] <= ply + 1:
+            score -= WEIGHTS["head_danger"]
+        return score
+
+
+class SearchResult:
+    __slots__ = ("move", "score", "depth", "nodes", "elapsed", "table_hits")
+
+    def __init__(self, move: Union[str, None], score: float, depth: int, nodes: int, elapsed: float):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.table_hits = 0
+        # Transposition table hits of this search
+
+    def __repr__(self):
+        return (
+            f"SearchResult({self.move}, score: {self.score:.1f}, depth: {self.depth}, "
+            f"nodes: {self.nodes}, table hits: {self.table_hits}, elapsed: {self.elapsed * 1000:.1f}ms)"
+        )
+
+
+class Searcher:
+    """
+    Paranoid alpha-beta over simultaneous moves: we pick a move, then the moving opponents pick
+    their joint move knowing ours.
+    """
+
+    def __init__(self, state: SearchState, deadline: float, table: TranspositionTable = None):
+        self.state = state
+        self.deadline = deadline
+        self.table = table
+        self.nodes = 0
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes % NODES_BETWEEN_CHECKS == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _key(self, ply: int) -> int:
+        """
+        Table key of the position. With threats the evaluation depends on the ply (up to the horizon, the same
+        past it), which is hashed in so a score is only reused at the ply it was computed for
+        """
+        state = self.state
+        if state.threats is None:
+            return state.hash
+        return state.hash ^ state.zobrist.plies[min(ply, HORIZON - 1)]
+
+    def root(self, depth: int, order: List[int]) -> Tuple[int, float]:
+        alpha, best_move = -float("inf"), order[0]
+        for cell in order:
+            value = self._min(cell, depth, alpha, float("inf"), 0)
+            if value > alpha:
+                alpha, best_move = value, cell
+        return best_move, alpha
+
+    def _max(self, depth: int, alpha: float, beta: float, ply: int) -> float:
+        self._tick()
+        state = self.state
+        you = state.snakes[0]
+        if depth == 0 or not you.alive or (len(state.snakes) > 1 and not any(s.alive for s in state.snakes[1:])):
+            return state.evaluate(ply)
+
+        table = self.table
+        key = self._key(ply)
+        moves = state.moves(you)
+        if table is not None:
+            entry = table.probe(key)
+            if entry is not None:
+                entry_depth, bound, value, move = entry
+                if entry_depth >= depth and (
+                    bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha)
+                ):
+                    return value
+                if move in moves:
+                    # Best move of the previous visit first
+                    moves.remove(move)
+                    moves.insert(0, move)
+
+        alpha_start = alpha
+        best, best_cell = -float("inf"), moves[0]
+        for cell in moves:
+            value = self._min(cell, depth, alpha, beta, ply)
+            if value > best:
+                best, best_cell = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if table is not None and abs(best) < WIN - MAX_PLY:
+            # Wins and losses depend on the ply they are found at, they aren't stored
+            bound = UPPER if best <= alpha_start else LOWER if best >= beta else EXACT
+            table.store(key, depth, bound, best, best_cell)
+        return best
+
+    def _min(self, cell: int, depth: int, alpha: float, beta: float, ply: int) -> float:
+        state = self.state
+        opponents = [snake for snake in state.snakes[1:] if snake.alive and snake.moving]
+        best = float("inf")
+        for joint in product(*[state.moves(snake) for snake in opponents]):
+            undo = state.make((cell,) + joint)
+            value = self._max(depth - 1, alpha, min(beta, best), ply + 1)
+            state.unmake(undo)
+            best = min(best, value)
+            if best <= alpha:
+                break
+        return best
+
+
+def iterative_deepening(
+    state: SearchState,
+    deadline: float,
+    max_depth: int = MAX_PLY,
+    table: TranspositionTable = None,
+    result: SearchResult = None,
+) -> SearchResult:
+    """
+    Deepen the search until the deadline, returning the move of the deepest completed depth.
+    A given result is updated after each depth, so another thread can read the best move found so far.
+    """
+    begin = time.perf_counter()
+    geometry = state.geometry
+    you = state.snakes[0]
+    order = state.moves(you)
+    if result is None:
+        result = SearchResult(None, -float("inf"), 0, 0, 0.0)
+    result.move = geometry.move_between(you.head, order[0])
+    if len(order) == 1 and order[0] < 0:
+        result.move = None
+        return result
+
+    searcher = Searcher(state, deadline, table)
+    hits = table.hits if table is not None else 0
+    for depth in range(1, max_depth + 1):
+        try:
+            cell, score = searcher.root(depth, order)
+        except SearchTimeout:
+            break
+        result.move, result.score, result.depth = geometry.move_between(you.head, cell), score, depth
+        # Search the best move first at the next depth
+        order.remove(cell)
+        order.insert(0, cell)
+        if abs(score) >= WIN - max_depth:
+            break  # Forced win or loss, deeper won't change it
+    result.nodes = searcher.nodes
+    if table is not None:
+        result.table_hits = table.hits - hits
+    result.elapsed = time.perf_counter() - begin
+    return result
+
+
+def search_budget(
+    timeout: int,
+    latency: Union[str, int, None] = None,
+    processing: float = None,
+    margin: int = SAFETY_MARGIN_MS,
+    minimum: int = MINIMUM_BUDGET_MS,
+) -> float:
+    """
+    Seconds available to search, from the game timeout (ms), keeping margin (ms) and at least minimum (ms).
+    The network overhead is the latency the engine measured on our previous move minus the time we took to
+    process it (seconds). The /move deadline of the pipeline is the same budget with a smaller margin.
+    """
+    overhead = NETWORK_OVERHEAD_MS
+    try:
+        if latency and processing is not None:
+            overhead = max(overhead, float(latency) - processing * 1000)
+    except ValueError:
+        pass
+    return max(timeout - overhead - margin, minimum) / 1000
+
+
+def best_move(
+    state: BoardState,
+    you_id: str,
+    timeout: int,
+    hazard_damage: int = 0,
+    latency=None,
+    processing=None,
+    result: SearchResult = None,
+    deadline: float = None,
+) -> SearchResult:
+    """
+    Search the move of snake you_id until deadline (time.perf_counter()), by default the budget of the game
+    from now. The /move pipeline gives the deadline of its request: a search queued behind others has less time
+    """
+    if deadline is None:
+        deadline = time.perf_counter() + search_budget(timeout, latency, processing)
+    table = get_table()
+    table.new_search()
+    state = SearchState.from_board_state(state, you_id, hazard_damage)
+    return iterative_deepening(state, deadline, table=table, result=result)
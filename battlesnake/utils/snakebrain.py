@@ -1,6 +1,70 @@
 from battlesnake.utils.classes import Coordinate, Board, Snake
 from battlesnake.utils.astar import astar
+from battlesnake.utils.bitboard import BitMaze, BoardState
+from battlesnake.utils.connectivity import Connectivity
+from battlesnake.utils.fields import DistanceField
+from battlesnake.utils.paths import PathTree
+from battlesnake.utils.safety import HAZARD, MoveSafety
+from battlesnake.utils.threats import ThreatMap
 from typing import List, Tuple, Union
+import battlesnake.utils.connectivity as connectivity
+import battlesnake.utils.fields as fields
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.paths as paths
+import battlesnake.utils.safety as safety
+import battlesnake.utils.threats as threats
+
+
+HAZARD_DAMAGE = 14
+# Health lost per turn in a hazard when the game settings are not at hand, the default of the royale ruleset
+
+DANGER_COST = 20
+# Extra cost of a path through a cell an opponent at least as long can be on by the time you get there
+
+
+def get_board_state(board: Board, ruleset: str = "standard") -> BoardState:
+    """
+    Return the bitboard state of board, built on first use and reused for the rest of the request.
+    The ruleset picks the geometry tables (wrapped or not) and only matters on the first call.
+    """
+    if board._state is None:
+        board._state = BoardState.from_board(board, ruleset)
+    return board._state
+
+
+def get_distance_field(board: Board) -> DistanceField:
+    """Path distances and Voronoi territories of every snake on board, built once per turn"""
+    return fields.get_distance_field(get_board_state(board))
+
+
+def get_connectivity(board: Board, you: Snake) -> Connectivity:
+    """Room left after each of your moves and the chokes of the free space, built once per turn"""
+    return connectivity.get_connectivity(get_board_state(board), you.id)
+
+
+def get_threat_map(board: Board, you: Snake) -> ThreatMap:
+    """Earliest turn an opponent can reach each cell and how long it is compared to you, built once per turn"""
+    return threats.get_threat_map(get_board_state(board), you.id)
+
+
+def get_roomy_moves(board: Board, you: Snake, moves: List[str]) -> List[str]:
+    """The moves leaving you room for your whole body, or the roomiest ones when none does"""
+    areas = get_connectivity(board, you).areas
+    roomy = [move for move in moves if areas[move] >= you.length]
+    if roomy:
+        return roomy
+    most = max((areas[move] for move in moves), default=0)
+    return [move for move in moves if areas[move] == most]
+
+
+def get_move_safety(board: Board, you: Snake, hazard_damage: int = HAZARD_DAMAGE) -> MoveSafety:
+    """Scores of your four moves (walls, bodies, hazards, head to head), built once per turn"""
+    return safety.get_move_safety(get_board_state(board), you.id, hazard_damage)
+
+
+def get_safe_moves(board: Board, you: Snake, hazard_damage: int = HAZARD_DAMAGE) -> List[str]:
+    """Your safest moves: a hazard or a head to head only when nothing better is left"""
+    return get_move_safety(board, you, hazard_damage).safest()
 
 
 def up(head):
@@ -20,23 +84,19 @@ def right(head):
 
 
 def is_move_safe(board: Board, you: Snake, move: str) -> bool:
-    possible_moves = {"up": up(you.head), "down": down(you.head), "left": left(you.head), "right": right(you.head)}
-    return (
-        not at_wall(possible_moves[move], board)
-        and not at_snake(possible_moves[move], board)
-        and not at_hazard(possible_moves[move], board)
-    )
+    """Return true if move stays on the board, out of the bodies and out of a hazard that kills you"""
+    return get_move_safety(board, you).score(move) != safety.DEADLY
 
 
 def is_move_safe_with_heads(board: Board, you: Snake, move: str) -> bool:
-    possible_moves = [up(you.head), down(you.head), left(you.head), right(you.head)]
-    for coord in possible_moves:
-        return not (at_wall(coord, board) or at_snake(coord, board) or at_hazard(coord, board))
+    """Like is_move_safe, and not next to the head of a snake that wins or ties a head to head"""
+    return get_move_safety(board, you).score(move) >= HAZARD
 
 
 def at_wall(coord: Coordinate, board: Board):
     """Return true if coord is at outer edge of board"""
-    return coord.x == 0 or coord.y == 0 or coord.x == board.width - 1 or coord.y == board.height - 1
+    state = get_board_state(board)
+    return state.is_set(state.edge, coord)
 
 
 def out_of_wall(coord: Coordinate, board: Board):
@@ -45,11 +105,17 @@ def out_of_wall(coord: Coordinate, board: Board):
 
 
 def at_snake(coord: Coordinate, board: Board):
-    return any(coord == snake.head for snake in board.snakes)
+    state = get_board_state(board)
+    return state.is_set(state.heads, coord)
 
 
 def at_snake_body(coord: Coordinate, board: Board):
-    return any(coord != snake.head and coord in snake.body for snake in board.snakes)
+    state = get_board_state(board)
+    index = state.index(coord)
+    if index < 0:
+        return False
+    bit = 1 << index
+    return any(snake.mask & bit and snake.head != index for snake in state.snakes.values())
 
 
 def at_body(coord: Coordinate, you: Snake):
@@ -58,7 +124,8 @@ def at_body(coord: Coordinate, you: Snake):
 
 
 def at_hazard(coord: Coordinate, board: Board):
-    return coord in board.hazards
+    state = get_board_state(board)
+    return state.is_set(state.hazards, coord)
 
 
 def get_move_from_coord(coord: Coordinate, you: Snake):
@@ -99,30 +166,33 @@ def get_food_percentage(board: Board) -> int:
     return int((len(board.food) / (board.width * board.height)) * 100)
 
 
-def get_nearest_coord(start: Coordinate, coords: List[Coordinate], LOGGER) -> Coordinate:
-    """Return the nearest coord from you"""
+def get_nearest_coord(start: Coordinate, coords: List[Coordinate], LOGGER, board: Board = None) -> Coordinate:
+    """Return the nearest coord from start (Manhattan distance), the first one of coords on a tie"""
     if not coords:
         return None
-    coords_values = sorted({manhattan_distance(start, coord): index for index, coord in enumerate(coords)}.items())
-    return coords[coords_values[0][1]]
+    return min(coords, key=lambda coord: manhattan_distance(start, coord, board))
 
 
-def get_furthest_coord(start: Coordinate, coords: List[Coordinate], LOGGER) -> Coordinate:
-    """Return the furthest coord from you"""
+def get_furthest_coord(start: Coordinate, coords: List[Coordinate], LOGGER, board: Board = None) -> Coordinate:
+    """Return the furthest coord from start (Manhattan distance), the first one of coords on a tie"""
     if not coords:
         return None
-    coords_values = sorted({manhattan_distance(start, coord): index for index, coord in enumerate(coords)}.items())
-    return coords[coords_values[-1][1]]
+    return max(coords, key=lambda coord: manhattan_distance(start, coord, board))
 
 
 def get_closest_snake(board: Board, you: Snake) -> Union[Snake, None]:
-    """Return the closest snake to you"""
-    if len(board.snakes) == 1:
+    """
+    Return the other snake whose head you reach in the fewest moves around the bodies,
+    the Manhattan distance then the order of the board breaking ties. None if you are alone.
+    """
+    others = [snake for snake in board.snakes if snake.id != you.id]
+    if not others:
         return None
-    snakes = sorted(
-        {manhattan_distance(you.head, snake.head): index for index, snake in enumerate(board.snakes)}.items()
+    field = get_distance_field(board)
+    return min(
+        others,
+        key=lambda snake: (field.head_distance(you.id, snake.id), manhattan_distance(you.head, snake.head, board)),
     )
-    return board.snakes[snakes[0][1]]
 
 
 def get_next_coord(head: Coordinate, direction: str) -> Coordinate:
@@ -139,51 +209,103 @@ def get_next_coord(head: Coordinate, direction: str) -> Coordinate:
 def chase_tail(board: Board, you: Snake, LOGGER) -> Union[List[Tuple[int, int]], None]:
     # tail = you.body[len(you.body) - 1]
     tail = get_last_position_of_tail(you)
-    board = get_board_as_maze(board, you, LOGGER=LOGGER)
-    return astar(board, you.head, tail, LOGGER)
+    with metrics.span("maze"):
+        board = get_board_as_maze(board, you, LOGGER=LOGGER)
+    with metrics.span("astar"):
+        return astar(board, you.head, tail, LOGGER)
 
 
 def chase_tail_avoid_food(board: Board, you: Snake, LOGGER) -> Union[List[Tuple[int, int]], None]:
     # tail = you.body[len(you.body) - 1]
     tail = get_last_position_of_tail(you)
-    board = get_board_as_maze(board, you, food=True, goal=tail, LOGGER=LOGGER)
-    return astar(board, you.head, tail, LOGGER)
+    with metrics.span("maze"):
+        board = get_board_as_maze(board, you, food=True, goal=tail, LOGGER=LOGGER)
+    with metrics.span("astar"):
+        return astar(board, you.head, tail, LOGGER)
+
+
+def get_path_tree(
+    board: Board, you: Snake, hazard_damage: int = HAZARD_DAMAGE, danger_cost: int = DANGER_COST
+) -> PathTree:
+    """Cheapest paths from your head to every cell, hazards and threats costing extra, built once per turn"""
+    return paths.get_path_tree(get_board_state(board), you.id, hazard_damage, danger_cost)
 
 
-def chase_close_food(board: Board, you: Snake, LOGGER) -> Union[List[Tuple[int, int]], None]:
-    food = get_nearest_coord(you.head, board.food, LOGGER)
-    board = get_board_as_maze(board, you, goal=food, LOGGER=LOGGER)
-    return astar(board, you.head, food, LOGGER)
+def get_target_path(
+    board: Board, you: Snake, cells: List[int], furthest: bool = False, hazard_damage: int = HAZARD_DAMAGE
+) -> Union[List[Tuple[int, int]], None]:
+    """
+    Path to the cheapest (or the most expensive) of the cells you can reach, from a path tree searched until
+    the candidates are settled: a blocked candidate falls back to the next one without another search. Among
+    candidates of the same cost the ones reached in fewer moves come first, then the given order.
+    """
+    state = get_board_state(board)
+    with metrics.span("paths"):
+        tree = paths.get_path_tree(state, you.id, hazard_damage, DANGER_COST, cells, nearest=not furthest)
+    ranked = tree.rank(cells, furthest)
+    if not ranked:
+        return None
+    cell = ranked[0]
+    xs, ys = state.geometry.xs, state.geometry.ys
+    return [(xs[index], ys[index]) for index in tree.path(cell)]
+
 
+def get_food_target(
+    board: Board, you: Snake, furthest: bool = False, hazard_damage: int = HAZARD_DAMAGE
+) -> Union[Coordinate, None]:
+    """Nearest (or furthest) food you can reach, see get_target_path. None when no food is reachable"""
+    state = get_board_state(board)
+    path = get_target_path(board, you, [state.index(food) for food in board.food], furthest, hazard_damage)
+    return Coordinate(x=path[-1][0], y=path[-1][1]) if path else None
 
-def chase_far_food(board: Board, you: Snake, LOGGER) -> Union[List[Tuple[int, int]], None]:
-    food = get_furthest_coord(you.head, board.food, LOGGER)
-    board = get_board_as_maze(board, you, goal=food, LOGGER=LOGGER)
-    return astar(board, you.head, food, LOGGER)
 
+def chase_close_food(
+    board: Board, you: Snake, LOGGER, hazard_damage: int = HAZARD_DAMAGE
+) -> Union[List[Tuple[int, int]], None]:
+    state = get_board_state(board)
+    return get_target_path(board, you, [state.index(food) for food in board.food], False, hazard_damage)
 
-def chase_head(board: Board, you: Snake, snake: Snake, LOGGER) -> Union[List[Tuple[int, int]], None]:
-    head = snake.body[0]
-    neck = snake.body[1]
-    direction = get_direction_of_snake(head, neck)
-    head_next_coord = get_next_coord(head, direction)
-    board = get_board_as_maze(board, you, goal=head_next_coord, LOGGER=LOGGER)
-    return astar(board, you.head, head, LOGGER)
+
+def chase_far_food(
+    board: Board, you: Snake, LOGGER, hazard_damage: int = HAZARD_DAMAGE
+) -> Union[List[Tuple[int, int]], None]:
+    state = get_board_state(board)
+    return get_target_path(board, you, [state.index(food) for food in board.food], True, hazard_damage)
+
+
+def chase_head(
+    board: Board, you: Snake, snake: Snake, LOGGER, hazard_damage: int = HAZARD_DAMAGE
+) -> Union[List[Tuple[int, int]], None]:
+    """Path to the cells next to the head of snake, the one it is heading to first"""
+    state = get_board_state(board)
+    head = state.index(snake.body[0])
+    cells = list(state.geometry.neighbours[head])
+    direction = get_direction_of_snake(snake.body[0], snake.body[1]) if len(snake.body) > 1 else None
+    if direction is not None:
+        # A stacked neck (on the first turn) tells nothing, the neighbours keep their order
+        ahead = state.index(get_next_coord(snake.body[0], direction))
+        cells = [ahead] + [cell for cell in cells if cell != ahead]
+    return get_target_path(board, you, cells, False, hazard_damage)
 
 
 def get_index(coordinate: Coordinate, board: Board):
-    return coordinate.y * board.width + coordinate.x
+    return get_board_state(board).index(coordinate)
 
 
 def get_coord_from_index(index, board: Board):
-    return Coordinate(index % board.width, index // board.width)
+    return get_board_state(board).coord(index)
 
 
-def manhattan_distance(start: Coordinate, goal: Coordinate):
+def manhattan_distance(start: Coordinate, goal: Coordinate, board: Board = None):
     """
-    Manhattan distance.
+    Manhattan distance, read from the geometry tables of board when given (toroidal on wrapped boards).
     Ref: https://en.wikipedia.org/wiki/Taxicab_geometry.
     """
+    if board is not None:
+        state = get_board_state(board)
+        start_index, goal_index = state.index(start), state.index(goal)
+        if start_index >= 0 and goal_index >= 0:
+            return state.geometry.distances[start_index][goal_index]
     return abs(start.x - goal.x) + abs(start.y - goal.y)
 
 
@@ -196,31 +318,13 @@ def get_board_as_maze(
     food: bool = False,
     goal: Coordinate = None,
     LOGGER=None,
-) -> List[List[int]]:
-    maze = [[0 for _ in range(board.width)] for _ in range(board.height)]
-    # LOGGER.critical(f"len of maze (x): {len(maze)}")
-    # LOGGER.critical(f"len of maze (y): {len(maze[0])}")
-
-    if food:
-        for food in board.food:
-            # LOGGER.debug(f"Adding food {food}")
-            maze[food.y][food.x] = 1
-
-    if goal:
-        # LOGGER.debug(f"Adding goal {goal}")
-        maze[goal.y][goal.x] = 0
-
-    if hazards:
-        for hazard in board.hazards:
-            # LOGGER.debug(f"Adding hazard {hazard}")
-            maze[hazard.y][hazard.x] = 1
-
-    if snakes:
-        for snake in board.snakes:
-            for coordinate in snake.body:
-                if heads and coordinate == snake.head and coordinate != you.head:
-                    LOGGER.debug("CHASING HEAD - MAZE")
-                    continue
-                LOGGER.debug(f"Adding snake coordinate {coordinate}")
-                maze[coordinate.y][coordinate.x] = 1
-    return maze
+) -> BitMaze:
+    state = get_board_state(board)
+    return state.maze(
+        you_head=state.index(you.head),
+        hazards=hazards,
+        snakes=snakes,
+        heads=heads,
+        food=food,
+        goal=state.index(goal) if goal else -1,
+    )
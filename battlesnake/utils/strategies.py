@@ -0,0 +1,57 @@
+from battlesnake.utils.classes import Board, Coordinate, Game, Snake
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.search import SearchResult
+from typing import Tuple, Union
+import battlesnake.utils.mcts as mcts
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.search as search
+import battlesnake.utils.snakebrain as snakebrain
+
+
+def get_smart_moves(
+    board: Board, you: Snake, game: Game, LOGGER, partial: SearchResult = None, deadline: float = None
+) -> Tuple[Union[Coordinate, None], Union[str, None]]:
+    """
+    Smart strategy of the searching bots (bazuso, smartypants): the alpha-beta search, MCTS in games of at least
+    mcts.MIN_SNAKES snakes when enabled. partial and deadline come from the /move pipeline (see
+    pipeline.choose_move), without them the search has the budget of the game from now.
+    """
+    if mcts.ENABLED and len(board.snakes) >= mcts.MIN_SNAKES:
+        return get_mcts_moves(board, you, game, LOGGER, partial, deadline)
+    record = GAMES.get((game.id, you.id))
+    with metrics.span("search"):
+        result = search.best_move(
+            snakebrain.get_board_state(board),
+            you.id,
+            game.timeout,
+            hazard_damage=game.ruleset.settings.hazardDamagePerTurn,
+            latency=you.latency,
+            processing=record.elapsed if record else None,
+            result=partial,
+            deadline=deadline,
+        )
+    LOGGER.debug("Search: %s", result)
+    if not result.move:
+        return None, None
+    return snakebrain.get_next_coord(you.head, result.move), result.move
+
+
+def get_mcts_moves(
+    board: Board, you: Snake, game: Game, LOGGER, partial: SearchResult = None, deadline: float = None
+) -> Tuple[Union[Coordinate, None], Union[str, None]]:
+    record = GAMES.get((game.id, you.id))
+    with metrics.span("mcts"):
+        result = mcts.best_move(
+            snakebrain.get_board_state(board),
+            you.id,
+            game.timeout,
+            hazard_damage=game.ruleset.settings.hazardDamagePerTurn,
+            latency=you.latency,
+            processing=record.elapsed if record else None,
+            result=partial,
+            deadline=deadline,
+        )
+    LOGGER.debug("MCTS: %s", result)
+    if not result.move:
+        return None, None
+    return snakebrain.get_next_coord(you.head, result.move), result.move
@@ -0,0 +1,93 @@
+from array import array
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.fields import release_times
+from typing import Iterable, List
+
+
+HORIZON = 4
+# Turns the opponent heads are followed for: further away they have too many options for a cell to be a threat
+
+NEVER = 0xFF
+# Turn of the cells no opponent reaches within the horizon
+
+LONGER, EQUAL, SHORTER = range(3)
+# Length of the opponent reaching a cell first compared to yours, from the most to the least dangerous
+
+
+class ThreatMap:
+    """
+    Earliest turn an opponent head can reach each cell, and whether that opponent is longer, as long or
+    shorter than the snake the map is built for. The heads of each kind are dilated together over the
+    bitboards, one turn at a time, bodies blocking the cells until their tail has left them. A cell reached
+    on the same turn by several kinds of opponents keeps the most dangerous one.
+    """
+
+    __slots__ = ("turns", "kinds", "dangers", "within")
+
+    def __init__(self, state: BoardState, snake_id: str, opponents: Iterable[str] = None, horizon: int = HORIZON):
+        geometry = state.geometry
+        size = geometry.size
+        self.turns = array("B", [NEVER]) * size
+        self.kinds = bytearray([SHORTER]) * size
+        # Earliest turn any opponent reaches each cell and the kind of that opponent
+        self.dangers = array("B", [NEVER]) * size
+        # Earliest turn an opponent at least as long reaches each cell: a head to head you lose or tie
+        self.within: List[int] = []
+        # Bitboards of the cells an opponent at least as long reaches within each number of turns, from 0
+
+        snake = state.snakes.get(snake_id)
+        length = len(snake.body) if snake is not None else 0
+        if opponents is None:
+            opponents = [id for id in state.snakes if id != snake_id]
+        reached = [0, 0, 0]
+        for id in opponents:
+            other = state.snakes[id]
+            if other.head >= 0:
+                kind = LONGER if len(other.body) > length else EQUAL if len(other.body) == length else SHORTER
+                reached[kind] |= 1 << other.head
+
+        turns, kinds, dangers = self.turns, self.kinds, self.dangers
+        released = release_times(state)
+        blocked = state.bodies
+        dilate = geometry.dilate
+        seen = danger = 0
+        for turn in range(horizon + 1):
+            # Turn 0 marks the heads themselves
+            blocked &= ~released.get(turn, 0)
+            for kind in (LONGER, EQUAL, SHORTER):
+                if not reached[kind]:
+                    continue
+                if turn:
+                    reached[kind] |= dilate(reached[kind]) & ~blocked
+                new = reached[kind] & ~seen
+                seen |= new
+                while new:
+                    low = new & -new
+                    cell = low.bit_length() - 1
+                    turns[cell] = turn
+                    kinds[cell] = kind
+                    new ^= low
+            new = (reached[LONGER] | reached[EQUAL]) & ~danger
+            danger |= new
+            self.within.append(danger)
+            while new:
+                low = new & -new
+                dangers[low.bit_length() - 1] = turn
+                new ^= low
+
+    def turn(self, cell: int) -> int:
+        """Earliest turn an opponent can be on cell, NEVER within the horizon"""
+        return self.turns[cell] if cell >= 0 else NEVER
+
+    def kind(self, cell: int) -> int:
+        """LONGER, EQUAL or SHORTER: the opponent reaching cell first, SHORTER when none does"""
+        return self.kinds[cell] if cell >= 0 else SHORTER
+
+    def is_dangerous(self, cell: int, turn: int = 1) -> bool:
+        """True if an opponent at least as long as you can be on cell by turn"""
+        return cell >= 0 and self.dangers[cell] <= turn
+
+
+def get_threat_map(state: BoardState, snake_id: str) -> ThreatMap:
+    """Threats of every other snake to a snake"""
+    return state.cached(("threats", snake_id), lambda: ThreatMap(state, snake_id))
@@ -0,0 +1,136 @@
+from array import array
+from functools import lru_cache
+from typing import Dict, Tuple, Union
+import os
+import random
+import threading
+
+
+MAX_SNAKES = 16
+# Snake slots with their own Zobrist keys
+
+LENGTH_KEYS = 256
+HEALTH_KEYS = 101
+PLY_KEYS = 16
+# Plies told apart in the keys of the searches scoring positions by their ply (see search.Searcher._key)
+
+EXACT, LOWER, UPPER = 0, 1, 2
+# Bound stored with an entry: exact value, lower bound (fail high) or upper bound (fail low)
+
+ENTRY_BYTES = 8 + 8 + 4
+# A key, a value and the packed depth, bound, age and move of an entry
+
+TABLE_MEMORY = int(os.environ.get("BATTLESNAKE_TT_MB", "16")) * 1024 * 1024
+# Memory budget of the transposition tables of a process
+
+SEARCH_THREADS = int(os.environ.get("BATTLESNAKE_SMART_THREADS", "4"))
+# Threads running searches (pipeline.SMART_THREADS), each with a table of TABLE_MEMORY / SEARCH_THREADS
+
+
+class Zobrist:
+    """Random 64 bit keys of everything a search position is made of, for a board of `size` cells."""
+
+    __slots__ = ("segments", "heads", "lengths", "healths", "dead", "food", "hazards", "plies")
+
+    def __init__(self, size: int, seed: int = 0x5EED):
+        rng = random.Random(seed ^ size)
+
+        def keys(count: int) -> Tuple[int, ...]:
+            return tuple(rng.getrandbits(64) for _ in range(count))
+
+        self.segments = tuple(keys(size) for _ in range(MAX_SNAKES))
+        self.heads = tuple(keys(size) for _ in range(MAX_SNAKES))
+        self.lengths = tuple(keys(LENGTH_KEYS) for _ in range(MAX_SNAKES))
+        self.healths = tuple(keys(HEALTH_KEYS) for _ in range(MAX_SNAKES))
+        self.dead = keys(MAX_SNAKES)
+        self.food = keys(size)
+        self.hazards = keys(size)
+        self.plies = keys(PLY_KEYS)
+
+
+@lru_cache(maxsize=32)
+def get_zobrist(size: int) -> Zobrist:
+    return Zobrist(size)
+
+
+class TranspositionTable:
+    """
+    Fixed size, array backed table of search results, indexed by the low bits of the Zobrist hash.
+    An entry is replaced when it comes from an older search or was searched no deeper than the new one.
+    """
+
+    def __init__(self, memory: int = TABLE_MEMORY):
+        entries = 1
+        while entries * 2 * ENTRY_BYTES <= memory:
+            entries *= 2
+        self.size = entries
+        self.mask = entries - 1
+        self.keys = array("Q", bytes(8 * entries))
+        self.values = array("d", bytes(8 * entries))
+        self.meta = array("I", bytes(4 * entries))
+        # Packed as: move + 1 (16 bits) | age (8 bits) << 16 | bound (2 bits) << 24 | depth + 1 (6 bits) << 26
+        # so an empty slot is 0
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def new_search(self):
+        """Entries of previous searches become the first to be replaced"""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key: int) -> Union[Tuple[int, int, float, int], None]:
+        """Return (depth, bound, value, move) stored for key, None on a miss"""
+        self.probes += 1
+        slot = key & self.mask
+        meta = self.meta[slot]
+        if meta and self.keys[slot] == key:
+            self.hits += 1
+            return (meta >> 26) - 1, (meta >> 24) & 0x3, self.values[slot], (meta & 0xFFFF) - 1
+        self.misses += 1
+        if meta:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, value: float, move: int):
+        slot = key & self.mask
+        meta = self.meta[slot]
+        if meta and self.keys[slot] != key:
+            if (meta >> 16) & 0xFF == self.age and (meta >> 26) - 1 > depth:
+                return  # Keep the deeper entry of the current search
+            self.replaced += 1
+        self.stores += 1
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.meta[slot] = (min(depth, 62) + 1) << 26 | bound << 24 | self.age << 16 | (move + 1) & 0xFFFF
+
+    def clear(self):
+        for table in (self.keys, self.values, self.meta):
+            table[:] = array(table.typecode, bytes(table.itemsize * self.size))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": self.size,
+            "memory": self.size * ENTRY_BYTES,
+            "probes": self.probes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "replaced": self.replaced,
+        }
+
+
+_TABLES = threading.local()
+
+
+def get_table() -> TranspositionTable:
+    """Transposition table of this thread, allocated on first use with its share of TABLE_MEMORY"""
+    table = getattr(_TABLES, "table", None)
+    if table is None:
+        table = _TABLES.table = TranspositionTable(TABLE_MEMORY // max(SEARCH_THREADS, 1))
+    return table
@@ -0,0 +1,110 @@
+from battlesnake.utils.asgi import ASGITransport
+from battlesnake.utils.geometry import get_geometry
+from battlesnake.utils.payloads import random_payload
+from battlesnake.utils.transposition import get_zobrist
+from typing import Dict, List, Sequence, Tuple
+import asyncio
+import battlesnake.utils.metrics as metrics
+import battlesnake.utils.recorder as recorder
+import json
+import logging
+import os
+import random
+import time
+
+
+ENABLED = os.environ.get("BATTLESNAKE_WARM_UP", "1") == "1"
+# Warm the bots up when their server starts, "0" to answer the first game cold
+
+BOARDS = ((11, 11, 4), (7, 7, 2), (19, 19, 8))
+# (width, height, snakes) of the warm-up games: the standard board first, then the small and large ones
+
+RULESETS = ("standard", "solo", "royale", "squad", "constrictor", "wrapped")
+# Geometry tables are cached per ruleset: each one is built ahead for every board size
+
+TIMEOUT = 100
+# Game timeout (ms) of the warm-up moves, the search bots think until their deadline
+
+LOGGER = logging.getLogger("battlesnake.warmup")
+
+_WARM = set()
+# Apps already warmed up, by id: the forked server workers inherit the warm state of their parent
+
+
+def _routes_app(app):
+    while not hasattr(app, "routes") and hasattr(app, "app"):
+        app = app.app  # Middleware
+    return app
+
+
+def move_paths(app) -> List[str]:
+    """/move path of every bot of the app: its own, or one per bot mounted on the host"""
+    app = _routes_app(app)
+    paths = []
+    for route in getattr(app, "routes", ()):
+        if route.path == "/move":
+            paths.append("/move")
+        elif getattr(route, "app", None) is not None and hasattr(route.app, "routes"):
+            paths.extend(f"{route.path}{path}" for path in move_paths(route.app))
+    return paths
+
+
+def prebuild(boards: Sequence[Tuple[int, int, int]] = BOARDS):
+    """Geometry and Zobrist tables of the board sizes, built before the first game needs them"""
+    for width, height, _ in boards:
+        for ruleset in RULESETS:
+            get_geometry(width, height, ruleset)
+        get_zobrist(width * height)
+
+
+async def warm_up_async(app, boards: Sequence[Tuple[int, int, int]] = BOARDS, seed: int = 0) -> Dict[str, float]:
+    """
+    Play a synthetic /start, /move, /end of each board size through every bot of the app: the pydantic
+    models, the routes, the lookup tables and the code of a move are ready when real games come.
+    Returns the seconds taken by each /move, by "<path> <width>x<height>". An app is only warmed up once.
+    """
+    inner = _routes_app(app)
+    if id(inner) in _WARM:
+        return {}
+    prebuild(boards)
+    transport = ASGITransport(app)
+    rng = random.Random(seed)
+    timings = {}
+    token = recorder.RECORDING.set(False)
+    try:
+        for path in move_paths(app):
+            prefix = path[: -len("/move")]
+            for width, height, snakes in boards:
+                payload = random_payload(rng, width, height, snakes=snakes, length=5, food=snakes, timeout=TIMEOUT)
+                payload["game"]["id"] = f"warm-up-{path}-{width}x{height}"
+                body = json.dumps(payload).encode()
+                await transport.post(f"{prefix}/start", body)
+                begin = time.perf_counter()
+                status, _ = await transport.post(path, body)
+                timings[f"{path} {width}x{height}"] = time.perf_counter() - begin
+                if status != 200:
+                    LOGGER.warning("Warm-up of %s answered %s", path, status)
+                await transport.post(f"{prefix}/end", body)
+    finally:
+        recorder.RECORDING.reset(token)
+    metrics.reset()
+    _WARM.add(id(inner))
+    return timings
+
+
+def warm_up(app, boards: Sequence[Tuple[int, int, int]] = BOARDS, seed: int = 0) -> Dict[str, float]:
+    """warm_up_async, outside of an event loop"""
+    return asyncio.run(warm_up_async(app, boards, seed))
+
+
+def install(app):
+    """Warm the app up on startup, so its server only accepts connections once it is warm"""
+
+    async def warm():
+        if not ENABLED:
+            return
+        timings = await warm_up_async(app)
+        if timings:
+            LOGGER.info("Warmed up in %.0fms", sum(timings.values()) * 1000)
+
+    app.add_event_handler("startup", warm)
@@ -0,0 +1,39 @@
+from battlesnake.batch import BatchSimulator
+from battlesnake.engine import LocalGame, default_settings
+from battlesnake.utils.geometry import MOVES
+import random
+import time
+
+
+BATCH_SIZES = [1, 16, 256, 1024, 4096]
+
+
+def engine_steps_per_second(width: int, height: int, snakes: int, ruleset: str, seconds: float = 1.0) -> float:
+    """Baseline: the engine stepping one game at a time with random moves"""
+    rng = random.Random(0)
+    steps, begin, seed = 0, time.perf_counter(), 0
+    while time.perf_counter() - begin < seconds:
+        game = LocalGame(width, height, ruleset, default_settings(), seed=seed)
+        game.place_snakes([f"snake-{slot}" for slot in range(snakes)])
+        while not game.is_over() and game.turn < 500:
+            game.step({snake.id: rng.choice(MOVES) for snake in game.alive()})
+            steps += 1
+        seed += 1
+    return steps / (time.perf_counter() - begin)
+
+
+def main(width: int = 11, height: int = 11, snakes: int = 4, ruleset: str = "royale", turns: int = 200):
+    baseline = engine_steps_per_second(width, height, snakes, ruleset)
+    print(f"{width}x{height}, {snakes} snakes, {ruleset}: engine {baseline:,.0f} game steps/s")
+    print(f"{'batch':>6} {'steps/s':>12} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        batch = BatchSimulator(size, width, height, snakes, ruleset, seed=0)
+        rounds = max(turns * 64 // size, 20)
+        begin = time.perf_counter()
+        steps = batch.run(rounds)
+        rate = steps / (time.perf_counter() - begin)
+        print(f"{size:>6} {rate:>12,.0f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from battlesnake.utils.classes import Board, Game, Snake
+from battlesnake.utils.decode import decode_move
+from battlesnake.utils.payloads import random_payload
+import json
+import random
+import timeit
+
+
+BOARDS = [
+    # (width, height, snakes, length)
+    (11, 11, 4, 10),
+    (19, 19, 8, 30),
+    (25, 25, 8, 40),
+    (25, 25, 16, 20),
+]
+
+
+def validated(body: bytes):
+    """What FastAPI does for the /move handler: parse the JSON and validate each body parameter"""
+    raw = json.loads(body)
+    return Game.parse_obj(raw["game"]), Board.parse_obj(raw["board"]), Snake.parse_obj(raw["you"]), raw["turn"]
+
+
+def fast(body: bytes):
+    decoded = decode_move(body)
+    return decoded.board, decoded.you
+
+
+def main(repeat: int = 200):
+    rng = random.Random(0)
+    print(f"{'board':>12} {'snakes':>6} {'segments':>8} {'validated (us)':>15} {'fast (us)':>10} {'speedup':>8}")
+    for width, height, snakes, length in BOARDS:
+        payload = random_payload(
+            rng, width, height, snakes=snakes, length=length, food=width, hazard_rings=2, ruleset="royale"
+        )
+        body = json.dumps(payload).encode()
+        segments = sum(len(snake["body"]) for snake in payload["board"]["snakes"])
+
+        before = min(timeit.repeat(lambda: validated(body), number=repeat, repeat=5)) / repeat * 1e6
+        after = min(timeit.repeat(lambda: fast(body), number=repeat, repeat=5)) / repeat * 1e6
+        print(
+            f"{f'{width}x{height}':>12} {len(payload['board']['snakes']):>6} {segments:>8} "
+            f"{before:>15.1f} {after:>10.1f} {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
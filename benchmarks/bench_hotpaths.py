@@ -0,0 +1,235 @@
+from battlesnake.engine import QUIET
+from battlesnake.utils.astar import astar
+from battlesnake.utils.classes import Request
+from battlesnake.utils.payloads import random_payload
+from typing import Callable, Dict, List, Tuple, Union
+import argparse
+import battlesnake.bazuso as bazuso
+import battlesnake.madsnake as madsnake
+import battlesnake.smartypants as smartypants
+import battlesnake.utils.snakebrain as snakebrain
+import datetime
+import gc
+import heapq
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+
+BOARDS = [
+    # (width, height, snakes, length)
+    (7, 7, 1, 3),
+    (7, 7, 4, 3),
+    (11, 11, 1, 5),
+    (11, 11, 4, 6),
+    (11, 11, 8, 4),
+    (19, 19, 4, 12),
+    (19, 19, 8, 10),
+    (25, 25, 8, 20),
+]
+# Corpus of royale boards, hazards on the outer ring
+
+BOTS = (bazuso, madsnake, smartypants)
+
+TIMEOUT = 60
+# Game timeout of the corpus. The search bots run until their deadline, the smallest budget keeps the suite short
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+THRESHOLD = 0.25
+# Relative slowdown failing a run
+
+NOISE_FLOOR_US = 5.0
+# Slowdowns smaller than this are never reported
+
+RETRIES = 2
+# Measurements of the slow cases before reporting them
+
+
+def build_corpus(seed: int = 0) -> List[Tuple[str, Request]]:
+    rng = random.Random(seed)
+    corpus = []
+    for width, height, snakes, length in BOARDS:
+        payload = random_payload(
+            rng,
+            width,
+            height,
+            snakes=snakes,
+            length=length,
+            food=max(2, width // 2),
+            hazard_rings=1,
+            ruleset="royale",
+            timeout=TIMEOUT,
+        )
+        corpus.append((f"{width}x{height}-{snakes}", Request.parse_obj(payload)))
+    return corpus
+
+
+def cases(request: Request) -> Dict[str, Callable]:
+    """Functions timed on a request, each starting from a board without cached state like a new /move"""
+    board, you, game = request.board, request.you, request.game
+    food = snakebrain.get_nearest_coord(you.head, board.food, QUIET, board)
+    others = [snake for snake in board.snakes if snake.id != you.id]
+    damage = game.ruleset.settings.hazardDamagePerTurn
+    functions = {
+        "get_board_as_maze": lambda: snakebrain.get_board_as_maze(board, you, goal=food),
+        "distance_field": lambda: snakebrain.get_distance_field(board).territory(you.id),
+        "get_closest_snake": lambda: snakebrain.get_closest_snake(board, you),
+        "path_tree": lambda: snakebrain.get_path_tree(board, you),
+        "connectivity": lambda: snakebrain.get_connectivity(board, you),
+        "threat_map": lambda: snakebrain.get_threat_map(board, you),
+        "astar": lambda: astar(snakebrain.get_board_as_maze(board, you, goal=food), you.head, food, QUIET),
+        "chase_tail": lambda: snakebrain.chase_tail(board, you, QUIET),
+        "chase_tail_avoid_food": lambda: snakebrain.chase_tail_avoid_food(board, you, QUIET),
+        "chase_close_food": lambda: snakebrain.chase_close_food(board, you, QUIET),
+        "chase_far_food": lambda: snakebrain.chase_far_food(board, you, QUIET),
+    }
+    if others:
+        functions["chase_head"] = lambda: snakebrain.chase_head(board, you, others[0], QUIET)
+    for bot in BOTS:
+        name = bot.__name__.rsplit(".", 1)[-1]
+        functions[f"{name}.get_safe_moves"] = lambda bot=bot: bot.get_safe_moves(board, you, damage)
+        functions[f"{name}.get_smart_moves"] = lambda bot=bot: bot.get_smart_moves(board, you, game, QUIET)
+    return functions
+
+
+def reference_work():
+    """Fixed work independent of the bots: its time tracks the speed the machine runs at"""
+    heap = []
+    for value in range(2000):
+        heapq.heappush(heap, value * 7919 % 2003)
+    while heap:
+        heapq.heappop(heap)
+    return sorted(str(value) for value in range(500))
+
+
+def measure(board, function: Callable, budget: float, repeat: int) -> Tuple[float, float]:
+    """
+    Best over `repeat` rounds of the mean time of one call (us), each round lasting about budget seconds,
+    and the best time of reference_work over rounds interleaved with them. The best round is the least
+    disturbed by the rest of the machine, the reference tells how fast the machine was running meanwhile.
+    """
+    rounds, references = [], []
+    gc.collect()
+    gc.disable()  # Like timeit, collections would land in random rounds
+    for _ in range(repeat):
+        for target, times in ((function, rounds), (reference_work, references)):
+            calls, elapsed = 0, 0.0
+            while elapsed < budget or calls == 0:
+                board._state = None
+                begin = time.perf_counter()
+                target()
+                elapsed += time.perf_counter() - begin
+                calls += 1
+            times.append(elapsed / calls * 1e6)
+    gc.enable()
+    return min(rounds), min(references)
+
+
+def run(budget: float = 0.05, repeat: int = 5, only: Union[str, List[str]] = None) -> Dict:
+    """Time every case of the corpus, or the ones containing `only` (or one of the strings of it)"""
+    if isinstance(only, str):
+        only = [only]
+    results, references = {}, {}
+    for name, request in build_corpus():
+        for case, function in cases(request).items():
+            key = f"{name}/{case}"
+            if only and not any(part in key for part in only):
+                continue
+            results[key], references[key] = measure(request.board, function, budget, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "unit": "us",
+        },
+        "results": results,
+        "references": references,
+    }
+
+
+def normalized(timings: Dict, key: str, baseline: Dict) -> float:
+    """Time of a case scaled to the speed of the machine when the baseline was recorded, as far as known"""
+    value = timings["results"][key]
+    now, then = timings.get("references", {}).get(key), baseline.get("references", {}).get(key)
+    return value * then / now if now and then else value
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = THRESHOLD) -> List[Tuple[str, float, float]]:
+    """
+    (case, baseline us, current us) of every case slower than the baseline by more than threshold, the
+    current times scaled by the reference work timed next to each case
+    """
+    regressions = []
+    for key in current["results"]:
+        reference = baseline["results"].get(key)
+        if reference is None:
+            continue
+        value = normalized(current, key, baseline)
+        if value > reference * (1 + threshold) and value - reference > NOISE_FLOOR_US:
+            regressions.append((key, reference, value))
+    return regressions
+
+
+def confirm(
+    current: Dict, baseline: Dict, threshold: float = THRESHOLD, budget: float = 0.05, repeat: int = 5
+) -> List[Tuple[str, float, float]]:
+    """
+    compare() after measuring the slow cases again up to RETRIES times, keeping their fastest run: a regression
+    has to show up every time, not only while the machine was busy
+    """
+    regressions = compare(current, baseline, threshold)
+    for _ in range(RETRIES):
+        if not regressions:
+            break
+        keys = [key for key, _, _ in regressions]
+        again = run(budget, repeat * 2, only=keys)
+        for key in keys:
+            if normalized(again, key, baseline) < normalized(current, key, baseline):
+                current["results"][key] = again["results"][key]
+                current["references"][key] = again["references"][key]
+        regressions = compare(current, baseline, threshold)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the snakebrain, astar and bot hot paths over a board corpus")
+    parser.add_argument("-o", "--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE, help="Results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Relative slowdown failing the run")
+    parser.add_argument("--budget", type=float, default=0.05, help="Seconds per measurement round")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", "--only", help="Only run the cases containing this string")
+    args = parser.parse_args()
+
+    current = run(args.budget, args.repeat, args.only)
+    for key, value in current["results"].items():
+        print(f"{key:<50} {value:>12.1f}us")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(current, file, indent=2)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create it")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = confirm(current, baseline, args.threshold, args.budget, args.repeat)
+    for key, reference, value in regressions:
+        print(f"REGRESSION {key}: {reference:.1f}us -> {value:.1f}us ({value / reference - 1:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print(f"No regression over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
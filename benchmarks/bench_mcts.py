@@ -0,0 +1,39 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board
+from battlesnake.utils.mcts import search, shutdown_pool, warm_up
+from battlesnake.utils.payloads import random_payload
+from battlesnake.utils.search import SearchState
+import os
+import random
+
+
+BOARDS = [
+    # (width, height, snakes, length)
+    (11, 11, 4, 5),
+    (11, 11, 8, 5),
+    (19, 19, 8, 10),
+]
+
+
+def main(budget: float = 0.4):
+    rng = random.Random(0)
+    workers = sorted({1, 2, os.cpu_count() or 1})
+    print(
+        f"{'board':>12} {'snakes':>6} {'workers':>7} {'rollouts':>9} {'rollouts/s':>11} {'move':>6} {'confidence':>11}"
+    )
+    for width, height, snakes, length in BOARDS:
+        payload = random_payload(rng, width, height, snakes=snakes, length=length, food=width)
+        board_state = BoardState.from_board(Board.parse_obj(payload["board"]))
+        for count in workers:
+            warm_up(count)
+            state = SearchState.from_board_state(board_state, "snake-0", max_opponents=snakes)
+            result = search(state, budget, workers=count)
+            print(
+                f"{f'{width}x{height}':>12} {snakes:>6} {count:>7} {result.rollouts:>9} "
+                f"{result.rollouts_per_second:>11.0f} {result.move:>6} {result.confidence:>11.2f}"
+            )
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BOTS = ("bazuso", "madsnake", "smartypants")
+
+TIMEOUT = 500
+# Game timeout (ms) of the measured moves
+
+
+def child(bot: str, warm: bool):
+    """Runs in a fresh interpreter: time the import of the bot, its warm-up and its first two moves"""
+    begin = time.perf_counter()
+    import importlib
+
+    module = importlib.import_module(f"battlesnake.{bot}")
+    imported = time.perf_counter()
+
+    # Only imported now, not to count in the import of the bot
+    from battlesnake.utils.asgi import ASGITransport
+    from battlesnake.utils.payloads import random_payload
+    import asyncio
+    import battlesnake.utils.warmup as warmup
+    import random
+
+    if warm:
+        warmup.warm_up(module.api)
+    warmed = time.perf_counter()
+
+    payload = random_payload(random.Random(1), 11, 11, snakes=4, length=5, food=4, timeout=TIMEOUT)
+    payload["game"]["id"] = "bench-startup"
+    body = json.dumps(payload).encode()
+    transport = ASGITransport(module.api)
+
+    async def moves() -> List[float]:
+        await transport.post("/start", body)
+        times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            await transport.post("/move", body)
+            times.append(time.perf_counter() - start)
+        return times
+
+    first, second = asyncio.run(moves())
+    print(
+        json.dumps(
+            {"import": imported - begin, "warm_up": warmed - imported, "first_move": first, "second_move": second}
+        )
+    )
+
+
+def measure(bot: str, warm: bool) -> Dict[str, float]:
+    """Timings (seconds) of one cold start of the bot, in a new process"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child", bot]
+    if warm:
+        command.append("--warm")
+    output = subprocess.run(command, check=True, capture_output=True, cwd=root, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, count: int) -> List[Tuple[str, float]]:
+    """Modules taking the longest to import (cumulative seconds), from python -X importtime"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, cwd=root, text=True
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            imports.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(imports, key=lambda item: -item[1])[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the import of the bots and their first /move from cold")
+    parser.add_argument("bots", nargs="*", default=BOTS)
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per bot, the median is shown")
+    parser.add_argument("--imports", type=int, default=0, help="Also list the N slowest imports of each bot")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.warm)
+        return
+
+    print(f"{'bot':<12} {'warmed':>8} {'import':>8} {'warm-up':>8} {'1st move':>9} {'2nd move':>9} {'ready':>8}")
+    for bot in args.bots:
+        for warm in (False, True):
+            runs = [measure(bot, warm) for _ in range(args.repeat)]
+            median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            # Time from a cold interpreter to the answer of the first move
+            ready = median["import"] + median["warm_up"] + median["first_move"]
+            print(
+                f"{bot:<12} {'yes' if warm else 'no':>8} {median['import']:>7.0f}ms {median['warm_up']:>7.0f}ms "
+                f"{median['first_move']:>8.1f}ms {median['second_move']:>8.1f}ms {ready:>7.0f}ms"
+            )
+        for name, seconds in slowest_imports(f"battlesnake.{bot}", args.imports):
+            print(f"    {name:<50} {seconds * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+from battlesnake.utils.asgi import ASGITransport
+from battlesnake.utils.payloads import random_payload
+from battlesnake.utils.recorder import RecordLog, is_record_log
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import time
+
+
+BOARDS = [
+    # (width, height, snakes, length)
+    (11, 11, 2, 5),
+    (11, 11, 4, 8),
+    (19, 19, 4, 12),
+    (19, 19, 8, 10),
+]
+# Boards of the synthetic bodies, when no recorded ones are given
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def synthetic_bodies(count: int = 200, seed: int = 0, timeout: int = 500) -> List[bytes]:
+    rng = random.Random(seed)
+    bodies = []
+    for index in range(count):
+        width, height, snakes, length = BOARDS[index % len(BOARDS)]
+        payload = random_payload(
+            rng, width, height, snakes=snakes, length=length, food=6, hazard_rings=index % 2, timeout=timeout
+        )
+        payload["game"]["id"] = f"load-{index}"
+        bodies.append(json.dumps(payload).encode())
+    return bodies
+
+
+def load_bodies(path: str) -> List[bytes]:
+    """Recorded /move bodies: a log of the recorder, a JSON lines file, or a directory of .json files"""
+    if os.path.isdir(path):
+        bodies = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name), "rb") as file:
+                    bodies.append(file.read().strip())
+        return bodies
+    if is_record_log(path):
+        with RecordLog(path) as log:
+            return [record.request for record in log if record.path == "/move"]
+    with open(path, "rb") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+class HTTPTransport:
+    """Minimal HTTP/1.1 client over keep-alive asyncio connections, one request at a time per connection"""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def post(self, path: str, body: bytes) -> Tuple[int, bytes]:
+        reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                f"POST {self.prefix}{path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int((await reader.readline()).strip(), 16)
+                    chunk = await reader.readexactly(size + 2)
+                    if not size:
+                        break
+                    chunks.append(chunk[:-2])
+                content = b"".join(chunks)
+            else:
+                content = await reader.readexactly(int(headers.get("content-length", 0)))
+        except Exception:
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, content
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+def get_transport(target: str):
+    """A url, or an app as "module:attribute" (bazuso, smartypants and madsnake stand for their api)"""
+    if target.startswith("http://"):
+        return HTTPTransport(target)
+    if ":" not in target:
+        target = f"battlesnake.{target}:api"
+    module, _, attribute = target.partition(":")
+    return ASGITransport(getattr(importlib.import_module(module), attribute))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class LoadResult:
+    __slots__ = ("requests", "errors", "over_timeout", "latencies", "elapsed", "timeline")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.over_timeout = 0
+        self.latencies: List[float] = []
+        # Seconds of every answered request
+        self.elapsed = 0.0
+        self.timeline: List[Tuple[float, float]] = []
+        # (seconds since the start, latency) of every answered request
+
+    def report(self, window: float = 1.0) -> Dict:
+        """Throughput, latency percentiles (ms) overall and per window of seconds, over timeout and error counts"""
+        windows: Dict[int, List[float]] = {}
+        for at, latency in self.timeline:
+            windows.setdefault(int(at // window), []).append(latency)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "over_timeout": self.over_timeout,
+            "throughput": len(self.latencies) / self.elapsed if self.elapsed else 0.0,
+            "latency_ms": {
+                **{f"p{value:g}": percentile(self.latencies, value / 100) * 1000 for value in PERCENTILES},
+                "max": max(self.latencies, default=0.0) * 1000,
+            },
+            "curve": [
+                {
+                    "second": key * window,
+                    "requests": len(values),
+                    "p50": percentile(values, 0.5) * 1000,
+                    "p99": percentile(values, 0.99) * 1000,
+                    "max": max(values) * 1000,
+                }
+                for key, values in sorted(windows.items())
+            ],
+        }
+
+
+async def run_load(
+    transport,
+    bodies: List[bytes],
+    concurrency: int = 50,
+    rate: float = None,
+    requests: int = None,
+    duration: float = 10.0,
+    path: str = "/move",
+) -> LoadResult:
+    """
+    Replay bodies (round robin) against the transport, at most `concurrency` requests in flight.
+    With a rate the requests are sent on a schedule (open loop) and their latency counts from the time
+    they were due, so a server falling behind shows in the latencies. Without, they are sent as fast as
+    answers come back. Stops after `requests` requests or `duration` seconds.
+    """
+    timeouts = [json.loads(body).get("game", {}).get("timeout", 500) / 1000 for body in bodies]
+    result = LoadResult()
+    slots = asyncio.Semaphore(concurrency)
+    begin = time.perf_counter()
+    end = begin + duration
+    pending = set()
+
+    async def one(index: int, scheduled: float):
+        try:
+            status, _ = await transport.post(path, bodies[index])
+        except Exception:
+            result.errors += 1
+            return
+        finally:
+            slots.release()
+        latency = time.perf_counter() - scheduled
+        if status != 200:
+            result.errors += 1
+            return
+        result.latencies.append(latency)
+        result.timeline.append((scheduled - begin, latency))
+        if latency > timeouts[index]:
+            result.over_timeout += 1
+
+    sent = 0
+    while (requests is None or sent < requests) and time.perf_counter() < end:
+        if rate:
+            due = begin + sent / rate
+            if due > time.perf_counter():
+                await asyncio.sleep(due - time.perf_counter())
+        await slots.acquire()
+        scheduled = due if rate else time.perf_counter()
+        task = asyncio.ensure_future(one(sent % len(bodies), scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        sent += 1
+    if pending:
+        await asyncio.wait(pending)
+    result.requests = sent
+    result.elapsed = time.perf_counter() - begin
+    await transport.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay /move bodies against a bot at a given concurrency and rate")
+    parser.add_argument("target", help="bazuso, smartypants, madsnake, module:app or http://host:port")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-r", "--rate", type=float, help="Requests per second, as fast as possible when omitted")
+    parser.add_argument("-n", "--requests", type=int)
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("--path", default="/move", help="Path of the move endpoint, /bazuso/move on the host")
+    parser.add_argument("--bodies", help="Recorded bodies: recorder log, JSON lines file or directory of .json files")
+    parser.add_argument("--timeout", type=int, default=500, help="Game timeout (ms) of the synthetic bodies")
+    parser.add_argument("-o", "--output", help="Save the report to this JSON file")
+    args = parser.parse_args()
+
+    bodies = load_bodies(args.bodies) if args.bodies else synthetic_bodies(timeout=args.timeout)
+    transport = get_transport(args.target)
+    result = asyncio.run(
+        run_load(transport, bodies, args.concurrency, args.rate, args.requests, args.duration, args.path)
+    )
+    report = result.report()
+    print(json.dumps({key: value for key, value in report.items() if key != "curve"}, indent=2))
+    for point in report["curve"]:
+        print(
+            f"{point['second']:>6.0f}s {point['requests']:>6} req  p50 {point['p50']:>8.1f}ms  "
+            f"p99 {point['p99']:>8.1f}ms  max {point['max']:>8.1f}ms"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
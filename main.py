@@ -0,0 +1,5 @@
+from battlesnake.server import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from battlesnake.utils.astar import astar
+from battlesnake.utils.classes import Coordinate
+from collections import deque
+import heapq
+import logging
+import random
+
+
+LOGGER = logging.getLogger("BattleSnake.tests")
+
+
+class _Node:
+    """Node of the original A* implementation, kept as the reference for the equivalence tests."""
+
+    def __init__(self, parent=None, position=None):
+        self.parent = parent
+        self.position = position
+        self.g = 0
+        self.h = 0
+        self.f = 0
+
+    def __eq__(self, other):
+        return self.position == other.position
+
+    def __lt__(self, other):
+        return self.f < other.f
+
+
+def _reference_astar(game_state, start_coord, end_coord):
+    """Original list based A*, returning the partial path when it gives up."""
+
+    def return_path(node):
+        path = []
+        while node is not None:
+            path.append(node.position)
+            node = node.parent
+        return path[::-1]
+
+    start_node = _Node(None, (start_coord.x, start_coord.y))
+    end_node = _Node(None, (end_coord.x, end_coord.y))
+    open_list = [start_node]
+    closed_list = []
+    outer_iterations = 0
+    max_iterations = len(game_state[0]) * len(game_state) // 2
+
+    while open_list:
+        outer_iterations += 1
+        if outer_iterations > max_iterations:
+            return return_path(current_node)  # noqa: F821
+
+        current_node = heapq.heappop(open_list)
+        closed_list.append(current_node)
+        if current_node == end_node:
+            return return_path(current_node)
+
+        children = []
+        for new_position in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+            node_position = (current_node.position[0] + new_position[0], current_node.position[1] + new_position[1])
+            if (
+                node_position[0] > (len(game_state) - 1)
+                or node_position[0] < 0
+                or node_position[1] > len(game_state[-1]) - 1
+                or node_position[1] < 0
+            ):
+                continue
+            if game_state[node_position[0]][node_position[1]] != 0:
+                continue
+            children.append(_Node(current_node, node_position))
+
+        for child in children:
+            if [closed_child for closed_child in closed_list if closed_child == child]:
+                continue
+            child.g = current_node.g + 1
+            child.h = ((child.position[0] - end_node.position[0]) ** 2) + (
+                (child.position[1] - end_node.position[1]) ** 2
+            )
+            child.f = child.g + child.h
+            if child in open_list:
+                idx = open_list.index(child)
+                if child.g < open_list[idx].g:
+                    open_list[idx].g = child.g
+                    open_list[idx].f = child.f
+                    open_list[idx].h = child.h
+            else:
+                heapq.heappush(open_list, child)
+    return None
+
+
+def _shortest_distance(game_state, start, end):
+    """Breadth first search distance, or None if end is unreachable."""
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        if current == end:
+            return distances[current]
+        for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+            x, y = current[0] + dx, current[1] + dy
+            if 0 <= x < len(game_state) and 0 <= y < len(game_state[0]) and game_state[x][y] == 0:
+                if (x, y) not in distances:
+                    distances[(x, y)] = distances[current] + 1
+                    queue.append((x, y))
+    return None
+
+
+def _random_maze(rng, size, density):
+    return [[1 if rng.random() < density else 0 for _ in range(size)] for _ in range(size)]
+
+
+def _assert_valid_path(game_state, path, start, end):
+    assert path[0] == start
+    assert path[-1] == end
+    for (x1, y1), (x2, y2) in zip(path, path[1:]):
+        assert abs(x1 - x2) + abs(y1 - y2) == 1
+        assert game_state[x2][y2] == 0
+
+
+def test_astar_equivalent_to_reference():
+    rng = random.Random(1234)
+    for _ in range(300):
+        size = rng.choice([7, 11, 19])
+        maze = _random_maze(rng, size, rng.choice([0.0, 0.1, 0.25, 0.4]))
+        start = (rng.randrange(size), rng.randrange(size))
+        end = (rng.randrange(size), rng.randrange(size))
+        maze[start[0]][start[1]] = 0
+        maze[end[0]][end[1]] = 0
+
+        start_coord = Coordinate(x=start[0], y=start[1])
+        end_coord = Coordinate(x=end[0], y=end[1])
+        expected = _reference_astar(maze, start_coord, end_coord)
+        path = astar(maze, start_coord, end_coord, LOGGER)
+        distance = _shortest_distance(maze, start, end)
+
+        if distance is None:
+            assert path is None
+            assert expected is None or expected[-1] != end
+            continue
+
+        _assert_valid_path(maze, path, start, end)
+        assert len(path) == distance + 1
+        if expected is not None and expected[-1] == end:
+            _assert_valid_path(maze, expected, start, end)
+            assert len(path) <= len(expected)
+
+
+def test_astar_same_path_format():
+    maze = [[0, 0, 0, 0, 0], [1, 1, 1, 1, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]
+    path = astar(maze, Coordinate(x=0, y=0), Coordinate(x=0, y=4), LOGGER)
+    assert path == [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)]
+    assert path == _reference_astar(maze, Coordinate(x=0, y=0), Coordinate(x=0, y=4))
+    path = astar(maze, Coordinate(x=0, y=0), Coordinate(x=2, y=0), LOGGER)
+    assert path == [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (1, 4), (2, 4), (2, 3), (2, 2), (2, 1), (2, 0)]
+
+
+def test_astar_unreachable_and_start_is_end():
+    maze = [[0, 1, 0], [1, 1, 0], [0, 0, 0]]
+    assert astar(maze, Coordinate(x=0, y=0), Coordinate(x=2, y=2), LOGGER) is None
+    assert astar(maze, Coordinate(x=2, y=2), Coordinate(x=2, y=2), LOGGER) == [(2, 2)]
+    assert astar(maze, Coordinate(x=0, y=0), Coordinate(x=5, y=5), LOGGER) is None
@@ -0,0 +1,62 @@
+from battlesnake.engine import LocalGame, default_settings
+from battlesnake.utils.geometry import MOVES
+import pytest
+import random
+
+np = pytest.importorskip("numpy")
+from battlesnake.batch import BatchSimulator  # noqa: E402
+
+
+def _planes(game, slots):
+    """Body-age planes of a local game, as the batch simulator stores them"""
+    age = np.zeros((slots, game.geometry.size), dtype=np.int16)
+    for slot, snake in enumerate(game.snakes):
+        if snake.alive:
+            for position, cell in enumerate(snake.body):
+                age[slot, cell] = max(age[slot, cell], len(snake.body) - position)
+    return age
+
+
+@pytest.mark.parametrize("ruleset", ["standard", "royale", "wrapped"])
+def test_batch_follows_the_engine(ruleset):
+    settings = default_settings(food_spawn_chance=0, minimum_food=0, hazard_damage=20, shrink_every=3)
+    rng = random.Random(ruleset)
+    locals_ = []
+    for seed in range(16):
+        game = LocalGame(11, 11, ruleset, settings, seed=seed)
+        game.place_snakes([f"snake-{slot}" for slot in range(4)])
+        game.food |= set(rng.sample(range(121), 15))
+        locals_.append(game)
+
+    batch = BatchSimulator(len(locals_), 11, 11, 4, ruleset, settings, seed=0)
+    for index, game in enumerate(locals_):
+        batch.load(index, game)
+
+    for _ in range(40):
+        moves = batch.random_moves()
+        for index, game in enumerate(locals_):
+            if not batch.done[index]:
+                game.step({snake.id: MOVES[moves[index, slot]] for slot, snake in enumerate(game.snakes)})
+        batch.step(moves)
+        if ruleset == "royale":
+            # The batch and the engine draw their random sides from different generators
+            for index, game in enumerate(locals_):
+                game.hazards = set(np.flatnonzero(batch.hazards[index]).tolist())
+                game.safe_area = tuple(batch.safe_area[index].tolist())
+
+        for index, game in enumerate(locals_):
+            assert batch.done[index] == game.is_over()
+            assert (batch.age[index] == _planes(game, 4)).all()
+            assert batch.alive[index].tolist() == [snake.alive for snake in game.snakes]
+            alive = batch.alive[index]
+            assert batch.health[index][alive].tolist() == [snake.health for snake in game.snakes if snake.alive]
+            assert set(np.flatnonzero(batch.food[index]).tolist()) == game.food
+
+
+def test_spawn_reset_and_run():
+    batch = BatchSimulator(64, 7, 7, 2, "royale", default_settings(minimum_food=2, shrink_every=5), seed=1)
+    assert (batch.food.sum(axis=1) >= 1).all()
+    played = batch.run(300)
+    assert played > 64 * 100
+    assert batch.turn.max() >= 5
+    assert (batch.food.sum(axis=1) <= 49).all()
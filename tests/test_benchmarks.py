@@ -0,0 +1,50 @@
+from benchmarks.bench_hotpaths import BASELINE, build_corpus, cases, compare, confirm, measure
+import benchmarks.bench_startup as bench_startup
+import json
+
+
+GROSS = 1.0
+# Slowdown against the saved baseline failing the suite: a short run on a busy machine is too noisy for less
+
+
+def test_every_case_runs_on_the_corpus():
+    corpus = build_corpus()
+    assert {name.split("-")[0] for name, _ in corpus} == {"7x7", "11x11", "19x19", "25x25"}
+    for name, request in corpus[:2]:
+        for case, function in cases(request).items():
+            if not case.endswith("get_smart_moves"):
+                assert min(measure(request.board, function, 0.0, 1)) > 0
+
+
+def test_compare_flags_regressions_over_the_threshold():
+    baseline = {"results": {"a": 100.0, "b": 100.0, "c": 1.0, "d": 100.0}}
+    current = {"results": {"a": 120.0, "b": 130.0, "c": 3.0, "e": 500.0}}
+    assert compare(current, baseline, threshold=0.25) == [("b", 100.0, 130.0)]
+
+
+def test_compare_scales_to_the_speed_of_the_machine():
+    # The reference work took twice as long on "a": the machine was busy, not the case slower
+    baseline = {"results": {"a": 100.0, "b": 100.0}, "references": {"a": 50.0, "b": 50.0}}
+    current = {"results": {"a": 200.0, "b": 200.0}, "references": {"a": 100.0, "b": 50.0}}
+    assert compare(current, baseline, threshold=0.25) == [("b", 100.0, 200.0)]
+
+
+def test_no_gross_regression_against_the_baseline():
+    # The paths of every move on a middle and a large board. The search bots run until their deadline
+    with open(BASELINE) as file:
+        baseline = json.load(file)
+    current = {"results": {}, "references": {}}
+    for name, request in build_corpus():
+        if name not in ("11x11-4", "19x19-8"):
+            continue
+        for case, function in cases(request).items():
+            if not case.endswith("get_smart_moves"):
+                key = f"{name}/{case}"
+                current["results"][key], current["references"][key] = measure(request.board, function, 0.01, 3)
+    assert confirm(current, baseline, GROSS, 0.01, 3) == []
+
+
+def test_startup_of_a_cold_bot():
+    timings = bench_startup.measure("madsnake", warm=True)
+    assert set(timings) == {"import", "warm_up", "first_move", "second_move"}
+    assert all(value > 0 for value in timings.values())
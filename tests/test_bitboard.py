@@ -0,0 +1,94 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Coordinate
+from battlesnake.utils.payloads import make_request, make_snake
+import battlesnake.utils.snakebrain as snakebrain
+import random
+
+
+def _legacy_maze(board, you, hazards=True, snakes=True, heads=False, food=False, goal=None):
+    """The original list of lists maze, indexed as maze[y][x]"""
+    maze = [[0 for _ in range(board.width)] for _ in range(board.height)]
+    if food:
+        for coord in board.food:
+            maze[coord.y][coord.x] = 1
+    if goal:
+        maze[goal.y][goal.x] = 0
+    if hazards:
+        for coord in board.hazards:
+            maze[coord.y][coord.x] = 1
+    if snakes:
+        for snake in board.snakes:
+            for coordinate in snake.body:
+                if heads and coordinate == snake.head and coordinate != you.head:
+                    continue
+                maze[coordinate.y][coordinate.x] = 1
+    return maze
+
+
+def _request():
+    return make_request(
+        [
+            make_snake("you", [(5, 5), (5, 4), (5, 3), (4, 3)]),
+            make_snake("other", [(2, 8), (3, 8), (4, 8), (4, 9), (4, 10)]),
+        ],
+        food=[(0, 0), (7, 7), (10, 2)],
+        hazards=[(0, 10), (1, 10), (2, 10)],
+    )
+
+
+def test_board_state_masks():
+    request = _request()
+    state = BoardState.from_board(request.board)
+    assert state.is_set(state.food, Coordinate(x=7, y=7))
+    assert not state.is_set(state.food, Coordinate(x=7, y=6))
+    assert state.is_set(state.hazards, Coordinate(x=1, y=10))
+    assert state.is_set(state.heads, Coordinate(x=2, y=8))
+    assert state.is_set(state.bodies, Coordinate(x=4, y=9))
+    assert not state.is_set(state.bodies, Coordinate(x=-1, y=5))
+    assert state.snakes["you"].body == [60, 49, 38, 37]
+    assert state.is_set(state.edge, Coordinate(x=0, y=4))
+    assert state.is_set(state.edge, Coordinate(x=10, y=10))
+    assert not state.is_set(state.edge, Coordinate(x=1, y=1))
+
+
+def test_maze_matches_legacy_maze():
+    request = _request()
+    board, you = request.board, request.you
+    rng = random.Random(7)
+    for _ in range(50):
+        options = {
+            "hazards": rng.random() < 0.5,
+            "snakes": rng.random() < 0.8,
+            "heads": rng.random() < 0.5,
+            "food": rng.random() < 0.5,
+            "goal": rng.choice([None, Coordinate(x=7, y=7), Coordinate(x=2, y=8), Coordinate(x=3, y=3)]),
+        }
+        maze = snakebrain.get_board_as_maze(board, you, **options)
+        assert maze.to_list() == _legacy_maze(board, you, **options)
+
+
+def test_board_state_built_once_per_board():
+    request = _request()
+    assert snakebrain.get_board_state(request.board) is snakebrain.get_board_state(request.board)
+    assert "_state" not in request.board.dict()
+
+
+def test_analyses_cached_per_state():
+    state = snakebrain.get_board_state(_request().board)
+    calls = []
+    first = state.cached(("test", "you"), lambda: calls.append(1) or object())
+    assert state.cached(("test", "you"), lambda: calls.append(1) or object()) is first
+    assert state.cached(("test", "other"), object) is not first
+    assert len(calls) == 1
+
+
+def test_occupancy_queries():
+    board = _request().board
+    assert snakebrain.at_snake(Coordinate(x=5, y=5), board)
+    assert not snakebrain.at_snake(Coordinate(x=5, y=4), board)
+    assert snakebrain.at_snake_body(Coordinate(x=5, y=4), board)
+    assert not snakebrain.at_snake_body(Coordinate(x=5, y=5), board)
+    assert snakebrain.at_hazard(Coordinate(x=2, y=10), board)
+    assert not snakebrain.at_hazard(Coordinate(x=3, y=10), board)
+    assert snakebrain.at_wall(Coordinate(x=0, y=3), board)
+    assert not snakebrain.at_wall(Coordinate(x=3, y=3), board)
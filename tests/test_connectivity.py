@@ -0,0 +1,119 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Request
+from battlesnake.utils.connectivity import Connectivity, articulation_points, get_connectivity
+from battlesnake.utils.payloads import make_request, make_snake, random_payload
+import battlesnake.utils.snakebrain as snakebrain
+import random
+import time
+
+
+def _regions(state, free):
+    """Sizes of the regions of free cells, one flood fill each"""
+    sizes = []
+    remaining = free
+    while remaining:
+        region = remaining & -remaining
+        while True:
+            grown = state.geometry.dilate(region) & free
+            if grown == region:
+                break
+            region = grown
+        sizes.append(bin(region).count("1"))
+        remaining &= ~region
+    return sorted(sizes)
+
+
+def test_articulation_points_match_removing_each_cell():
+    rng = random.Random(11)
+    for ruleset in ("standard", "wrapped"):
+        for _ in range(10):
+            request = make_request([make_snake("you", [(0, 0), (0, 0), (0, 0)])], 7, 6, ruleset=ruleset)
+            state = BoardState.from_board(request.board, ruleset)
+            free = state.full & ~rng.getrandbits(state.size) | rng.getrandbits(state.size)
+            points, pieces = articulation_points(state, free)
+            before = _regions(state, free)
+            for cell in range(state.size):
+                if not free >> cell & 1:
+                    continue
+                after = _regions(state, free & ~(1 << cell))
+                split = len(after) > len(before)
+                assert bool(points >> cell & 1) == split
+                if split:
+                    # The regions of the other cells are untouched: the new ones come from the region of cell
+                    new = list(after)
+                    for size in before:
+                        if size in new:
+                            new.remove(size)
+                    assert sorted(pieces[cell]) == sorted(new)
+
+
+def test_areas_of_a_dead_end():
+    # You are heading up a corridor between the left edge and the body of "wall": up is a dead end of
+    # three cells, right leads to the rest of the board
+    wall = [(1, 6), (1, 5), (1, 4), (1, 3), (1, 2), (2, 2), (3, 2), (4, 2), (5, 2), (6, 2)]
+    request = make_request(
+        [make_snake("you", [(0, 3), (0, 2), (0, 1), (0, 0), (1, 0)]), make_snake("wall", wall)], 7, 7
+    )
+    connectivity = snakebrain.get_connectivity(request.board, request.you)
+    assert connectivity.areas["up"] == 3
+    assert connectivity.areas["down"] == connectivity.areas["left"] == connectivity.areas["right"] == 0
+    assert snakebrain.get_roomy_moves(request.board, request.you, ["up", "down"]) == ["up"]
+
+
+def test_tails_leave_during_the_fill():
+    # Boxed in by your own body, which leaves as you move
+    you = [(1, 1), (1, 2), (2, 2), (2, 1), (2, 0), (1, 0), (0, 0)]
+    request = make_request([make_snake("you", you)], 3, 3)
+    state = snakebrain.get_board_state(request.board)
+    connectivity = Connectivity(state, "you")
+    # Left is (0, 1): next to the tail, which is free after one move
+    assert connectivity.areas["left"] == 9
+    assert connectivity.areas["right"] == 0
+
+
+def test_bodies_leaving_after_the_fill_stalls():
+    # Up is a 2x2 pocket in the corner, filled after three turns. The body of "wall" closes it until (2, 6)
+    # leaves on turn 5: the snake can wait for it in the pocket
+    you = [(0, 4), (0, 3), (0, 2), (0, 1), (0, 0), (1, 0)]
+    wall = [(1, 4), (2, 4), (2, 5), (2, 6), (3, 6), (3, 5), (3, 4), (3, 3)]
+    request = make_request([make_snake("you", you), make_snake("wall", wall)], 7, 7)
+    connectivity = Connectivity(snakebrain.get_board_state(request.board), "you")
+    assert connectivity.areas["up"] > 4
+    assert connectivity.areas["down"] == connectivity.areas["right"] == 0
+
+
+def test_roomy_moves():
+    request = make_request([make_snake("you", [(3, 3), (3, 2), (3, 1)])], 7, 7)
+    board, you = request.board, request.you
+    assert snakebrain.get_roomy_moves(board, you, ["up", "down", "left"]) == ["up", "left"]
+    assert snakebrain.get_roomy_moves(board, you, []) == []
+    assert get_connectivity(snakebrain.get_board_state(board), "you") is snakebrain.get_connectivity(board, you)
+
+
+def test_chokes_of_a_corridor():
+    # A one cell wide gap below the body of "wall" joins the left and right of the board. Its tail is stacked
+    # and stays in place after the next move
+    wall = [(3, 6), (3, 5), (3, 4), (3, 3), (3, 2), (3, 1), (3, 1)]
+    request = make_request([make_snake("you", [(0, 3), (0, 2), (0, 1)]), make_snake("wall", wall)], 7, 7)
+    connectivity = snakebrain.get_connectivity(request.board, request.you)
+    state = snakebrain.get_board_state(request.board)
+    gap = state.geometry.index(3, 0)
+    assert connectivity.is_choke(gap)
+    assert connectivity.largest_piece(gap) == 21
+    assert connectivity.largest_piece(state.geometry.index(6, 6)) == 0
+    assert not connectivity.is_choke(-1)
+
+
+def test_under_a_millisecond_on_11x11():
+    rng = random.Random(2)
+    states = []
+    for _ in range(20):
+        payload = random_payload(rng, 11, 11, snakes=4, length=rng.randint(3, 20), hazard_rings=1)
+        states.append(BoardState.from_board(Request.parse_obj(payload).board))
+    best = float("inf")
+    for _ in range(3):
+        begin = time.perf_counter()
+        for state in states:
+            Connectivity(state, next(iter(state.snakes)))
+        best = min(best, (time.perf_counter() - begin) / len(states))
+    assert best < 0.001
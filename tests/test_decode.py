@@ -0,0 +1,50 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board, Request
+from battlesnake.utils.decode import decode_move
+from battlesnake.utils.payloads import random_payload
+import battlesnake.madsnake as madsnake
+import battlesnake.utils.snakebrain as snakebrain
+import asyncio
+import json
+import random
+
+
+def _body(seed=3, snakes=6, **kwargs):
+    payload = random_payload(random.Random(seed), 19, 19, snakes=snakes, length=12, food=8, hazard_rings=1, **kwargs)
+    return payload, json.dumps(payload).encode()
+
+
+def test_decoded_state_matches_models():
+    payload, body = _body()
+    decoded = decode_move(body)
+    expected = BoardState.from_board(Board.parse_obj(payload["board"]))
+    state = snakebrain.get_board_state(decoded.board)
+    assert (state.food, state.hazards, state.heads, state.bodies) == (
+        expected.food,
+        expected.hazards,
+        expected.heads,
+        expected.bodies,
+    )
+    assert {id: snake.body for id, snake in state.snakes.items()} == {
+        id: snake.body for id, snake in expected.snakes.items()
+    }
+    assert decoded.you is decoded.board.snakes[0]
+    assert decoded.board.food == Board.parse_obj(payload["board"]).food
+
+
+def test_models_are_built_lazily():
+    payload, body = _body(ruleset="wrapped")
+    decoded = decode_move(body)
+    assert decoded.board._model is None and decoded.you._body is None and decoded._game is None
+    assert decoded.board._state.geometry.wrapped
+
+    request = decoded.model()
+    assert request == Request.parse_obj(payload)
+    assert snakebrain.get_board_state(decoded.board.model()) is decoded.board._state
+
+
+def test_choose_move_with_decoded_request():
+    _, body = _body(seed=5, snakes=1)
+    decoded = decode_move(body)
+    response = asyncio.run(madsnake.choose_move(decoded.game, decoded.board, decoded.you, decoded.turn))
+    assert response["move"] in ("up", "down", "left", "right")
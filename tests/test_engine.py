@@ -0,0 +1,134 @@
+from battlesnake.engine import (
+    ELIMINATED_COLLISION,
+    ELIMINATED_HEAD_TO_HEAD,
+    ELIMINATED_OUT_OF_BOUNDS,
+    ELIMINATED_OUT_OF_HEALTH,
+    ELIMINATED_SQUAD,
+    HTTPPlayer,
+    LocalGame,
+    ModulePlayer,
+    default_settings,
+    play,
+    summarize,
+)
+from battlesnake.utils.classes import Request
+import battlesnake.madsnake as madsnake
+
+
+def _game(ruleset="standard", width=11, height=11, **settings):
+    settings.setdefault("food_spawn_chance", 0)
+    settings.setdefault("minimum_food", 0)
+    return LocalGame(width, height, ruleset, default_settings(**settings), seed=1)
+
+
+def _body(game, id):
+    snake = next(snake for snake in game.snakes if snake.id == id)
+    return [(game.geometry.xs[cell], game.geometry.ys[cell]) for cell in snake.body]
+
+
+def _cause(game, id):
+    return next(snake for snake in game.snakes if snake.id == id).eliminated
+
+
+def test_move_feed_and_grow():
+    game = _game()
+    game.add_snake("a", [(1, 1), (1, 0), (0, 0)], health=50)
+    game.add_snake("b", [(8, 8), (8, 9), (8, 10)])
+    game.food = {game.geometry.index(1, 2)}
+    game.step({"a": "up", "b": "sideways"})  # b keeps going down
+    assert _body(game, "a") == [(1, 2), (1, 1), (1, 0), (1, 0)]
+    assert _body(game, "b") == [(8, 7), (8, 8), (8, 9)]
+    assert [snake.health for snake in game.snakes] == [100, 99]
+    assert not game.food and game.turn == 1
+
+
+def test_eliminations():
+    game = _game()
+    game.add_snake("wall", [(0, 5), (1, 5), (2, 5)])
+    game.add_snake("short", [(5, 5), (5, 4)])
+    game.add_snake("long", [(7, 5), (8, 5), (9, 5)])
+    game.add_snake("body", [(7, 6), (7, 7), (7, 8)])
+    game.add_snake("starving", [(3, 9), (3, 10)], health=1)
+    game.step({"wall": "left", "short": "right", "long": "left", "body": "down", "starving": "down"})
+    assert _cause(game, "wall") == ELIMINATED_OUT_OF_BOUNDS
+    assert _cause(game, "short") == ELIMINATED_HEAD_TO_HEAD
+    assert _cause(game, "long") == ""
+    assert _cause(game, "body") == ELIMINATED_COLLISION
+    assert _cause(game, "starving") == ELIMINATED_OUT_OF_HEALTH
+    assert game.is_over() and game.winner() == "long"
+
+
+def test_hazard_damage_spares_food():
+    game = _game("royale", hazard_damage=14)
+    game.add_snake("a", [(0, 1), (1, 1)])
+    game.add_snake("b", [(10, 1), (9, 1)])
+    game.hazards = {game.geometry.index(0, 2), game.geometry.index(10, 2)}
+    game.food = {game.geometry.index(10, 2)}
+    game.step({"a": "up", "b": "up"})
+    assert [snake.health for snake in game.snakes] == [100 - 1 - 14, 100]
+
+
+def test_royale_shrinks_every_n_turns():
+    game = _game("royale", shrink_every=2)
+    game.add_snake("a", [(5, 5), (5, 4)])
+    game.add_snake("b", [(2, 2), (2, 1)])
+    moves = [("left", "right"), ("down", "up"), ("right", "left"), ("up", "down")]
+    for turn, (a, b) in enumerate(moves, 1):
+        game.step({"a": a, "b": b})
+        assert len(game.hazards) == {1: 0, 2: 11, 3: 11, 4: 21}[turn]
+
+
+def test_wrapped_board():
+    game = _game("wrapped")
+    game.add_snake("a", [(0, 5), (1, 5)])
+    game.add_snake("b", [(5, 10), (5, 9)])
+    game.step({"a": "left", "b": "up"})
+    assert _body(game, "a")[0] == (10, 5) and _body(game, "b")[0] == (5, 0)
+    assert not game.is_over()
+
+
+def test_squads():
+    game = _game("squad", allow_body_collisions=True, shared_elimination=True, shared_health=True)
+    game.add_snake("red-1", [(5, 5), (4, 5), (3, 5)], squad="red")
+    game.add_snake("red-2", [(4, 6), (4, 7)], squad="red", health=40)
+    game.add_snake("blue-1", [(8, 8), (8, 9)], squad="blue")
+    game.add_snake("blue-2", [(10, 2), (9, 2)], squad="blue")
+    # red-2 moves through the body of red-1, blue-2 leaves the board and takes blue-1 along
+    game.step({"red-1": "up", "red-2": "down", "blue-1": "down", "blue-2": "right"})
+    assert _cause(game, "red-2") == ""
+    assert [snake.health for snake in game.snakes[:2]] == [99, 99]
+    assert _cause(game, "blue-2") == ELIMINATED_OUT_OF_BOUNDS and _cause(game, "blue-1") == ELIMINATED_SQUAD
+    assert game.is_over() and game.winner() == "red"
+
+
+def test_solo_and_spawn():
+    game = LocalGame(7, 7, "solo", default_settings(minimum_food=3), seed=2)
+    game.place_snakes(["a"])
+    assert not game.is_over()
+    game.step({"a": "up"})
+    assert len(game.food) >= 3
+
+
+def test_requests_match_the_payload():
+    game = LocalGame(19, 19, "royale", seed=3)
+    game.place_snakes(["a", "b", "c", "d", "e"])
+    requests = game.requests()
+    for id, request in requests.items():
+        assert Request.parse_obj(game.payload(id)) == request
+        assert request.you is next(snake for snake in request.board.snakes if snake.id == id)
+
+
+def test_play_in_process_and_over_http():
+    result = play({"a": ModulePlayer(madsnake, seed=1), "b": ModulePlayer("bazuso", smart=False, seed=2)}, seed=4)
+    assert result.turns > 0 and set(result.latencies) == {"a", "b"}
+    result = play({"a": HTTPPlayer(madsnake.api), "b": ModulePlayer(madsnake, seed=3)}, seed=5, max_turns=3)
+    assert 0 < result.turns <= 3 and len(result.latencies["a"]) == result.turns
+    summary = summarize([result], 1.0)
+    assert summary["games"] == 1 and "a" in summary["latency_ms"]
+
+
+def test_safe_games_last():
+    # Snakes playing only safe moves live until they starve or get cornered, not a few turns
+    players = {"a": ModulePlayer("bazuso", smart=False, seed=1), "b": ModulePlayer(madsnake, smart=False, seed=2)}
+    summary = summarize([play(players, seed=game) for game in range(20)], 1.0)
+    assert summary["turns"] > 50
@@ -0,0 +1,128 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Coordinate
+from battlesnake.utils.fields import UNREACHABLE, DistanceField, get_distance_field, release_times
+from battlesnake.utils.geometry import get_geometry
+from battlesnake.utils.payloads import make_request, make_snake
+import battlesnake.utils.snakebrain as snakebrain
+import random
+
+
+def _state(snakes, width=7, height=7, food=(), ruleset="standard"):
+    return BoardState.from_board(make_request(snakes, width, height, food=food).board, ruleset)
+
+
+def test_dilate_matches_the_move_tables():
+    rng = random.Random(3)
+    for ruleset in ("standard", "wrapped"):
+        geometry = get_geometry(7, 5, ruleset)
+        for _ in range(50):
+            mask = rng.getrandbits(geometry.size)
+            expected = mask
+            for cell in range(geometry.size):
+                if mask >> cell & 1:
+                    for neighbour in geometry.neighbours[cell]:
+                        expected |= 1 << neighbour
+            assert geometry.dilate(mask) == expected
+
+
+def test_release_times_follow_the_tail():
+    state = _state([make_snake("you", [(1, 1), (1, 2), (1, 3), (1, 3)])])
+    geometry = state.geometry
+    # The stacked tail stays one more turn
+    assert release_times(state) == {
+        4: geometry.bits[geometry.index(1, 1)],
+        3: geometry.bits[geometry.index(1, 2)],
+        2: geometry.bits[geometry.index(1, 3)],
+    }
+
+
+def test_distances_go_around_bodies_until_they_leave():
+    wall = [(3, y) for y in range(6)]
+    state = _state([make_snake("you", [(1, 1), (1, 0), (0, 0)]), make_snake("wall", wall)])
+    field = DistanceField(state)
+    index = state.geometry.index
+    assert field.distance("you", index(1, 1)) == 0
+    assert field.distance("you", index(2, 1)) == 1
+    # (3, 5) is the tail of the wall, gone after one turn
+    assert field.distance("you", index(3, 5)) == 6
+    # (3, 1) is free after five turns: through it rather than around the wall
+    assert field.distance("you", index(3, 1)) == 5
+    assert field.distance("you", index(5, 1)) == 7
+    assert field.distance("nobody", index(5, 1)) == UNREACHABLE
+
+
+def test_voronoi_owners_and_territory():
+    state = _state([make_snake("you", [(1, 1), (1, 0), (0, 0)]), make_snake("other", [(5, 5), (5, 6), (6, 6)])])
+    field = DistanceField(state)
+    index = state.geometry.index
+    assert field.owner(index(2, 1)) == "you"
+    assert field.owner(index(5, 4)) == "other"
+    # Same distance, same length: nobody owns it
+    assert field.owner(index(3, 3)) is None
+    assert field.contested >> index(3, 3) & 1
+    assert field.territory("you") == field.territory("other")
+    assert field.territory("you") + field.territory("other") + bin(field.contested).count("1") == 49
+
+    # The longer snake wins the ties
+    state = _state([make_snake("you", [(1, 1), (1, 0), (0, 0)]), make_snake("other", [(5, 5), (5, 6), (6, 6), (6, 5)])])
+    field = DistanceField(state)
+    assert field.owner(index(3, 3)) == "other"
+    assert field.territory("other") > field.territory("you")
+
+
+def test_nearest_and_furthest_keep_every_tie():
+    state = _state([make_snake("you", [(3, 3), (3, 2), (3, 1)])])
+    field = DistanceField(state)
+    index = state.geometry.index
+    cells = [index(5, 3), index(1, 3), index(3, 6), index(0, 0)]
+    assert field.nearest("you", cells) == [index(5, 3), index(1, 3)]
+    assert field.furthest("you", cells) == [index(0, 0)]
+    assert field.nearest("you", []) == []
+
+
+def test_wrapped_distances():
+    state = _state([make_snake("you", [(0, 3), (1, 3), (2, 3)])], ruleset="wrapped")
+    field = DistanceField(state)
+    assert field.distance("you", state.geometry.index(6, 3)) == 1
+
+
+def test_field_is_built_once_per_turn():
+    request = make_request([make_snake("you", [(3, 3), (3, 2), (3, 1)])])
+    assert snakebrain.get_distance_field(request.board) is get_distance_field(request.board._state)
+
+
+def test_closest_snake_is_never_you():
+    request = make_request(
+        [
+            make_snake("you", [(1, 1), (1, 0), (0, 0)]),
+            make_snake("far", [(6, 6), (6, 5), (6, 4)]),
+            make_snake("near", [(3, 1), (4, 1), (5, 1)]),
+        ],
+        7,
+        7,
+    )
+    assert snakebrain.get_closest_snake(request.board, request.you).id == "near"
+    alone = make_request([make_snake("you", [(1, 1), (1, 0), (0, 0)])])
+    assert snakebrain.get_closest_snake(alone.board, alone.you) is None
+
+
+def test_nearest_coord_keeps_the_first_tie():
+    coords = [Coordinate(x=3, y=5), Coordinate(x=7, y=5), Coordinate(x=5, y=9)]
+    start = Coordinate(x=5, y=5)
+    assert snakebrain.get_nearest_coord(start, coords, None) == Coordinate(x=3, y=5)
+    assert snakebrain.get_furthest_coord(start, coords, None) == Coordinate(x=5, y=9)
+
+
+def test_food_target_is_reachable():
+    # The food in the corner is closer as the crow flies, but behind the body of "box" for ten turns
+    box = [(0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (3, 0), (4, 0), (5, 0), (6, 0), (6, 1), (6, 2), (6, 3)]
+    request = make_request(
+        [make_snake("you", [(3, 3), (3, 4), (3, 5)]), make_snake("box", box)], 7, 7, food=[(1, 1), (0, 6)]
+    )
+    assert snakebrain.get_food_target(request.board, request.you) == Coordinate(x=0, y=6)
+    path = snakebrain.chase_close_food(request.board, request.you, None)
+    assert path[0] == (3, 3) and path[-1] == (0, 6)
+
+    hungry = make_request([make_snake("you", [(3, 3), (3, 4), (3, 5)])], 7, 7)
+    assert snakebrain.chase_close_food(hungry.board, hungry.you, None) is None
+    assert snakebrain.chase_far_food(hungry.board, hungry.you, None) is None
@@ -0,0 +1,148 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board
+from battlesnake.utils.decode import decode_move
+from battlesnake.utils.gamestore import GameStore
+from battlesnake.utils.payloads import make_payload, make_snake
+import copy
+import json
+
+
+DELTAS = {"up": (0, 1), "down": (0, -1), "left": (-1, 0), "right": (1, 0)}
+
+
+def _step(payload, moves, spawn=(), hazards=()):
+    """Next turn of payload: move the snakes, feed them and grow their tail like the game engine does"""
+    payload = copy.deepcopy(payload)
+    board = payload["board"]
+    for snake in board["snakes"]:
+        dx, dy = DELTAS[moves[snake["id"]]]
+        head = {"x": snake["head"]["x"] + dx, "y": snake["head"]["y"] + dy}
+        snake["body"] = [head] + snake["body"][:-1]
+        snake["head"] = head
+        if head in board["food"]:
+            board["food"].remove(head)
+            snake["body"].append(dict(snake["body"][-1]))
+        snake["length"] = len(snake["body"])
+    board["food"] += [{"x": x, "y": y} for x, y in spawn]
+    board["hazards"] += [{"x": x, "y": y} for x, y in hazards]
+    payload["you"] = board["snakes"][0]
+    payload["turn"] += 1
+    return payload
+
+
+def _assert_same_state(state, payload):
+    expected = BoardState.from_board(Board.parse_obj(payload["board"]))
+    assert (state.food, state.hazards, state.heads, state.bodies) == (
+        expected.food,
+        expected.hazards,
+        expected.heads,
+        expected.bodies,
+    )
+    for id, snake in expected.snakes.items():
+        assert state.snakes[id].body == snake.body
+        assert state.snakes[id].mask == snake.mask
+
+
+def _game():
+    return make_payload(
+        [make_snake("you", [(1, 1), (1, 1), (1, 1)]), make_snake("other", [(8, 8), (8, 8), (8, 8)])],
+        food=[(1, 3), (8, 6)],
+    )
+
+
+def test_store_follows_the_game_incrementally():
+    store = GameStore()
+    payload = _game()
+    key = (payload["game"]["id"], "you")
+    store.start(key, Board.parse_obj(payload["board"]), "standard")
+
+    turns = [
+        ({"you": "up", "other": "down"}, (), ()),
+        ({"you": "up", "other": "down"}, (), ()),  # Both snakes eat
+        ({"you": "right", "other": "left"}, [(5, 5)], ()),
+        ({"you": "right", "other": "down"}, (), [(0, 0), (0, 1)]),
+        ({"you": "down", "other": "down"}, (), ()),
+        ({"you": "left", "other": "right"}, (), ()),
+    ]
+    for moves, spawn, hazards in turns:
+        payload = _step(payload, moves, spawn, hazards)
+        record = store.update(key, Board.parse_obj(payload["board"]), "standard", payload["turn"])
+        assert not record.diff.rebuilt
+        _assert_same_state(record.state, payload)
+
+    assert list(record.histories["you"]) == [12, 23, 34, 35, 36, 25, 24]
+    record = store.get(key)
+    assert record.turn == 6
+
+    # The same follow up works from decoded bodies
+    payload = _step(payload, {"you": "up", "other": "up"})
+    record = store.update(key, decode_move(json.dumps(payload)).board, "standard", payload["turn"])
+    assert not record.diff.rebuilt
+    _assert_same_state(record.state, payload)
+
+
+def test_diff_reports_changes():
+    store = GameStore()
+    payload = _game()
+    key = ("game", "you")
+    store.start(key, Board.parse_obj(payload["board"]), "standard")
+    first = _step(payload, {"you": "up", "other": "down"})
+    second = _step(first, {"you": "up", "other": "down"}, spawn=[(4, 4)], hazards=[(0, 0)])
+    store.update(key, Board.parse_obj(first["board"]), "standard", 1)
+    record = store.update(key, Board.parse_obj(second["board"]), "standard", 2)
+
+    diff = record.diff
+    assert diff.heads == {"you": 3 * 11 + 1, "other": 6 * 11 + 8}
+    assert diff.eaten == (1 << (3 * 11 + 1)) | (1 << (6 * 11 + 8))
+    assert diff.spawned == 1 << (4 * 11 + 4)
+    assert diff.hazards_added == 1
+    assert diff.tails == {"you": [], "other": []}
+
+
+def test_hazards_moving_without_changing_count():
+    # Like a spiral map: the hazard of the previous turn is gone, a new one took its place
+    store = GameStore()
+    payload = _game()
+    payload["board"]["hazards"] = [{"x": 0, "y": 0}]
+    key = ("game", "you")
+    store.start(key, Board.parse_obj(payload["board"]), "standard")
+    payload = _step(payload, {"you": "up", "other": "down"})
+    payload["board"]["hazards"] = [{"x": 1, "y": 0}]
+    record = store.update(key, Board.parse_obj(payload["board"]), "standard", 1)
+    assert not record.diff.rebuilt
+    _assert_same_state(record.state, payload)
+    assert (record.diff.hazards_added, record.diff.hazards_removed) == (1 << 1, 1 << 0)
+
+
+def test_missed_turns_and_eliminations_rebuild():
+    store = GameStore()
+    payload = _game()
+    key = ("game", "you")
+    store.start(key, Board.parse_obj(payload["board"]), "standard")
+    payload = _step(_step(payload, {"you": "up", "other": "down"}), {"you": "up", "other": "down"})
+    record = store.update(key, Board.parse_obj(payload["board"]), "standard", payload["turn"])
+    assert record.diff.rebuilt
+    _assert_same_state(record.state, payload)
+
+    payload = _step(payload, {"you": "right", "other": "left"})
+    del payload["board"]["snakes"][1]
+    record = store.update(key, Board.parse_obj(payload["board"]), "standard", payload["turn"])
+    assert record.diff.eliminated == ["other"]
+    assert "other" not in record.histories
+    _assert_same_state(record.state, payload)
+
+
+def test_store_is_bounded():
+    board = Board.parse_obj(_game()["board"])
+    store = GameStore(max_games=3, ttl=60)
+    for game in range(5):
+        store.start((f"game-{game}", "you"), board, "standard")
+    assert len(store) == 3
+    assert ("game-0", "you") not in store and ("game-4", "you") in store
+
+    store.get(("game-2", "you")).last_seen -= 120
+    store.start(("game-5", "you"), board, "standard")
+    assert ("game-2", "you") not in store
+
+    assert store.end(("game-5", "you")) is not None
+    assert ("game-5", "you") not in store
@@ -0,0 +1,46 @@
+from battlesnake.utils.classes import Coordinate
+from battlesnake.utils.geometry import get_geometry
+from battlesnake.utils.payloads import make_request, make_snake
+import battlesnake.utils.snakebrain as snakebrain
+
+
+def test_geometry_is_shared_per_size_and_ruleset():
+    assert get_geometry(11, 11) is get_geometry(11, 11, "standard")
+    assert get_geometry(11, 11, "wrapped") is not get_geometry(11, 11)
+    assert get_geometry(19, 19).size == 361
+
+
+def test_moves_and_neighbours():
+    geometry = get_geometry(7, 5)
+    corner = geometry.index(0, 0)
+    assert geometry.moves[corner] == (geometry.index(0, 1), -1, -1, geometry.index(1, 0))
+    assert sorted(geometry.neighbours[corner]) == sorted([geometry.index(0, 1), geometry.index(1, 0)])
+    assert geometry.index(7, 0) == -1
+    assert geometry.move_between(corner, geometry.index(1, 0)) == "right"
+    assert geometry.move_between(corner, geometry.index(2, 0)) is None
+
+
+def test_wrapped_moves_and_distances():
+    geometry = get_geometry(11, 11, "wrapped")
+    corner = geometry.index(0, 0)
+    assert geometry.moves[corner] == (geometry.index(0, 1), geometry.index(0, 10), geometry.index(10, 0), 1)
+    assert geometry.distance(corner, geometry.index(10, 10)) == 2
+    assert get_geometry(11, 11).distance(corner, geometry.index(10, 10)) == 20
+
+
+def test_snakebrain_reads_geometry():
+    request = make_request(
+        [make_snake("you", [(0, 5), (1, 5), (2, 5)])], food=[(4, 5), (10, 5)], ruleset="wrapped", map="standard"
+    )
+    board, you = request.board, request.you
+    snakebrain.get_board_state(board, request.game.ruleset.name)
+    assert snakebrain.manhattan_distance(you.head, Coordinate(x=10, y=5), board) == 1
+    assert snakebrain.manhattan_distance(you.head, Coordinate(x=10, y=5)) == 10
+    assert snakebrain.get_nearest_coord(you.head, board.food, None, board) == Coordinate(x=10, y=5)
+    assert snakebrain.get_index(Coordinate(x=3, y=2), board) == 25
+    assert snakebrain.get_coord_from_index(25, board) == Coordinate(x=3, y=2)
+
+
+def test_is_move_safe_off_board():
+    request = make_request([make_snake("you", [(5, 0), (5, 1), (5, 2)])])
+    assert not snakebrain.is_move_safe(request.board, request.you, "down")
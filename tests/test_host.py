@@ -0,0 +1,33 @@
+from battlesnake.host import create_app
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.payloads import make_payload, make_snake
+from fastapi.testclient import TestClient
+import battlesnake.bazuso as bazuso
+import battlesnake.madsnake as madsnake
+
+CLIENT = TestClient(create_app(["bazuso", "madsnake"]))
+
+
+def test_info():
+    index = CLIENT.get("/").json()
+    assert set(index) == {"bazuso", "madsnake"}
+    assert index["madsnake"]["path"] == "/madsnake" and index["madsnake"]["author"] == madsnake.INFO["author"]
+    # With and without the trailing slash
+    assert CLIENT.get("/bazuso").json() == CLIENT.get("/bazuso/").json() == bazuso.INFO
+    assert CLIENT.get("/smartypants/").status_code == 404
+
+
+def test_moves_and_metrics_per_bot():
+    snakes = [make_snake("bazuso", [(5, 5), (5, 4), (5, 3)]), make_snake("madsnake", [(1, 1), (1, 2), (1, 3)])]
+    for you, name in enumerate(("bazuso", "madsnake")):
+        payload = make_payload(snakes, you=you, food=[(8, 8)], turn=0)
+        assert CLIENT.post(f"/{name}/start", json=payload).status_code == 200
+        payload["turn"] = 1
+        assert CLIENT.post(f"/{name}/move", json=payload).json()["move"] in ("up", "down", "left", "right")
+        # One game store for the process, one record per snake
+        assert GAMES.get((payload["game"]["id"], name)).moves == 1
+        assert CLIENT.post(f"/{name}/end", json=payload).status_code == 200
+
+    text = CLIENT.get("/metrics").text
+    assert 'battlesnake_phase_seconds_count{bot="bazuso",phase="move"}' in text
+    assert 'battlesnake_phase_seconds_count{bot="madsnake",phase="move"}' in text
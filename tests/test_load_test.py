@@ -0,0 +1,43 @@
+from benchmarks.load_test import HTTPTransport, get_transport, percentile, run_load, synthetic_bodies
+import asyncio
+import json
+
+
+def test_in_process_load():
+    bodies = synthetic_bodies(count=8)
+    result = asyncio.run(run_load(get_transport("madsnake"), bodies, concurrency=4, requests=20))
+    report = result.report()
+    assert (report["requests"], report["errors"]) == (20, 0)
+    assert len(result.latencies) == 20 and report["throughput"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+    assert sum(point["requests"] for point in report["curve"]) == 20
+
+
+def test_http_transport_and_errors():
+    async def handler(reader, writer):
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            length = int(request.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            body = json.loads(await reader.readexactly(length))
+            status = b"200 OK" if body["turn"] % 2 == 0 else b"500 Internal Server Error"
+            content = b'{"move": "up"}'
+            writer.write(b"HTTP/1.1 %s\r\nContent-Length: %d\r\n\r\n%s" % (status, len(content), content))
+            await writer.drain()
+
+    async def run():
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        bodies = [json.dumps({"game": {"timeout": 500}, "turn": turn}).encode() for turn in range(4)]
+        transport = HTTPTransport(f"http://127.0.0.1:{port}")
+        assert await transport.post("/move", bodies[0]) == (200, b'{"move": "up"}')
+        result = await run_load(transport, bodies, concurrency=2, rate=200, requests=8)
+        server.close()
+        return result
+
+    result = asyncio.run(run())
+    assert (result.requests, result.errors, len(result.latencies)) == (8, 4, 4)
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0 and percentile(values, 0.99) == 100.0 and percentile([], 0.5) == 0.0
@@ -0,0 +1,75 @@
+from battlesnake.utils import logger as log
+import contextvars
+import logging
+import threading
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class Formatted:
+    """Argument recording the threads formatting it"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.get_ident())
+        return "formatted"
+
+
+def test_formatters_are_cached():
+    formatter = log.CustomFormatter()
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "hello %s", ("you",), None)
+    cached = formatter.formatters[logging.INFO]
+    assert "hello you" in formatter.format(record)
+    assert formatter.formatters[logging.INFO] is cached
+    assert formatter.format(record).startswith(log.CustomFormatter.green)
+
+
+def test_setup_once():
+    first = log.setup_logger("BattleSnake.test-development", "development")
+    assert log.setup_logger("BattleSnake.test-development") is first
+    assert len(first.handlers) == 1 and first.level == logging.DEBUG
+
+
+def test_production_profile_samples_games():
+    name = "BattleSnake.test-production"
+    logger = log.setup_logger(name, "production")
+    capture = Capture()
+    log._LISTENERS[name].handlers = (capture,)
+    assert logger.level == logging.WARNING  # Nothing sampled or traced
+
+    def request(game_id, level, message, *args):
+        log.set_game(game_id)
+        logger.log(level, message, *args)
+
+    argument = Formatted()
+    contextvars.copy_context().run(request, "game-1", logging.INFO, "skipped %s", argument)
+    contextvars.copy_context().run(request, "game-1", logging.WARNING, "warning %s", argument)
+    log.trace("game-2")
+    try:
+        assert logger.level == logging.DEBUG
+        contextvars.copy_context().run(request, "game-1", logging.DEBUG, "not traced")
+        contextvars.copy_context().run(request, "game-2", logging.DEBUG, "traced")
+    finally:
+        log.trace("game-2", enabled=False)
+    assert logger.level == logging.WARNING
+    log.stop_listeners()
+
+    assert capture.messages == ["warning formatted", "traced"]
+    # Formatted once, by the listener thread
+    assert len(argument.threads) == 1 and argument.threads[0] != threading.get_ident()
+
+
+def test_sampling_is_per_game(monkeypatch):
+    monkeypatch.setattr(log, "SAMPLE_RATE", 0.5)
+    sampled = [log.is_sampled(f"game-{index}") for index in range(1000)]
+    assert 400 < sum(sampled) < 600
+    assert sampled == [log.is_sampled(f"game-{index}") for index in range(1000)]
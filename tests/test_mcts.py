@@ -0,0 +1,116 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board
+from battlesnake.utils.mcts import (
+    Node,
+    in_process,
+    iterate,
+    restore,
+    search,
+    share_cpus,
+    shutdown_pool,
+    snapshot,
+    warm_up,
+)
+from battlesnake.utils.payloads import make_payload, make_snake, random_payload
+from battlesnake.utils.search import SearchResult, SearchState
+import battlesnake.utils.mcts as mcts
+import random
+
+
+def _state(payload, you="you"):
+    board_state = BoardState.from_board(Board.parse_obj(payload["board"]))
+    return SearchState.from_board_state(board_state, you, max_opponents=16)
+
+
+def _position(state):
+    return state.hash, state.food, bytes(state.counts), [(list(s.body), s.health, s.alive) for s in state.snakes]
+
+
+def test_snapshot_round_trip():
+    state = _state(random_payload(random.Random(1), 11, 11, snakes=6, length=5, food=4, hazard_rings=1), "snake-0")
+    assert _position(restore(snapshot(state))) == _position(state)
+
+
+def test_playouts_leave_the_position_unchanged():
+    state = _state(random_payload(random.Random(2), 11, 11, snakes=4, length=4, food=6), "snake-0")
+    before = _position(state)
+    root = Node(state)
+    rng = random.Random(0)
+    for _ in range(200):
+        iterate(state, root, rng)
+    assert _position(state) == before
+    assert root.count == 200 and sum(root.visits[0]) == 200
+
+
+def test_search_avoids_a_dead_end():
+    # Going up leads into a one cell pocket
+    payload = make_payload(
+        [
+            make_snake("you", [(0, 3), (0, 2), (0, 1), (0, 0)]),
+            make_snake("wall", [(4, 4), (3, 4), (2, 4), (1, 4), (1, 5), (0, 5), (0, 6), (1, 6), (2, 6)]),
+        ],
+        width=7,
+        height=7,
+    )
+    result = search(_state(payload), 0.2, workers=1)
+    assert result.move == "right"
+    assert result.rollouts > 0 and 0 < result.confidence <= 1
+
+
+def test_search_merges_the_workers():
+    payload = random_payload(random.Random(4), 11, 11, snakes=4, length=4, food=6)
+    state = _state(payload, "snake-0")
+    warm_up(2)
+    try:
+        result = search(state, 0.2, workers=2)
+    finally:
+        shutdown_pool()
+    assert result.move in ("up", "down", "left", "right")
+    assert sum(result.visits.values()) == result.rollouts
+    assert result.rollouts_per_second > 0
+
+
+def test_search_keeps_its_best_move_so_far():
+    state = _state(random_payload(random.Random(5), 11, 11, snakes=4, length=4, food=6), "snake-0")
+    partial = SearchResult(None, -float("inf"), 0, 0, 0.0)
+    result = search(state, 0.1, workers=1, partial=partial)
+    assert result.rollouts >= mcts.REPORT_EVERY
+    assert partial.move in result.visits
+
+
+def test_search_records_no_move_off_the_board():
+    # Cornered: the only move the search tries is off the board
+    payload = make_payload(
+        [make_snake("you", [(0, 6), (1, 6), (2, 6)]), make_snake("other", [(0, 5), (0, 4), (1, 4), (2, 4), (3, 4)])],
+        width=7,
+        height=7,
+    )
+    state = _state(payload)
+    assert state.moves(state.snakes[0]) == [-1]
+    partial = SearchResult(None, -float("inf"), 0, 0, 0.0)
+    result = search(state, 0.05, workers=1, partial=partial)
+    assert result.rollouts > 0
+    assert result.visits == {} and result.move is None and partial.move is None
+
+
+def test_server_workers_share_the_cpus(monkeypatch):
+    monkeypatch.setattr(mcts, "WORKERS", mcts.WORKERS)
+    monkeypatch.setattr(mcts.os, "cpu_count", lambda: 8)
+    monkeypatch.delenv("BATTLESNAKE_MCTS_WORKERS", raising=False)
+    share_cpus(4)
+    assert mcts.WORKERS == 2
+    share_cpus(16)
+    assert mcts.WORKERS == 1
+    monkeypatch.setenv("BATTLESNAKE_MCTS_WORKERS", "3")
+    share_cpus(4)
+    assert mcts.WORKERS == 1
+
+
+def test_warm_up_searches_start_no_process(monkeypatch):
+    # Like the pre-fork warm-up of the server
+    monkeypatch.setattr(mcts, "WORKERS", 4)
+    state = _state(random_payload(random.Random(6), 11, 11, snakes=4, length=4, food=6), "snake-0")
+    with in_process():
+        warm_up()
+        assert search(state, 0.02).workers == 1
+    assert mcts._POOL is None and mcts.WORKERS == 4
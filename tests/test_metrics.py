@@ -0,0 +1,64 @@
+from battlesnake.utils.payloads import make_payload, make_snake
+from fastapi.testclient import TestClient
+import battlesnake.madsnake as madsnake
+import battlesnake.utils.metrics as metrics
+import json
+import threading
+
+
+def test_histogram_buckets_and_threads():
+    histogram = metrics.Histogram("test")
+    for seconds in (0.00005, 0.0003, 0.0003, 2.0):
+        histogram.observe(seconds)
+    thread = threading.Thread(target=histogram.observe, args=(0.02,))
+    thread.start()
+    thread.join()
+    values = histogram.snapshot()
+    assert values[0] == 1  # <= 100us
+    assert values[metrics.BUCKETS.index(0.0005)] == 2
+    assert values[metrics.BUCKETS.index(0.025)] == 1
+    assert values[len(metrics.BUCKETS)] == 1  # Above every bound
+    assert sum(values[:-1]) == 5
+    assert abs(values[-1] - 2.02065) < 1e-9
+
+
+def test_metrics_endpoint():
+    you = make_snake("you", [(5, 5), (5, 4), (5, 3)])
+    client = TestClient(madsnake.api)
+    before = metrics.snapshot().get("madsnake/request", [0])
+    assert client.post("/move", json=make_payload([you], food=[(8, 8)], turn=1)).status_code == 200
+    client.post("/end", json=make_payload([you], food=[(8, 8)], turn=1))
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE battlesnake_phase_seconds histogram" in text
+    for phase in ("parse", "safe", "smart", "move", "serialize", "request", "paths"):
+        assert f'battlesnake_phase_seconds_count{{bot="madsnake",phase="{phase}"}}' in text
+    assert sum(metrics.snapshot()["madsnake/request"][:-1]) == sum(before[:-1]) + 1
+    # Buckets are cumulative, the last one is the count
+    counts = [
+        float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith('battlesnake_phase_seconds_bucket{bot="madsnake",phase="move"')
+    ]
+    assert counts == sorted(counts)
+    count = [
+        line
+        for line in text.splitlines()
+        if line.startswith('battlesnake_phase_seconds_count{bot="madsnake",phase="move"')
+    ]
+    assert float(count[0].rsplit(" ", 1)[1]) == counts[-1]
+
+
+def test_worker_aggregation(tmp_path):
+    metrics.observe("aggregated", 0.001)
+    other = [0] * (len(metrics.BUCKETS) + 1) + [0.5]
+    other[0] = 3
+    with open(tmp_path / "1.json", "w") as file:
+        json.dump({"aggregated": other}, file)
+    mine = metrics.snapshot()["aggregated"]
+    total = metrics.collect(str(tmp_path))
+    assert total["aggregated"][0] == mine[0] + 3
+    assert abs(total["aggregated"][-1] - mine[-1] - 0.5) < 1e-9
+    assert len(list(tmp_path.iterdir())) == 2  # This worker saved its own
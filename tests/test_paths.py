@@ -0,0 +1,126 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Coordinate
+from battlesnake.utils.classes import Request
+from battlesnake.utils.fields import UNREACHABLE, DistanceField
+from battlesnake.utils.paths import PathTree, get_path_tree
+from battlesnake.utils.payloads import make_request, make_snake, random_payload
+from battlesnake.utils.threats import get_threat_map
+import battlesnake.utils.snakebrain as snakebrain
+import random
+
+
+def _request(snakes, food=(), hazards=()):
+    return make_request(snakes, 7, 7, food=food, hazards=hazards)
+
+
+def test_costs_on_open_cells_are_manhattan_distances():
+    state = BoardState.from_board(_request([make_snake("you", [(3, 3), (3, 2), (3, 1)])]).board)
+    tree = PathTree(state, state.snakes["you"].head)
+    geometry = state.geometry
+    # The body is below the head: nothing is in the way of the cells from its row up
+    for cell in range(geometry.width * 3, geometry.size):
+        if not state.bodies >> cell & 1:
+            assert tree.cost(cell) == geometry.distance(tree.start, cell)
+            path = tree.path(cell)
+            assert path[0] == tree.start and path[-1] == cell and len(path) == tree.cost(cell) + 1
+            assert all(b in geometry.neighbours[a] for a, b in zip(path, path[1:]))
+
+
+def test_moves_match_the_distance_field():
+    rng = random.Random(5)
+    for _ in range(20):
+        payload = random_payload(rng, 11, 11, snakes=4, length=rng.randint(3, 15), hazard_rings=1)
+        state = BoardState.from_board(Request.parse_obj(payload).board)
+        field = DistanceField(state)
+        for id, snake in state.snakes.items():
+            # Without damage the search is breadth first and agrees with the field, hazards only cost more
+            assert list(PathTree(state, snake.head).steps) == list(field.distance_table(id))
+            costs = PathTree(state, snake.head, 14).costs
+            assert all(cost >= steps for cost, steps in zip(costs, field.distance_table(id)))
+
+
+def test_hazards_cost_their_damage():
+    # A hazard wall between you and the food, with a gap at the top
+    hazards = [(4, y) for y in range(6)]
+    request = _request([make_snake("you", [(2, 1), (1, 1), (0, 1)])], food=[(6, 1)], hazards=hazards)
+    state = snakebrain.get_board_state(request.board)
+    food = state.index(Coordinate(x=6, y=1))
+    assert get_path_tree(state, "you", 0).cost(food) == 4
+    # Around the wall: 5 up, 4 right, 5 down, cheaper than crossing it (4 moves + 14)
+    assert get_path_tree(state, "you", 14).cost(food) == 14
+    path = snakebrain.chase_close_food(request.board, request.you, None, hazard_damage=14)
+    assert (4, 6) in path and not any(x == 4 and y < 6 for x, y in path)
+
+
+def test_bodies_block_until_the_tail_leaves():
+    wall = [(3, y) for y in range(6)]
+    state = BoardState.from_board(
+        _request([make_snake("you", [(1, 1), (1, 0), (0, 0)]), make_snake("wall", wall)]).board
+    )
+    tree = get_path_tree(state, "you")
+    index = state.geometry.index
+    # The own tail is free after a move, (3, 1) after five
+    assert tree.cost(index(0, 0)) == 2
+    assert tree.steps[index(3, 1)] >= 5
+    assert tree.cost(index(3, 6)) == 7
+
+
+def test_ranked_targets_fall_back_to_the_next_reachable_one():
+    # The food in the corner is closer as the crow flies, but behind the body of "box" for ten turns
+    box = [(0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (3, 0), (4, 0), (5, 0), (6, 0), (6, 1), (6, 2), (6, 3)]
+    request = _request([make_snake("you", [(3, 3), (3, 4), (3, 5)]), make_snake("box", box)], food=[(1, 1), (0, 6)])
+    state = snakebrain.get_board_state(request.board)
+    tree = snakebrain.get_path_tree(request.board, request.you)
+    corner, far = state.index(Coordinate(x=1, y=1)), state.index(Coordinate(x=0, y=6))
+    assert tree.rank([corner, far, -1]) == [far, corner]
+    assert tree.rank([corner, far], furthest=True) == [corner, far]
+    assert snakebrain.get_food_target(request.board, request.you) == Coordinate(x=0, y=6)
+    assert snakebrain.chase_far_food(request.board, request.you, None)[-1] == (1, 1)
+
+
+def test_no_food_and_no_snake():
+    request = _request([make_snake("you", [(3, 3), (3, 4), (3, 5)])])
+    assert snakebrain.chase_close_food(request.board, request.you, None) is None
+    assert snakebrain.chase_far_food(request.board, request.you, None) is None
+    state = snakebrain.get_board_state(request.board)
+    assert get_path_tree(state, "nobody").cost(0) == UNREACHABLE
+    assert get_path_tree(state, "nobody").path(0) is None
+
+
+def test_chase_head_goes_where_the_head_is_heading():
+    request = _request([make_snake("you", [(0, 3), (0, 2), (0, 1)]), make_snake("other", [(4, 3), (5, 3), (6, 3)])])
+    other = request.board.snakes[1]
+    path = snakebrain.chase_head(request.board, request.you, other, None)
+    assert path[0] == (0, 3) and path[-1] == (3, 3)
+    # On the first turn the body is stacked on the head: the nearest cell next to it
+    request = _request([make_snake("you", [(0, 3), (0, 2), (0, 1)]), make_snake("other", [(5, 5), (5, 5), (5, 5)])])
+    path = snakebrain.chase_head(request.board, request.you, request.board.snakes[1], None)
+    assert path[0] == (0, 3) and path[-1] in ((4, 5), (5, 4)) and len(path) == 7
+
+
+def test_tree_is_built_once_per_turn_and_damage():
+    request = _request([make_snake("you", [(3, 3), (3, 4), (3, 5)])])
+    board, you = request.board, request.you
+    assert snakebrain.get_path_tree(board, you) is snakebrain.get_path_tree(board, you)
+    assert snakebrain.get_path_tree(board, you, 0) is not snakebrain.get_path_tree(board, you)
+
+
+def test_searches_stop_at_their_targets():
+    rng = random.Random(8)
+    for _ in range(20):
+        payload = random_payload(rng, 11, 11, snakes=4, length=rng.randint(3, 15), hazard_rings=1)
+        state = BoardState.from_board(Request.parse_obj(payload).board)
+        start = state.snakes[payload["you"]["id"]].head
+        threats = get_threat_map(state, payload["you"]["id"])
+        targets = rng.sample(range(state.size), 4)
+        for damage, danger in ((0, 0), (14, 0), (0, 20)):
+            whole = PathTree(state, start, damage, threats, danger)
+            every = PathTree(state, start, damage, threats, danger, targets)
+            assert [every.cost(cell) for cell in targets] == [whole.cost(cell) for cell in targets]
+            nearest = PathTree(state, start, damage, threats, danger, targets, nearest=True)
+            assert nearest.rank(targets)[:1] == whole.rank(targets)[:1]
+            assert all(nearest.cost(cell) in (whole.cost(cell), UNREACHABLE) for cell in range(state.size))
+            # The nearest search settles fewer cells than the whole board
+            assert sum(cost != UNREACHABLE for cost in nearest.costs) <= sum(
+                cost != UNREACHABLE for cost in whole.costs
+            )
@@ -0,0 +1,89 @@
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.logger import GAME, set_game
+from battlesnake.utils.payloads import make_request, make_snake
+from battlesnake.utils.pipeline import MINIMUM_RESPONSE_MS, RESPONSE_MARGIN_MS, run_with_deadline
+from battlesnake.utils.search import search_budget
+import battlesnake.bazuso as bazuso
+import asyncio
+import time
+
+
+def test_response_budget():
+    margins = (RESPONSE_MARGIN_MS, MINIMUM_RESPONSE_MS)
+    assert search_budget(500, None, None, *margins) == (500 - 50 - 15) / 1000
+    assert search_budget(500, "300", 0.1, *margins) == (500 - 200 - 15) / 1000
+    assert search_budget(60, None, None, *margins) == 30 / 1000
+
+
+def test_run_with_deadline():
+    def slow(seconds):
+        time.sleep(seconds)
+        return "done"
+
+    def broken():
+        raise ValueError("broken")
+
+    async def run():
+        now = time.perf_counter()
+        assert await run_with_deadline(slow, 0.0, deadline=now + 1) == ("done", False)
+        assert await run_with_deadline(slow, 0.2, deadline=now + 0.02) == (None, True)
+        assert await run_with_deadline(broken, deadline=now + 1) == (None, False)
+
+    asyncio.run(run())
+
+
+def test_move_falls_back_when_the_smart_strategy_runs_late(monkeypatch):
+    def late(board, you, game, LOGGER, partial=None, deadline=None):
+        time.sleep(0.2)
+        return None, "up"
+
+    monkeypatch.setattr(bazuso, "get_smart_moves", late)
+    request = make_request([make_snake("you", [(5, 5), (5, 4), (5, 3)])], timeout=60)
+    begin = time.perf_counter()
+    response = asyncio.run(bazuso.choose_move(request.game, request.board, request.you, request.turn))
+    assert time.perf_counter() - begin < 0.1
+    assert response["move"] in bazuso.get_safe_moves(request.board, request.you)
+
+    record = GAMES.get((request.game.id, "you"))
+    assert (record.moves, record.timeouts, record.fallbacks) == (1, 1, 1)
+    assert len(record.remaining) == 1
+    GAMES.end((request.game.id, "you"))
+
+
+def test_late_search_plays_its_best_move_so_far(monkeypatch):
+    def deepening(board, you, game, LOGGER, partial, deadline):
+        partial.move = "left"
+        time.sleep(0.2)
+        return None, "up"
+
+    monkeypatch.setattr(bazuso, "get_smart_moves", deepening)
+    request = make_request([make_snake("you", [(5, 5), (5, 4), (5, 3)])], timeout=60)
+    response = asyncio.run(bazuso.choose_move(request.game, request.board, request.you, request.turn))
+    assert response["move"] == "left"
+    record = GAMES.end((request.game.id, "you"))
+    assert (record.timeouts, record.fallbacks) == (1, 0)
+
+
+def test_search_stops_on_the_clock_of_the_request(monkeypatch):
+    deadlines = []
+
+    def deepening(board, you, game, LOGGER, partial, deadline):
+        deadlines.append(deadline)
+        return None, None
+
+    monkeypatch.setattr(bazuso, "get_smart_moves", deepening)
+    request = make_request([make_snake("you", [(5, 5), (5, 4), (5, 3)])], timeout=500)
+    begin = time.perf_counter()
+    asyncio.run(bazuso.choose_move(request.game, request.board, request.you, request.turn))
+    end = time.perf_counter()
+    GAMES.end((request.game.id, "you"))
+    assert begin + search_budget(500) <= deadlines[0] <= end + search_budget(500)
+
+
+def test_smart_strategy_sees_the_request_context():
+    async def run():
+        set_game("context-game")
+        result, timed_out = await run_with_deadline(GAME.get, deadline=time.perf_counter() + 1)
+        return result, timed_out
+
+    assert asyncio.run(run()) == ("context-game", False)
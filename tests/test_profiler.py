@@ -0,0 +1,67 @@
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.payloads import make_payload, make_snake
+from battlesnake.utils.profiler import Capture, ProfileRing, ProfilerMiddleware
+from fastapi.testclient import TestClient
+import battlesnake.madsnake as madsnake
+import battlesnake.utils.metrics as metrics
+import pstats
+
+
+def move_payload(game_id):
+    payload = make_payload([make_snake("you", [(5, 5), (5, 4), (5, 3)])], food=[(8, 8)], turn=1)
+    payload["game"]["id"] = game_id
+    return payload
+
+
+def profiled_functions(path):
+    return {name for _, _, name in pstats.Stats(path).stats}
+
+
+def test_header_trigger(tmp_path):
+    middleware = ProfilerMiddleware(madsnake.api, directory=str(tmp_path), slow_fraction=0)
+    client = TestClient(middleware)
+    assert client.post("/move", json=move_payload("header-game")).status_code == 200
+    assert client.post("/move", json=move_payload("header-game"), headers={"X-Battlesnake-Profile": "1"}).json()
+    middleware._executor.shutdown(wait=True)
+    GAMES.end(("header-game", "you"))
+
+    captures = client.get("/profiles").json()
+    assert [capture["trigger"] for capture in captures] == ["header"]
+    name = captures[0]["name"]
+    response = client.get(f"/profiles/{name}.prof")
+    assert response.status_code == 200
+    (tmp_path / "download.prof").write_bytes(response.content)
+    functions = profiled_functions(str(tmp_path / "download.prof"))
+    # The move function on the event loop, the smart strategy in its thread
+    assert {"choose_move", "get_smart_moves"} <= functions
+    assert client.get(f"/profiles/{name}.json").json()["body"]["game"]["id"] == "header-game"
+    assert client.get("/profiles/..%2Fsecret.prof").status_code == 404
+    assert client.get("/profiles/missing.prof").status_code == 404
+
+
+def test_slow_trigger(tmp_path):
+    metrics.reset()
+    middleware = ProfilerMiddleware(madsnake.api, directory=str(tmp_path), slow_fraction=1e-9)
+    client = TestClient(middleware)
+    for _ in range(2):
+        assert client.post("/move", json=move_payload("slow-game")).status_code == 200
+    middleware._executor.shutdown(wait=True)
+    GAMES.end(("slow-game", "you"))
+    # The turn played again for the profile isn't counted
+    assert sum(metrics.snapshot()["madsnake/request"][:-1]) == 2
+
+    captures = middleware.ring.list()
+    # The second slow turn comes before the interval between two profiles
+    assert len(captures) == 1
+    assert captures[0]["trigger"] == "slow" and captures[0]["elapsed"] > 0 and captures[0]["rerun"] > 0
+    assert "get_smart_moves" in profiled_functions(str(tmp_path / f"{captures[0]['name']}.prof"))
+    assert GAMES.get(("profile-slow-game", "you")) is None
+
+
+def test_ring_keeps_the_newest(tmp_path):
+    ring = ProfileRing(str(tmp_path), keep=2)
+    capture = Capture()
+    capture.call(sum, [1, 2])
+    names = [ring.save(capture.stats(), {"trigger": "test"}, b'{"turn": %d}' % turn) for turn in range(3)]
+    assert ring.names() == names[1:]
+    assert len(list(tmp_path.iterdir())) == 4
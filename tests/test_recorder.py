@@ -0,0 +1,66 @@
+from battlesnake.replay import replay, summarize
+from battlesnake.utils.payloads import make_payload, make_snake
+from battlesnake.utils.recorder import HEADER, RecorderMiddleware, RecordLog, is_record_log
+from benchmarks.load_test import ASGITransport, load_bodies
+import asyncio
+import battlesnake.madsnake as madsnake
+import json
+
+
+def record_game(path):
+    you = make_snake("you", [(5, 5), (5, 4), (5, 3)])
+    other = make_snake("other", [(1, 1), (1, 2), (1, 3)])
+    bodies = [("/start", make_payload([you, other], food=[(8, 8)], turn=0))]
+    for turn in range(1, 4):
+        you["head"] = {"x": 5, "y": 5 + turn}
+        you["body"] = [you["head"]] + you["body"][:-1]
+        bodies.append(("/move", make_payload([you, other], food=[(8, 8)], turn=turn)))
+    bodies.append(("/end", make_payload([you, other], food=[(8, 8)], turn=4)))
+
+    middleware = RecorderMiddleware(madsnake.api, path=path)
+    transport = ASGITransport(middleware)
+
+    async def run():
+        return [await transport.post(route, json.dumps(body).encode()) for route, body in bodies]
+
+    answers = asyncio.run(run())
+    middleware.writer.close()
+    return bodies, answers
+
+
+def test_record_and_read(tmp_path):
+    path = str(tmp_path / "games.log")
+    bodies, answers = record_game(path)
+    assert is_record_log(path)
+
+    with RecordLog(path) as log:
+        assert len(log) == 5
+        assert [record.path for record in log] == ["/start", "/move", "/move", "/move", "/end"]
+        for record, (route, body), (status, content) in zip(log, bodies, answers):
+            assert status == 200
+            assert record.payload() == body
+            assert record.response == content
+            assert record.elapsed > 0
+        assert log[1].move() == json.loads(answers[1][1])["move"]
+        assert list(log.games()) == [(bodies[0][1]["game"]["id"], "you")]
+
+    # A record cut short by a crash is skipped
+    with open(path, "ab") as file:
+        file.write(HEADER.pack(0xB5AE, 1, 0.0, 0.0, 10, 100) + b"partial")
+    with RecordLog(path) as log:
+        assert len(log) == 5
+    assert len(load_bodies(path)) == 3
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / "games.log")
+    record_game(path)
+    with RecordLog(path) as log:
+        turns = replay(madsnake, log)
+        assert [turn.turn for turn in turns] == [1, 2, 3]
+        assert all(turn.replayed in ("up", "down", "left", "right") for turn in turns)
+        assert [turn.turn for turn in replay("madsnake", log, turn=2)] == [2]
+        assert replay(madsnake, log, game="other-game") == []
+    summary = summarize(turns)
+    assert (summary["turns"], summary["games"]) == (3, 1)
+    assert summary["replayed_ms"]["p50"] <= summary["replayed_ms"]["max"]
@@ -0,0 +1,123 @@
+from battlesnake import bazuso, madsnake, smartypants
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Request
+from battlesnake.utils.geometry import MOVES
+from battlesnake.utils.payloads import make_request, make_snake, random_payload
+from battlesnake.utils.safety import CONTESTED, DEADLY, HAZARD, SAFE, MoveSafety, get_move_safety
+from battlesnake.utils.threats import get_threat_map
+import battlesnake.utils.snakebrain as snakebrain
+import random
+
+
+def _safety(snakes, food=(), hazards=(), hazard_damage=14, ruleset="standard"):
+    request = make_request(snakes, 7, 7, food=food, hazards=hazards, ruleset=ruleset)
+    return MoveSafety(BoardState.from_board(request.board, ruleset), "you", hazard_damage)
+
+
+def _scores(safety):
+    return dict(zip(MOVES, safety.scores))
+
+
+def test_walls_and_bodies():
+    # In the corner, the neck below and the body of "other" to the right
+    safety = _safety(
+        [make_snake("you", [(0, 6), (0, 5), (0, 4)]), make_snake("other", [(2, 1), (1, 1), (1, 6), (2, 6)])]
+    )
+    assert _scores(safety) == {"up": DEADLY, "down": DEADLY, "left": DEADLY, "right": DEADLY}
+    assert safety.safest() == [] and safety.mask(CONTESTED) == 0
+
+    # The edge is safe, the tail of "other" leaves before you get there
+    safety = _safety(
+        [make_snake("you", [(0, 5), (0, 4), (0, 3)]), make_snake("other", [(3, 6), (2, 6), (1, 6), (1, 5)])]
+    )
+    assert _scores(safety) == {"up": SAFE, "down": DEADLY, "left": DEADLY, "right": SAFE}
+    assert safety.mask() == 0b1001
+
+
+def test_stacked_tails_stay():
+    safety = _safety([make_snake("you", [(1, 1), (1, 2), (2, 2), (2, 1), (2, 1)])])
+    assert safety.score("right") == DEADLY
+    safety = _safety([make_snake("you", [(1, 1), (1, 2), (2, 2), (2, 1)])])
+    assert safety.score("right") == SAFE
+
+
+def test_head_to_head():
+    # The head of "other" is two cells to the right: the cell between you is contested unless you are longer
+    you = make_snake("you", [(2, 3), (1, 3), (0, 3)])
+    safety = _safety([you, make_snake("other", [(4, 3), (5, 3), (6, 3)])])
+    assert safety.score("right") == CONTESTED
+    assert safety.safest() == ["up", "down"]
+    safety = _safety([you, make_snake("other", [(4, 3), (5, 3)])])
+    assert safety.score("right") == SAFE
+
+
+def test_hazards():
+    hazards = [(3, 4), (3, 2)]
+    snakes = [make_snake("you", [(3, 3), (2, 3), (1, 3)], health=50)]
+    safety = _safety(snakes, hazards=hazards)
+    assert _scores(safety) == {"up": HAZARD, "down": HAZARD, "left": DEADLY, "right": SAFE}
+    assert safety.safest() == ["right"] and safety.mask(HAZARD) == 0b1011
+
+    # Too weak to survive a hazard, but the food in one heals you
+    snakes = [make_snake("you", [(3, 3), (2, 3), (1, 3)], health=15)]
+    safety = _safety(snakes, hazards=hazards, food=[(3, 2)])
+    assert _scores(safety) == {"up": DEADLY, "down": HAZARD, "left": DEADLY, "right": SAFE}
+    assert _safety(snakes, hazards=hazards, hazard_damage=0).score("up") == SAFE
+
+
+def test_wrapped_edges():
+    safety = _safety([make_snake("you", [(0, 6), (0, 5), (0, 4)])], ruleset="wrapped")
+    assert _scores(safety) == {"up": SAFE, "down": DEADLY, "left": SAFE, "right": SAFE}
+
+
+def test_snakebrain_helpers():
+    request = make_request(
+        [make_snake("you", [(2, 3), (1, 3), (0, 3)]), make_snake("other", [(4, 3), (5, 3), (6, 3)])], 7, 7
+    )
+    board, you = request.board, request.you
+    assert snakebrain.is_move_safe(board, you, "right")
+    assert not snakebrain.is_move_safe_with_heads(board, you, "right")
+    assert snakebrain.is_move_safe_with_heads(board, you, "down")
+    assert not snakebrain.is_move_safe(board, you, "left")
+    assert snakebrain.get_move_safety(board, you) is get_move_safety(board._state, "you", snakebrain.HAZARD_DAMAGE)
+    for bot in (bazuso, madsnake, smartypants):
+        assert bot.get_safe_moves(board, you) == ["up", "down"]
+
+
+def test_safest_moves_never_collide():
+    # On random boards, a safe move never ends in a body that is still there after the move
+    rng = random.Random(9)
+    for _ in range(50):
+        payload = random_payload(rng, 11, 11, snakes=4, length=rng.randint(3, 15), hazard_rings=1)
+        request = Request.parse_obj(payload)
+        state = snakebrain.get_board_state(request.board)
+        for move in snakebrain.get_safe_moves(request.board, request.you):
+            cell = state.geometry.moves[state.snakes[request.you.id].head][MOVES.index(move)]
+            assert cell >= 0
+            for snake in state.snakes.values():
+                assert cell not in snake.body[:-1] or (snake.body[-2] == cell == snake.body[-1])
+
+
+def test_bots_use_the_hazard_damage_of_the_game():
+    # Too weak for a hazard of the default damage, not for one of the game
+    request = make_request([make_snake("you", [(3, 3), (2, 3), (1, 3)], health=10)], 7, 7, hazards=[(3, 4), (3, 2)])
+    board, you = request.board, request.you
+    for bot in (bazuso, madsnake, smartypants):
+        assert bot.get_safe_moves(board, you) == ["right"]
+        assert bot.get_safe_moves(board, you, 5) == ["right"]
+        assert sorted(bot.get_safe_moves(board, you, 0)) == ["down", "right", "up"]
+    assert get_move_safety(board._state, "you", 5) is not get_move_safety(board._state, "you", 14)
+
+
+def test_contested_moves_match_the_threat_map():
+    rng = random.Random(5)
+    for ruleset in ("standard", "wrapped"):
+        for _ in range(30):
+            payload = random_payload(rng, 11, 11, snakes=6, length=rng.randint(3, 10), ruleset=ruleset)
+            request = Request.parse_obj(payload)
+            state = BoardState.from_board(request.board, ruleset)
+            safety = MoveSafety(state, request.you.id)
+            within = get_threat_map(state, request.you.id).within[1]
+            for cell, score in zip(safety.cells, safety.scores):
+                if score != DEADLY:
+                    assert (score == CONTESTED) == bool(within >> cell & 1)
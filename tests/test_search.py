@@ -0,0 +1,110 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board
+from battlesnake.utils.payloads import make_payload, make_snake, random_payload
+from battlesnake.utils.search import SearchState, best_move, iterative_deepening, search_budget
+import random
+import time
+
+
+def _state(payload, you="you", hazard_damage=0, **kwargs):
+    board_state = BoardState.from_board(Board.parse_obj(payload["board"]))
+    return SearchState.from_board_state(board_state, you, hazard_damage, **kwargs)
+
+
+def _snapshot(state):
+    return (
+        state.food,
+        bytes(state.counts),
+        [(list(snake.body), snake.health, snake.alive) for snake in state.snakes],
+    )
+
+
+def test_make_unmake_restores_the_position():
+    rng = random.Random(11)
+    for seed in range(20):
+        payload = random_payload(random.Random(seed), 11, 11, snakes=4, length=4, food=10, hazard_rings=1)
+        state = _state(payload, "snake-0", hazard_damage=14, max_opponents=3)
+        stack = []
+        for _ in range(12):
+            moving = [snake for snake in state.snakes if snake.alive and snake.moving]
+            if not state.snakes[0].alive:
+                break
+            before = _snapshot(state)
+            undo = state.make(tuple(rng.choice(state.moves(snake)) for snake in moving))
+            stack.append((before, undo))
+        while stack:
+            before, undo = stack.pop()
+            state.unmake(undo)
+            assert _snapshot(state) == before
+
+
+def test_rules_of_a_turn():
+    payload = make_payload(
+        [make_snake("you", [(5, 5), (5, 4), (5, 3)]), make_snake("other", [(7, 5), (8, 5)], health=1)],
+        food=[(5, 6)],
+        hazards=[(6, 5)],
+    )
+    state = _state(payload, hazard_damage=14)
+    you, other = state.snakes
+    undo = state.make((state.geometry.index(5, 6), state.geometry.index(6, 5)))
+    assert you.health == 100 and list(you.body) == [71, 60, 49, 49]
+    assert not other.alive  # Starved
+    assert not state.food
+    state.unmake(undo)
+
+    # Head to head, the shorter snake dies
+    undo = state.make((state.geometry.index(6, 5), state.geometry.index(6, 5)))
+    assert you.alive and not other.alive
+    state.unmake(undo)
+
+
+def test_search_avoids_a_dead_end():
+    # Going left leads into a one cell pocket
+    payload = make_payload(
+        [
+            make_snake("you", [(1, 1), (2, 1), (3, 1), (4, 1), (5, 1)]),
+            make_snake("wall", [(1, 4), (1, 3), (1, 2), (0, 2), (0, 3), (0, 4), (0, 5)]),
+        ],
+        width=7,
+        height=7,
+    )
+    result = iterative_deepening(_state(payload), time.perf_counter() + 0.2)
+    assert result.move != "left"
+    assert result.depth >= 2
+
+
+def test_search_takes_a_winning_head_to_head():
+    # The only way out of the corner for "other" is (1, 1), where we win the head to head
+    payload = make_payload(
+        [
+            make_snake("you", [(2, 1), (2, 2), (1, 2), (0, 2), (0, 3), (0, 4)]),
+            make_snake("other", [(0, 1), (0, 0), (1, 0)]),
+        ],
+        width=7,
+        height=7,
+    )
+    result = iterative_deepening(_state(payload), time.perf_counter() + 0.2)
+    assert result.move == "left"
+    assert result.score > 0
+
+
+def test_search_respects_the_budget():
+    payload = random_payload(random.Random(5), 19, 19, snakes=8, length=8, food=10)
+    board_state = BoardState.from_board(Board.parse_obj(payload["board"]))
+    begin = time.perf_counter()
+    result = best_move(board_state, "snake-0", timeout=150)
+    assert time.perf_counter() - begin < 0.15
+    assert result.move in ("up", "down", "left", "right")
+    assert result.depth >= 1
+    # Started after the deadline of its request, like a search queued behind others: it stops at once
+    begin = time.perf_counter()
+    result = best_move(board_state, "snake-0", timeout=500, deadline=begin)
+    assert time.perf_counter() - begin < 0.05
+    assert result.move in ("up", "down", "left", "right")
+
+
+def test_search_budget():
+    assert search_budget(500) == (500 - 50 - 40) / 1000
+    assert search_budget(500, latency="300", processing=0.1) == (500 - 200 - 40) / 1000
+    assert search_budget(500, latency="", processing=0.1) == (500 - 50 - 40) / 1000
+    assert search_budget(50) == 20 / 1000
@@ -0,0 +1,39 @@
+from battlesnake.utils.payloads import make_payload, make_snake
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def test_forked_workers():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "battlesnake.server", "madsnake", "-w", "2", "--host", "127.0.0.1", "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    try:
+        payload = make_payload([make_snake("you", [(5, 5), (5, 4), (5, 3)])], food=[(8, 8)], turn=1)
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/move", json.dumps(payload).encode(), {"Content-Type": "application/json"}
+        )
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    assert response.headers["content-type"] == "application/json"
+                    assert json.loads(response.read())["move"] in ("up", "down", "left", "right")
+                    break
+            except OSError:
+                assert time.monotonic() < deadline, "The server never answered"
+                time.sleep(0.2)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
@@ -0,0 +1,121 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Request
+from battlesnake.utils.fields import UNREACHABLE, DistanceField
+from battlesnake.utils.paths import PathTree, get_path_tree
+from battlesnake.utils.payloads import make_request, make_snake, random_payload
+from battlesnake.utils.search import SearchState
+from battlesnake.utils.threats import EQUAL, HORIZON, LONGER, NEVER, SHORTER, ThreatMap, get_threat_map
+import battlesnake.utils.snakebrain as snakebrain
+import random
+
+
+def _state(snakes, width=7, height=7):
+    return BoardState.from_board(make_request(snakes, width, height).board)
+
+
+def test_turns_match_the_distance_field():
+    # Every opponent alone: its distances up to the horizon are the turns of the map
+    rng = random.Random(4)
+    for _ in range(20):
+        payload = random_payload(rng, 11, 11, snakes=4, length=rng.randint(3, 12), hazard_rings=1)
+        state = BoardState.from_board(Request.parse_obj(payload).board)
+        field = DistanceField(state)
+        you = next(iter(state.snakes))
+        threats = ThreatMap(state, you)
+        for cell in range(state.size):
+            nearest = min(field.distance(id, cell) for id in state.snakes if id != you)
+            assert threats.turn(cell) == (nearest if nearest <= HORIZON else NEVER)
+            danger = min(
+                (
+                    field.distance(id, cell)
+                    for id, snake in state.snakes.items()
+                    if id != you and len(snake.body) >= len(state.snakes[you].body)
+                ),
+                default=UNREACHABLE,
+            )
+            assert threats.dangers[cell] == (danger if danger <= HORIZON else NEVER)
+            assert threats.is_dangerous(cell, HORIZON) == (danger <= HORIZON)
+
+
+def test_kinds_keep_the_most_dangerous_opponent():
+    you = make_snake("you", [(3, 0), (2, 0), (1, 0), (0, 0)])
+    state = _state(
+        [
+            you,
+            make_snake("long", [(1, 3), (0, 3), (0, 4), (0, 5), (0, 6)]),
+            make_snake("short", [(5, 3), (6, 3), (6, 4)]),
+            make_snake("same", [(3, 6), (4, 6), (5, 6), (6, 6)]),
+        ]
+    )
+    threats = ThreatMap(state, "you")
+    index = state.geometry.index
+    assert threats.turn(index(1, 3)) == 0 and threats.kind(index(1, 3)) == LONGER
+    assert threats.turn(index(4, 3)) == 1 and threats.kind(index(4, 3)) == SHORTER
+    assert threats.turn(index(3, 5)) == 1 and threats.kind(index(3, 5)) == EQUAL
+    # Two turns from "long" and "short": the longer one counts
+    assert threats.turn(index(3, 3)) == 2 and threats.kind(index(3, 3)) == LONGER
+    assert not threats.is_dangerous(index(4, 3))
+    assert threats.is_dangerous(index(3, 5)) and threats.is_dangerous(index(3, 3), 2)
+    assert threats.within[1] >> index(2, 3) & 1 and not threats.within[1] >> index(4, 3) & 1
+    assert threats.turn(-1) == NEVER and threats.kind(-1) == SHORTER and not threats.is_dangerous(-1)
+
+
+def test_bodies_block_the_heads():
+    # The body of "wall" keeps the longer "other" from coming down to you for a while
+    wall = [(0, 3), (1, 3), (2, 3), (3, 3), (4, 3), (5, 3)]
+    other = [(3, 5), (3, 6), (4, 6), (5, 6), (6, 6), (6, 5), (6, 4)]
+    state = _state([make_snake("you", [(3, 1), (3, 0), (2, 0)]), make_snake("wall", wall), make_snake("other", other)])
+    threats = ThreatMap(state, "you", ["other"])
+    index = state.geometry.index
+    # The tail of the wall leaves after one turn, the middle of its body after three
+    assert threats.turn(index(5, 3)) == 4
+    assert threats.turn(index(3, 3)) == 3
+    assert threats.turn(index(3, 2)) == 4
+    assert threats.turn(index(1, 1)) == NEVER
+
+
+def test_safety_reads_the_map():
+    request = make_request(
+        [make_snake("you", [(2, 3), (1, 3), (0, 3)]), make_snake("other", [(4, 3), (5, 3), (6, 3), (6, 2)])], 7, 7
+    )
+    board, you = request.board, request.you
+    assert snakebrain.get_threat_map(board, you) is get_threat_map(board._state, "you")
+    assert snakebrain.get_safe_moves(board, you) == ["up", "down"]
+
+
+def test_paths_steer_clear_of_longer_heads():
+    # The food is down right of you, the head of the longer "other" can get to (3, 1) as soon as you
+    snakes = [
+        make_snake("you", [(1, 3), (0, 3), (0, 2)]),
+        make_snake("other", [(3, 5), (3, 6), (4, 6), (5, 6), (6, 6)]),
+    ]
+    request = make_request(snakes, 7, 7, food=[(5, 1)])
+    state = snakebrain.get_board_state(request.board)
+    index = state.geometry.index
+    food = index(5, 1)
+    plain = get_path_tree(state, "you", 0)
+    wary = get_path_tree(state, "you", 0, 20)
+    threats = get_threat_map(state, "you")
+    assert plain.cost(food) == 6 and index(3, 1) in plain.path(food)
+    # Along the bottom edge, two moves longer
+    assert wary.cost(food) == 8
+    assert not any(threats.is_dangerous(cell, step) for step, cell in enumerate(wary.path(food)) if step)
+    assert list(PathTree(state, index(1, 3)).steps) == list(plain.steps)
+    path = snakebrain.chase_close_food(request.board, request.you, None, hazard_damage=0)
+    assert path == [(state.geometry.xs[cell], state.geometry.ys[cell]) for cell in wary.path(food)]
+
+
+def test_search_watches_the_opponents_standing_still():
+    snakes = [
+        make_snake("you", [(3, 3), (3, 2), (3, 1)]),
+        make_snake("near", [(1, 1), (0, 1), (0, 0)]),
+        make_snake("close", [(5, 1), (6, 1), (6, 0)]),
+        make_snake("far", [(6, 6), (5, 6), (4, 6), (3, 6)]),
+    ]
+    state = _state(snakes)
+    search = SearchState.from_board_state(state, "you", max_opponents=2)
+    assert search.threats is not None
+    assert search.threats.turn(state.geometry.index(6, 5)) == 1
+    # Only the snake left out of the search is followed
+    assert search.threats.turn(state.geometry.index(1, 2)) == NEVER
+    assert SearchState.from_board_state(state, "you", max_opponents=3).threats is None
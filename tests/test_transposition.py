@@ -0,0 +1,98 @@
+from battlesnake.utils.bitboard import BoardState
+from battlesnake.utils.classes import Board
+from battlesnake.utils.payloads import random_payload
+from battlesnake.utils.search import Searcher, SearchState, iterative_deepening
+from battlesnake.utils.threats import HORIZON
+from battlesnake.utils.transposition import (
+    ENTRY_BYTES,
+    EXACT,
+    LOWER,
+    SEARCH_THREADS,
+    TABLE_MEMORY,
+    UPPER,
+    TranspositionTable,
+    get_table,
+)
+import random
+import threading
+import time
+
+
+def _state(payload, you="snake-0", **kwargs):
+    board_state = BoardState.from_board(Board.parse_obj(payload["board"]))
+    return SearchState.from_board_state(board_state, you, **kwargs)
+
+
+def test_incremental_hash_matches_the_position():
+    rng = random.Random(7)
+    for seed in range(20):
+        payload = random_payload(random.Random(seed), 11, 11, snakes=4, length=4, food=10, hazard_rings=1)
+        state = _state(payload, hazard_damage=14, max_opponents=3)
+        stack = [state.hash]
+        for _ in range(12):
+            if not state.snakes[0].alive:
+                break
+            moving = [snake for snake in state.snakes if snake.alive and snake.moving]
+            stack.append(state.make(tuple(rng.choice(state.moves(snake)) for snake in moving)))
+            assert state.hash == state.compute_hash()
+        while len(stack) > 1:
+            state.unmake(stack.pop())
+            assert state.hash == state.compute_hash()
+        assert state.hash == stack[0]
+
+
+def test_probe_and_store():
+    table = TranspositionTable(1024)
+    assert table.size * ENTRY_BYTES <= 1024
+    assert table.probe(12345) is None
+
+    table.store(12345, 3, EXACT, 1.5, 42)
+    assert table.probe(12345) == (3, EXACT, 1.5, 42)
+
+    # Same slot, other key: a shallower entry doesn't replace a deeper one of the same search
+    other = 12345 + table.size
+    table.store(other, 2, LOWER, 7.0, 1)
+    assert table.probe(other) is None and table.collisions == 1
+    assert table.probe(12345) == (3, EXACT, 1.5, 42)
+
+    # It does once the entry comes from a previous search
+    table.new_search()
+    table.store(other, 1, UPPER, -2.0, -1)
+    assert table.probe(other) == (1, UPPER, -2.0, -1)
+    assert table.replaced == 1
+    assert table.stats()["hits"] == 3
+
+    table.clear()
+    assert table.probe(other) is None
+
+
+def test_search_uses_the_table():
+    payload = random_payload(random.Random(3), 11, 11, snakes=3, length=5, food=6)
+    table = TranspositionTable(1 << 20)
+    result = iterative_deepening(_state(payload), time.perf_counter() + 0.2, table=table)
+    assert result.move in ("up", "down", "left", "right")
+    assert result.table_hits > 0 and table.stores > 0
+
+
+def test_keys_tell_the_plies_apart_with_threats():
+    # Opponents left out of the search score the positions by their ply: a score is reused at its own ply only
+    payload = random_payload(random.Random(6), 11, 11, snakes=5, length=4, food=4)
+    state = _state(payload, max_opponents=2)
+    assert state.threats is not None
+    searcher = Searcher(state, time.perf_counter() + 1)
+    keys = [searcher._key(ply) for ply in range(HORIZON + 3)]
+    assert len(set(keys[:HORIZON])) == HORIZON and len(set(keys[-4:])) == 1
+    state = _state(payload, max_opponents=4)
+    assert state.threats is None and Searcher(state, 0)._key(3) == state.hash
+    result = iterative_deepening(_state(payload, max_opponents=2), time.perf_counter() + 0.1, table=get_table())
+    assert result.move in ("up", "down", "left", "right")
+
+
+def test_threads_share_the_memory_budget():
+    tables = []
+    for _ in range(2):
+        thread = threading.Thread(target=lambda: tables.append(get_table()))
+        thread.start()
+        thread.join()
+    assert tables[0] is not tables[1]
+    assert tables[0].size * ENTRY_BYTES * SEARCH_THREADS <= TABLE_MEMORY
@@ -0,0 +1,38 @@
+from battlesnake.host import create_app
+from battlesnake.utils.gamestore import GAMES
+from battlesnake.utils.geometry import _build_geometry
+from battlesnake.utils.warmup import move_paths, prebuild, warm_up
+from fastapi.testclient import TestClient
+import battlesnake.madsnake as madsnake
+import battlesnake.utils.metrics as metrics
+
+
+def test_move_paths():
+    assert move_paths(madsnake.api) == ["/move"]
+    assert move_paths(create_app(["bazuso", "madsnake"])) == ["/bazuso/move", "/madsnake/move"]
+
+
+def test_prebuild():
+    prebuild([(13, 9, 2)])
+    hits = _build_geometry.cache_info().hits
+    for ruleset in ("standard", "royale", "wrapped"):
+        _build_geometry(13, 9, ruleset)
+    assert _build_geometry.cache_info().hits == hits + 3
+
+
+def test_warm_up():
+    games = len(GAMES)
+    timings = warm_up(madsnake.api, boards=[(11, 11, 2), (7, 7, 2)])
+    assert list(timings) == ["/move 11x11", "/move 7x7"] and all(t > 0 for t in timings.values())
+    # The warm-up games leave no record and no observation
+    assert len(GAMES) == games
+    assert metrics.snapshot() == {}
+    # Once per app
+    assert warm_up(madsnake.api) == {}
+
+
+def test_warm_up_on_startup():
+    host = create_app(["madsnake"])
+    with TestClient(host):
+        # Already warmed up by its startup event
+        assert warm_up(host) == {}